@@ -151,6 +151,13 @@ foreign key(ScheduleID) references Schedule(ScheduleID),
 primary key(ClinicID, PhysicianID)
 );
 
+-- 12 id sequences (block-reserved primary keys, see ids.py)
+create table if not exists IdSequence(
+Name varchar(50),
+NextID int not null,
+primary key(Name)
+);
+
 -- 1. Patient (Email removed)
 INSERT INTO Patient (PatientID, Name, DOB, BloodType, PhoneNumber, Address)
 VALUES
@@ -339,6 +346,18 @@ VALUES
 ('admin@healthsystem.com', '$2b$12$IfhcXTo.lKuIs2xo0yKD2O0NyfePTfWFmULhnB06/C2drJPTsRrOi', 'admin', NULL, TRUE),
 ('sysadmin@healthsystem.com', '$2b$12$IfhcXTo.lKuIs2xo0yKD2O0NyfePTfWFmULhnB06/C2drJPTsRrOi', 'admin', NULL, TRUE);
 
+-- 15. IdSequence (start each sequence after the seeded rows; no-op if already set)
+INSERT IGNORE INTO IdSequence (Name, NextID)
+SELECT 'Patient', IFNULL(MAX(PatientID), 0) + 1 FROM Patient
+UNION ALL SELECT 'Physician', IFNULL(MAX(PhysicianID), 0) + 1 FROM Physician
+UNION ALL SELECT 'HealthReport', IFNULL(MAX(ReportID), 0) + 1 FROM HealthReport
+UNION ALL SELECT 'Prescription', IFNULL(MAX(PrescriptionID), 0) + 1 FROM Prescription
+UNION ALL SELECT 'Schedule', IFNULL(MAX(ScheduleID), 0) + 1 FROM Schedule
+UNION ALL SELECT 'Clinic', IFNULL(MAX(ClinicID), 0) + 1 FROM Clinic
+UNION ALL SELECT 'Appointment', IFNULL(MAX(AppointmentID), 0) + 1 FROM Appointment
+UNION ALL SELECT 'MedicalHistory', IFNULL(MAX(HistoryID), 0) + 1 FROM MedicalHistory
+UNION ALL SELECT 'Billing', IFNULL(MAX(BillingID), 0) + 1 FROM Billing;
+
 
 -- (1) Get patient's age based on DOB
 
@@ -379,12 +398,12 @@ CREATE PROCEDURE sp_BookAppointment (
     IN p_PhysicianID INT,
     IN p_ClinicID INT,
     IN p_AppointmentDate DATE,
-    IN p_AppointmentTime TIME
+    IN p_AppointmentTime TIME,
+    IN p_AppointmentID INT
 )
 BEGIN
     DECLARE v_IsWorking BOOLEAN DEFAULT FALSE;
     DECLARE v_DayName VARCHAR(20);
-    DECLARE v_ExistingApptCount INT DEFAULT 0;
     DECLARE v_ScheduleID INT;
     DECLARE v_NewAppointmentID INT;
 
@@ -431,26 +450,28 @@ BEGIN
         SET MESSAGE_TEXT = 'Cannot book. The physician is not scheduled to work on this day.';
     END IF;
 
-    -- Check if the timeslot is already filled for that physician
-    SELECT COUNT(*)
-    INTO v_ExistingApptCount
-    FROM Appointment
-    WHERE PhysicianID = p_PhysicianID
-      AND AppointmentDate = p_AppointmentDate
-      AND AppointmentTime = p_AppointmentTime;
-
-    IF v_ExistingApptCount > 0 THEN
-        SIGNAL SQLSTATE '45004'
-        SET MESSAGE_TEXT = 'Cannot book. This time slot is already filled for this physician.';
-    END IF;
+    -- No slot pre-check: the unique index uq_Appointment_Physician_Slot
+    -- rejects a taken slot atomically (duplicate key, handled by the app)
 
     -- Check for required IDs
     IF p_PatientID IS NULL OR p_PhysicianID IS NULL OR p_ClinicID IS NULL THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'PatientID, PhysicianID, and ClinicID are required.';
     ELSE
-        SET v_NewAppointmentID = (SELECT IFNULL(MAX(AppointmentID), 0) + 1 FROM Appointment);
-
-        -- All checks passed, insert the appointment
+        -- The application pre-allocates the ID (ids.py); reserve one here otherwise
+        IF p_AppointmentID IS NULL THEN
+            UPDATE IdSequence SET NextID = LAST_INSERT_ID(NextID + 1) WHERE Name = 'Appointment';
+            IF ROW_COUNT() = 0 THEN
+                -- Sequence not seeded yet: start it after the table's current max, then reserve
+                INSERT IGNORE INTO IdSequence (Name, NextID)
+                SELECT 'Appointment', IFNULL(MAX(AppointmentID), 0) + 1 FROM Appointment;
+                UPDATE IdSequence SET NextID = LAST_INSERT_ID(NextID + 1) WHERE Name = 'Appointment';
+            END IF;
+            SET v_NewAppointmentID = LAST_INSERT_ID() - 1;
+        ELSE
+            SET v_NewAppointmentID = p_AppointmentID;
+        END IF;
+
+        -- All checks passed, insert the appointment (fails with 1062 if the slot is taken)
         INSERT INTO Appointment (
             AppointmentID,
             PatientID,
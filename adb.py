@@ -0,0 +1,180 @@
+"""
+Async database access for the ASGI serving mode (asgi.py).
+
+Mirrors execute_query / execute_one / execute_update / call_procedure from
+db.py as coroutines. With aiomysql installed each role gets an async
+connection pool and queries never block a thread; without it the calls
+run on the regular pymysql pools in worker threads, so async code works
+the same either way.
+
+The role defaults to the one set for the current task (use_role), falling
+back to 'admin' like get_db does for unauthenticated requests.
+"""
+import asyncio
+import contextvars
+import inspect
+import logging
+import time
+
+from config import get_db_config, POOL_CONFIG, QUERY_LOG_CONFIG
+from db import get_pool, fingerprint
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None
+
+logger = logging.getLogger(__name__)
+
+current_role = contextvars.ContextVar('db_role', default='admin')
+
+_pools = {}
+_pool_lock = None
+
+
+def use_role(role):
+    """Set the database role for the current task; returns a token for current_role.reset()"""
+    return current_role.set(role)
+
+
+async def get_async_pool(role):
+    """The aiomysql pool for a role, created on first use (aiomysql only)"""
+    global _pool_lock
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    pool = _pools.get(role)
+    if pool is None:
+        async with _pool_lock:
+            pool = _pools.get(role)
+            if pool is None:
+                config = get_db_config(role)
+                pool = await aiomysql.create_pool(
+                    host=config['host'],
+                    port=config['port'],
+                    user=config['user'],
+                    password=config['password'],
+                    db=config['database'],
+                    minsize=POOL_CONFIG['min_size'],
+                    maxsize=POOL_CONFIG['max_size'],
+                    pool_recycle=POOL_CONFIG['max_lifetime'],
+                    cursorclass=aiomysql.DictCursor,
+                    autocommit=False,
+                )
+                _pools[role] = pool
+    return pool
+
+
+async def close_async_pools():
+    """Close every aiomysql pool (ASGI lifespan shutdown)"""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        pool.close()
+        await pool.wait_closed()
+
+
+def _log_slow(query, seconds):
+    """Slow-query log for aiomysql statements (pymysql cursors log their own)"""
+    threshold = QUERY_LOG_CONFIG['slow_query_ms']
+    if threshold and seconds * 1000 >= threshold:
+        digest, text = fingerprint(query)
+        logger.warning("Slow query %.1f ms [%s]: %s", seconds * 1000, digest, text)
+
+
+def _run_sync(role, work):
+    """Run work(cursor, conn) on a pooled pymysql connection (thread fallback)"""
+    pool = get_pool(role)
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        try:
+            result = work(cursor, conn)
+        finally:
+            cursor.close()
+    except Exception:
+        broken = False
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        pool.release(conn, discard=broken)
+        raise
+    pool.release(conn)
+    return result
+
+
+async def _execute(query, params, role, handler, commit=False):
+    """
+    Run one statement and post-process the cursor with handler(cursor).
+
+    Rolls back on error; commits when asked.
+    """
+    role = role or current_role.get()
+    if aiomysql is None:
+        def work(cursor, conn):
+            cursor.execute(query, params or ())
+            result = handler(cursor)
+            if commit:
+                conn.commit()
+            return result
+        return await asyncio.to_thread(_run_sync, role, work)
+
+    pool = await get_async_pool(role)
+    start = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute(query, params or ())
+                    result = handler(cursor)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    if commit:
+                        await conn.commit()
+                    return result
+                except Exception:
+                    await conn.rollback()
+                    raise
+    finally:
+        _log_slow(query, time.perf_counter() - start)
+
+
+async def execute_query(query, params=None, role=None):
+    """Execute SELECT query"""
+    return await _execute(query, params, role, lambda cursor: cursor.fetchall())
+
+
+async def execute_one(query, params=None, role=None):
+    """Execute SELECT query, return one result"""
+    return await _execute(query, params, role, lambda cursor: cursor.fetchone())
+
+
+async def execute_update(query, params=None, role=None):
+    """Execute INSERT/UPDATE/DELETE, return the last insert id"""
+    return await _execute(query, params, role, lambda cursor: cursor.lastrowid, commit=True)
+
+
+async def call_procedure(proc_name, params=None, role=None):
+    """Call stored procedure"""
+    role = role or current_role.get()
+    if aiomysql is None:
+        def work(cursor, conn):
+            cursor.callproc(proc_name, params or ())
+            conn.commit()
+            return True
+        return await asyncio.to_thread(_run_sync, role, work)
+
+    pool = await get_async_pool(role)
+    start = time.perf_counter()
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.callproc(proc_name, params or ())
+                    await conn.commit()
+                    return True
+                except Exception:
+                    await conn.rollback()
+                    raise
+    finally:
+        _log_slow(f"CALL {proc_name}", time.perf_counter() - start)
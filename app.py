@@ -1,103 +1,66 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory, stream_with_context
 from flask_login import LoginManager, login_required, current_user
 from flask_cors import CORS
-from db import init_app, execute_query, execute_one, execute_update, call_procedure
+from db import init_app, get_db, discard_db, execute_query, execute_columns, execute_batch, execute_one, execute_update, call_procedure, transaction, stream_query, PoolExhaustedError
 from models import User
 from auth import auth_bp, admin_required
+from ids import next_id, allocate_ids, ignore_client_id
+from pagination import (fetch_page, page_args, filter_condition, clamp_page_size, columnar_layout, shape_columnar,
+                        append_column, CursorError)
+from query_engine import run_query, QueryError
+from search import search_index, IndexNotReady, ENTITIES as SEARCH_ENTITIES
+from config import SEARCH_CONFIG, SUMMARY_CONFIG
+from bulk_import import KINDS as IMPORT_KINDS, FORMATS as IMPORT_FORMATS, detect_format, import_stream
+from export import EXPORTS, CONTENT_TYPES, ExportError, plan_export, export_chunks, file_name, pyarrow
+from availability import availability
+from cache import cache
+from etags import conditional, bump_versions, owner
+from serialization import FastJSONProvider, date_format
+import metrics
+import itertools
 import os
+import pymysql
 
 app = Flask(__name__, static_folder='frontend/dist', static_url_path='')
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production-12345')
 
+# Rows go to jsonify() as-is; the provider encodes dates, TIME and DECIMAL values
+app.json = FastJSONProvider(app)
+
 # Enable CORS for React frontend (Vite dev server)
 CORS(app, supports_credentials=True, origins=['http://localhost:3000'])
 
 # Initialize database
 init_app(app)
 
+# Request latency / DB time instrumentation (/metrics, Server-Timing)
+metrics.init_app(app)
+
+# Build the search indexes before the first search needs them
+if SEARCH_CONFIG['warm_on_start']:
+    search_index.warm()
+
 # Auto-setup database on startup
 def setup_database():
-    """Setup database and tables if they don't exist"""
-    import pymysql
+    """
+    Create or update the database from COMMANDS.sql and the migrations.
+
+    Delegates to bootstrap.py, which skips every phase whose checksum is
+    already recorded, so a restart on a current schema costs a few SELECTs.
+    """
     from config import get_db_config
-    import re
+    from bootstrap import connect, bootstrap
 
     try:
         # Use admin credentials for database setup
         admin_config = get_db_config('admin')
-
-        # Connect without specifying database to create it
-        conn = pymysql.connect(
-            host=admin_config['host'],
-            user=admin_config['user'],
-            password=admin_config['password']
-        )
-        cursor = conn.cursor()
-
-        # Create database if it doesn't exist
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {admin_config['database']}")
-        cursor.execute(f"USE {admin_config['database']}")
-        
-        # Read SQL file
-        with open('COMMANDS.sql', 'r') as f:
-            sql_content = f.read()
-        
-        # Split content into sections: before DELIMITER, between DELIMITERs, and after
-        # Handle DELIMITER blocks specially
-        current_delimiter = ';'
-        statements = []
-        current_statement = ""
-        
-        lines = sql_content.split('\n')
-        in_delimiter_block = False
-        
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith('--'):
-                continue
-                
-            # Handle DELIMITER changes
-            if line.startswith('DELIMITER'):
-                if '$$' in line:
-                    current_delimiter = '$$'
-                    in_delimiter_block = True
-                else:
-                    current_delimiter = ';'
-                    in_delimiter_block = False
-                continue
-            
-            current_statement += line + ' '
-            
-            # Check if statement is complete
-            if line.endswith(current_delimiter):
-                # Remove the delimiter from the statement
-                statement = current_statement.rstrip(current_delimiter + ' ').strip()
-                if statement:
-                    statements.append(statement)
-                current_statement = ""
-        
-        # Execute all statements
-        for statement in statements:
-            if statement:
-                try:
-                    cursor.execute(statement)
-                    conn.commit()
-                except pymysql.err.ProgrammingError as e:
-                    # Ignore certain expected errors
-                    error_msg = str(e).lower()
-                    if any(ignore in error_msg for ignore in ['already exists', 'duplicate']):
-                        continue
-                    else:
-                        print(f"SQL Warning: {e}")
-                except Exception as e:
-                    print(f"SQL Error: {e}")
-        
-        cursor.close()
-        conn.close()
+        conn = connect(admin_config)
+        try:
+            bootstrap(conn, admin_config['database'])
+        finally:
+            conn.close()
         print("Database setup completed successfully!")
         
     except Exception as e:
@@ -127,6 +90,8 @@ def reset_database():
         print(f"Database dropped successfully!")
 
         setup_database()
+        cache.invalidate()
+        search_index.clear()
         
     except Exception as e:
         print(f"Database drop failed: {e}")
@@ -143,19 +108,77 @@ login_manager.init_app(app)
 # User loader callback for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.get_by_id(int(user_id))
+    user = User.get_by_id(int(user_id))
+    # A deactivated account's existing sessions stop working too
+    return user if user and user.is_active else None
 
 # Unauthorized handler - return JSON instead of redirect
 @login_manager.unauthorized_handler
 def unauthorized():
     return jsonify({'success': False, 'error': 'Authentication required'}), 401
 
+# Connection pool saturated - tell the client to back off instead of a generic 500.
+@app.errorhandler(PoolExhaustedError)
+def pool_exhausted(e):
+    response = jsonify({'success': False, 'error': 'Server busy, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Most views end in a catch-all except that turns any error into a 500 or 400.
+# get_db notes an exhausted pool on g, so that response is replaced here instead.
+@app.after_request
+def surface_pool_exhausted(response):
+    if 'pool_exhausted' in g:
+        return app.make_response(pool_exhausted(g.pool_exhausted))
+    return response
+
 # Register authentication blueprint
 app.register_blueprint(auth_bp)
 
+STREAM_FORMATS = {'json', 'ndjson'}
+
+# Date style the data-filtering tables display verbatim
+DISPLAY_DATE = '%a, %d %b %Y'
+
+def stream_json_response(rows, stream_format='json', chunk_rows=100):
+    """
+    Stream an iterable of rows as a JSON response without materializing it.
+
+    'json' emits the usual {"success": true, "data": [...]} envelope in
+    chunks of chunk_rows rows; 'ndjson' emits one JSON object per line.
+    The first row is pulled before the response starts, so query errors
+    still surface as a normal error response instead of a truncated body.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    rows = itertools.chain([first], rows) if first is not None else iter(())
+    encode = app.json.dumps
+
+    if stream_format == 'ndjson':
+        def generate():
+            for row in rows:
+                yield encode(row) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def generate():
+        yield '{"success": true, "data": ['
+        separator = ''
+        chunk = []
+        for row in rows:
+            chunk.append(encode(row))
+            if len(chunk) >= chunk_rows:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+        yield ']}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 # Get all patients (protected route - requires login)
 @app.route('/api/patients', methods=['GET'])
 @login_required
+@conditional('patients')
 def get_patients():
     try:
         query = "SELECT * FROM Patient"
@@ -165,20 +188,23 @@ def get_patients():
         return jsonify({'success': False, 'error': str(e)}), 500
     
 
+# get_physicians joins Physician with WorksAt/Schedule and Clinic
+PHYSICIAN_LIST_NAMESPACES = ('physicians', 'clinics', 'workassignments')
+
+
 @app.route('/api/physicians', methods=['GET'])
 @login_required
+@conditional('physicians', 'clinics', 'workassignments')
 def get_physicians():
-    try:
-        page = request.args.get('page', 1, type=int)
-        page_size = request.args.get('page_size', 3, type=int)
-
-        offset = (page - 1) * page_size
+    """
+    List physicians with their clinic and weekly schedule.
 
-        count_query = "SELECT COUNT(*) as total FROM physician"
-        count_result = execute_one(count_query)
-        total = count_result['total'] if count_result else 0
-
-        query = """
+    Pages with ?cursor=<next_cursor>&page_size=N (keyset pagination). The
+    legacy ?page=N mode is still accepted for existing clients but uses
+    OFFSET, so it gets slower the deeper it goes.
+    """
+    try:
+        select = """
             SELECT
                 p.PhysicianID,
                 p.Name,
@@ -192,26 +218,63 @@ def get_physicians():
             LEFT JOIN WorksAt w ON p.PhysicianID = w.PhysicianID
             LEFT JOIN Clinic c ON w.ClinicID = c.ClinicID
             LEFT JOIN Schedule s ON w.ScheduleID = s.ScheduleID
-            LIMIT %s OFFSET %s
         """
-        physicians = execute_query(query, (page_size, offset))
 
-        total_pages = (total + page_size - 1) // page_size
+        if 'page' in request.args and 'cursor' not in request.args:
+            page = max(request.args.get('page', 1, type=int), 1)
+            page_size = clamp_page_size(request.args.get('page_size', 3, type=int))
 
-        return jsonify({
-            'success': True,
-            'data': physicians,
-            'page': page,
-            'page_size': page_size,
-            'total': total,
-            'total_pages': total_pages
-        }), 200
+            def load_offset_page():
+                offset = (page - 1) * page_size
+
+                count_query = "SELECT COUNT(*) as total FROM physician"
+                count_result = execute_one(count_query)
+                total = count_result['total'] if count_result else 0
+
+                query = select + " ORDER BY p.PhysicianID, w.ClinicID LIMIT %s OFFSET %s"
+                physicians = execute_query(query, (page_size, offset))
+
+                total_pages = (total + page_size - 1) // page_size
+
+                return {
+                    'data': physicians,
+                    'page': page,
+                    'page_size': page_size,
+                    'total': total,
+                    'total_pages': total_pages
+                }
+
+            result = cache.get_or_load(PHYSICIAN_LIST_NAMESPACES, ('physicians:page', page, page_size), load_offset_page)
+            return jsonify({'success': True, **result}), 200
+
+        args = page_args()
+
+        def load_keyset_page():
+            physicians, meta = fetch_page(
+                select,
+                [('p.PhysicianID', 'PhysicianID', 'ASC'), ('w.ClinicID', 'ClinicID', 'ASC')],
+                cursor=args['cursor'],
+                page_size=args['page_size'],
+                count_table='Physician' if args['include_total'] else None,
+                layout=args['layout']
+            )
+            return {'data': physicians, **meta}
+
+        result = cache.get_or_load(
+            PHYSICIAN_LIST_NAMESPACES,
+            ('physicians:keyset', args['cursor'], args['page_size'], args['include_total'], args['layout']),
+            load_keyset_page
+        )
+        return jsonify({'success': True, **result}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/appointments', methods=['GET'])
 @login_required
+@conditional('appointments:{user}', 'clinics', 'physicians', 'patients')
 def get_appointments():
     """Get appointments for the logged-in user (patient or physician)"""
     try:
@@ -250,14 +313,6 @@ def get_appointments():
                 ORDER BY a.AppointmentDate DESC, a.AppointmentTime DESC
             """
             appointments = execute_query(query, (current_user.reference_id,))
-        
-        for appointment in appointments:
-            if 'AppointmentTime' in appointment and appointment['AppointmentTime'] is not None:
-                if hasattr(appointment['AppointmentTime'], 'total_seconds'):
-                    total_seconds = int(appointment['AppointmentTime'].total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    appointment['AppointmentTime'] = f"{hours:02d}:{minutes:02d}:00"
 
         return jsonify({
             'success': True,
@@ -279,7 +334,7 @@ def delete_appointment(appointment_id):
         if current_user.user_type == 'patient':
             # Verify the appointment belongs to the current patient
             verify_query = """
-                SELECT AppointmentID FROM Appointment 
+                SELECT AppointmentID, PatientID, PhysicianID, AppointmentDate, AppointmentTime FROM Appointment 
                 WHERE AppointmentID = %s AND PatientID = %s
             """
             existing_appointment = execute_query(verify_query, (appointment_id, current_user.reference_id))
@@ -300,7 +355,7 @@ def delete_appointment(appointment_id):
         else:  # physician
             # Verify the appointment belongs to the current physician
             verify_query = """
-                SELECT AppointmentID FROM Appointment 
+                SELECT AppointmentID, PatientID, PhysicianID, AppointmentDate, AppointmentTime FROM Appointment 
                 WHERE AppointmentID = %s AND PhysicianID = %s
             """
             existing_appointment = execute_query(verify_query, (appointment_id, current_user.reference_id))
@@ -317,6 +372,14 @@ def delete_appointment(appointment_id):
                 "DELETE FROM Appointment WHERE AppointmentID = %s AND PhysicianID = %s",
                 (appointment_id, current_user.reference_id),
             )
+
+        cancelled = existing_appointment[0]
+        availability.mark_free(cancelled['PhysicianID'], cancelled['AppointmentDate'], cancelled['AppointmentTime'])
+        bump_versions(
+            owner('appointments', 'patient', cancelled['PatientID']),
+            owner('appointments', 'physician', cancelled['PhysicianID']),
+            'billing'
+        )
         
         return jsonify({'success': True, 'message': 'Appointment cancelled successfully'}), 200
         
@@ -326,6 +389,7 @@ def delete_appointment(appointment_id):
 
 # Get patient by ID
 @app.route('/api/patients/<int:patient_id>', methods=['GET'])
+@conditional('patients')
 def get_patient(patient_id):
     try:
         query = "SELECT * FROM Patient WHERE PatientID = %s"
@@ -349,18 +413,20 @@ def create_patient():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['PatientID', 'Name', 'Email', 'DOB', 'BloodType', 'PhoneNumber', 'Address']
+        required_fields = ['Name', 'Email', 'DOB', 'BloodType', 'PhoneNumber', 'Address']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'PatientID')
+
+        patient_id = next_id('Patient')
         query = """
             INSERT INTO Patient (PatientID, Name, Email, DOB, BloodType, PhoneNumber, Address)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         
         execute_update(query, (
-            data['PatientID'],
+            patient_id,
             data['Name'],
             data['Email'],
             data['DOB'],
@@ -368,8 +434,10 @@ def create_patient():
             data['PhoneNumber'],
             data['Address']
         ))
+        bump_versions('patients')
+        search_index.add('patient', patient_id, data)
         
-        return jsonify({'success': True, 'message': 'Patient created successfully', 'PatientID': data['PatientID']}), 201
+        return jsonify({'success': True, 'message': 'Patient created successfully', 'PatientID': patient_id}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
@@ -377,6 +445,12 @@ def create_patient():
 @app.route("/api/filter", methods=["GET"])
 @login_required
 def filter_data():
+    """
+    Single-column equality filter (?table=&column=&value=).
+
+    Kept for existing callers; runs through the query engine, so the column
+    is checked against the schema and results are paged (cursor/page_size).
+    """
     try:
         table = request.args.get('table')
         column = request.args.get('column')
@@ -386,20 +460,126 @@ def filter_data():
         if not table or not column or not value:
             return jsonify({'success': False, 'error': 'Missing required parameters: table, column, value'}), 400
         
-        # Whitelist allowed tables and columns for security
-        allowed_tables = {'Patient', 'Physician', 'Appointment', 'Clinic', 'HealthReport', 'Billing', 'Prescription', 'MedicalHistory'}
-        if table not in allowed_tables:
-            return jsonify({'success': False, 'error': 'Invalid table name'}), 400
-        
-        query = f"SELECT * FROM {table} WHERE {column} = %s"
-        filtered = execute_query(query, (value,))
+        args = page_args()
+        filtered, meta = run_query(
+            {'table': table, 'where': [{'column': column, 'op': 'eq', 'value': value}]},
+            current_user.user_type,
+            current_user.reference_id,
+            cursor=args['cursor'],
+            page_size=args['page_size'],
+            layout=args['layout']
+        )
     
-        return jsonify({'success': True, 'data': filtered}), 200
+        return jsonify({'success': True, 'data': filtered, **meta}), 200
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+@app.route("/api/query", methods=["POST"])
+@login_required
+def query_data():
+    """
+    Filter a table server-side.
+
+    Body: {"table", "select", "where": [{"column", "op", "value"}], "order_by",
+    "limit", "cursor", "format", "layout"}. Operators: eq, ne, lt, lte, gt, gte, between, in,
+    prefix, is_null, not_null. Tables and rows are limited by user type
+    (QUERY_CONFIG['access']). See query_engine.py for details.
+    """
+    try:
+        spec = request.get_json(silent=True)
+        if not spec:
+            return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
+
+        rows, meta = run_query(spec, current_user.user_type, current_user.reference_id,
+                               include_total=bool(spec.get('include_total')))
+        return jsonify({'success': True, 'data': rows, **meta}), 200
+
+    except (QueryError, CursorError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Patient search is for clinical staff; physicians and drugs are searchable by anyone signed in
+SEARCH_ACCESS = {
+    'patient': ('physician', 'admin'),
+    'physician': ('patient', 'physician', 'admin'),
+    'drug': ('patient', 'physician', 'admin'),
+}
+
+
+@app.route("/api/search", methods=["GET"])
+@login_required
+def search_records():
+    """
+    Typo-tolerant prefix search over patients, physicians and drug names.
+
+    Query params: q (search text), type (comma-separated: patient,
+    physician, drug; default every type the user may search) and limit.
+    Returns the top matches per type, best first.
+    """
+    try:
+        text = (request.args.get('q') or '').strip()
+        if not text:
+            return jsonify({'success': False, 'error': 'Missing required parameter: q'}), 400
+
+        allowed = [entity for entity in SEARCH_ENTITIES if current_user.user_type in SEARCH_ACCESS[entity]]
+        requested = request.args.get('type')
+        entities = [entity.strip() for entity in requested.split(',')] if requested else allowed
+        for entity in entities:
+            if entity not in SEARCH_ENTITIES:
+                return jsonify({'success': False, 'error': f'Unknown search type: {entity}'}), 400
+            if entity not in allowed:
+                return jsonify({'success': False, 'error': f'Not allowed to search {entity}'}), 403
+
+        limit = request.args.get('limit', SEARCH_CONFIG['default_limit'], type=int)
+        limit = max(1, min(limit, SEARCH_CONFIG['max_limit']))
+
+        results = {}
+        for entity in entities:
+            matches = search_index.search(entity, text, limit)
+            if entity == 'drug':
+                results[entity] = [{'DrugName': name, 'score': round(score, 3)} for name, score in matches]
+                continue
+            spec = SEARCH_ENTITIES[entity]
+            rows = {}
+            if matches:
+                placeholders = ', '.join(['%s'] * len(matches))
+                rows = {
+                    row[spec['key']]: row for row in execute_query(
+                        f"SELECT {', '.join(spec['columns'])} FROM {spec['table']} "
+                        f"WHERE {spec['key']} IN ({placeholders})",
+                        [key for key, _ in matches]
+                    )
+                }
+            # Rows deleted since they were indexed simply drop out
+            results[entity] = [
+                {**rows[key], 'score': round(score, 3)} for key, score in matches if key in rows
+            ]
+
+        return jsonify({'success': True, 'query': text, 'data': results}), 200
+
+    except IndexNotReady as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+SLOT_FILLED_MESSAGE = 'Cannot book. This time slot is already filled for this physician.'
+
+def is_slot_conflict(error):
+    """True if a booking failed on the one-appointment-per-slot unique index"""
+    return (
+        isinstance(error, pymysql.err.IntegrityError)
+        and error.args[0] == 1062
+        and 'uq_Appointment_Physician_Slot' in str(error.args[1])
+    )
+
+
 @app.route("/api/appointments", methods=["POST"])
 @login_required
 def make_appointment():
@@ -421,10 +601,20 @@ def make_appointment():
                 data['PhysicianID'],
                 data['ClinicID'],
                 data['AppointmentDate'],
-                data['AppointmentTime']
+                data['AppointmentTime'],
+                next_id('Appointment')
             ))
+        availability.mark_booked(data['PhysicianID'], data['AppointmentDate'], data['AppointmentTime'])
+        bump_versions(
+            owner('appointments', 'patient', data['PatientID']),
+            owner('appointments', 'physician', data['PhysicianID'])
+        )
 
         return jsonify({'success': True, 'message': 'Appointment booked successfully'}), 201
+    except pymysql.err.IntegrityError as e:
+        if is_slot_conflict(e):
+            return jsonify({'success': False, 'error': SLOT_FILLED_MESSAGE}), 400
+        return jsonify({'success': False, 'error': e.args[1] if len(e.args) > 1 else str(e)}), 400
     except Exception as e:
         # Extract the actual error message from MySQL exception
         error_message = str(e)
@@ -437,6 +627,7 @@ def make_appointment():
 
 @app.route("/api/healthreports", methods=["GET"])
 @login_required
+@conditional('healthreports:patient:{args[patient_id]}', 'healthreports:{user}', 'physicians', 'patients')
 def get_healthreports():
     try:
         if current_user.user_type == 'patient':
@@ -483,6 +674,7 @@ def get_healthreports():
 
 @app.route("/api/physician/patients", methods=["GET"])
 @login_required
+@conditional('appointments:{user}', 'patients')
 def get_physician_patients():
     """Get patients who have had appointments with this physician"""
     try:
@@ -522,46 +714,41 @@ def create_health_report():
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
         
-        # Get next ReportID
-        id_query = 'SELECT IFNULL(MAX(ReportID), 0) + 1 AS nextId FROM HealthReport'
-        id_result = execute_query(id_query)
-        report_id = id_result[0]['nextId']
-        
-        # Create health report
+        # Validate every prescription before writing anything
+        from datetime import datetime
+        prescriptions = data.get('prescriptions') or []
+        for prescription in prescriptions:
+            start_date = datetime.strptime(prescription['startDate'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(prescription['endDate'], '%Y-%m-%d').date()
+
+            if end_date < start_date:
+                return jsonify({'success': False, 'error': 'Prescription end date must be greater than or equal to start date'}), 400
+
+        # Get next ReportID and one PrescriptionID per prescription
+        report_id = next_id('HealthReport')
+        prescription_ids = allocate_ids('Prescription', len(prescriptions)) if prescriptions else []
+
         health_report_query = """
             INSERT INTO HealthReport (ReportID, ReportDate, Weight, Height, PhysicianID, PatientID)
             VALUES (%s, %s, %s, %s, %s, %s)
         """
-        execute_update(health_report_query, (
-            report_id,
-            data['reportDate'],
-            data['weight'],
-            data['height'],
-            current_user.reference_id,
-            data['patientId']
-        ))
-        
-        # Create prescriptions if provided
-        if 'prescriptions' in data and data['prescriptions']:
-            for prescription in data['prescriptions']:
-                # Validate prescription dates
-                from datetime import datetime
-                start_date = datetime.strptime(prescription['startDate'], '%Y-%m-%d').date()
-                end_date = datetime.strptime(prescription['endDate'], '%Y-%m-%d').date()
-                
-                if end_date < start_date:
-                    return jsonify({'success': False, 'error': 'Prescription end date must be greater than or equal to start date'}), 400
-                
-                # Get next PrescriptionID
-                prescription_id_query = 'SELECT IFNULL(MAX(PrescriptionID), 0) + 1 AS nextId FROM Prescription'
-                prescription_id_result = execute_query(prescription_id_query)
-                prescription_id = prescription_id_result[0]['nextId']
-                
-                prescription_query = """
-                    INSERT INTO Prescription (PrescriptionID, ReportID, DrugName, Dosage, Frequency, StartDate, EndDate, Instructions)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_update(prescription_query, (
+        prescription_query = """
+            INSERT INTO Prescription (PrescriptionID, ReportID, DrugName, Dosage, Frequency, StartDate, EndDate, Instructions)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+
+        # Report and all prescriptions go in one transaction: a multi-row insert and a single commit
+        with transaction() as tx:
+            tx.execute(health_report_query, (
+                report_id,
+                data['reportDate'],
+                data['weight'],
+                data['height'],
+                current_user.reference_id,
+                data['patientId']
+            ))
+            tx.executemany(prescription_query, [
+                (
                     prescription_id,
                     report_id,
                     prescription['drugName'],
@@ -570,7 +757,17 @@ def create_health_report():
                     prescription['startDate'],
                     prescription['endDate'],
                     prescription['instructions']
-                ))
+                )
+                for prescription_id, prescription in zip(prescription_ids, prescriptions)
+            ])
+        bump_versions(
+            'healthreports',
+            'prescriptions',
+            owner('healthreports', 'patient', data['patientId']),
+            owner('healthreports', 'physician', current_user.reference_id)
+        )
+        for prescription in prescriptions:
+            search_index.add('drug', None, {'DrugName': prescription['drugName']})
         
         return jsonify({
             'success': True, 
@@ -593,18 +790,20 @@ def add_bill_for_patient():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['BillingID', 'PatientID', 'AppointmentID', 'InsuranceID', 'TotalAmount', 'PaymentStatus', 'BillingDate', 'DueDate']
+        required_fields = ['PatientID', 'AppointmentID', 'InsuranceID', 'TotalAmount', 'PaymentStatus', 'BillingDate', 'DueDate']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'BillingID')
+
+        billing_id = next_id('Billing')
         query = """
             INSERT INTO Billing (BillingID, PatientID, AppointmentID, InsuranceID, TotalAmount, PaymentStatus, BillingDate, DueDate)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
 
         execute_update(query, (
-                data['BillingID'],
+                billing_id,
                 data['PatientID'],
                 data['AppointmentID'],
                 data['InsuranceID'],
@@ -613,8 +812,9 @@ def add_bill_for_patient():
                 data['BillingDate'],
                 data['DueDate']
             ))
+        bump_versions('billing')
 
-        return jsonify({'success': True, 'message': 'Bill created successfully'}), 201
+        return jsonify({'success': True, 'message': 'Bill created successfully', 'BillingID': billing_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -641,6 +841,7 @@ def pay_bill():
         """
 
         execute_update(query, (data['BillingID'],))
+        bump_versions('billing')
 
         return jsonify({'success': True, 'message': 'Bill payment processed successfully'}), 200
     
@@ -650,6 +851,7 @@ def pay_bill():
 
 @app.route("/api/billing", methods=["GET"])
 @login_required
+@conditional('billing')
 def get_bills_for_patient():
     try:
         patient_id = request.args.get('patient_id')
@@ -681,18 +883,20 @@ def write_prescription():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['PrescriptionID', 'ReportID', 'PhysicianID', 'DrugName', 'Dosage', 'Frequency', 'StartDate', 'EndDate', 'Instructions']
+        required_fields = ['ReportID', 'PhysicianID', 'DrugName', 'Dosage', 'Frequency', 'StartDate', 'EndDate', 'Instructions']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'PrescriptionID')
+
+        prescription_id = next_id('Prescription')
         query = """
             INSERT INTO Prescription (PrescriptionID, ReportID, PhysicianID, DrugName, Dosage, Frequency, StartDate, EndDate, Instructions)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
 
         execute_update(query, (
-                data['PrescriptionID'],
+                prescription_id,
                 data['ReportID'],
                 data['PhysicianID'],
                 data['DrugName'],
@@ -702,8 +906,10 @@ def write_prescription():
                 data['EndDate'],
                 data['Instructions']
             ))
+        bump_versions('prescriptions')
+        search_index.add('drug', None, data)
 
-        return jsonify({'success': True, 'message': 'Prescription created successfully'}), 201
+        return jsonify({'success': True, 'message': 'Prescription created successfully', 'PrescriptionID': prescription_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -711,6 +917,7 @@ def write_prescription():
 
 @app.route("/api/prescription", methods=["GET"])
 @login_required
+@conditional('prescriptions', 'healthreports')
 def get_prescriptions_for_patient():
     try:
         patient_id = request.args.get('patient_id')
@@ -745,18 +952,20 @@ def write_history():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['HistoryID', 'PatientID', 'HealthCondition', 'DiagnosisDate', 'TreatmentReceived', 'Outcome', 'OngoingCare']
+        required_fields = ['PatientID', 'HealthCondition', 'DiagnosisDate', 'TreatmentReceived', 'Outcome', 'OngoingCare']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'HistoryID')
+
+        history_id = next_id('MedicalHistory')
         query = """
             INSERT INTO MedicalHistory (HistoryID, PatientID, HealthCondition, DiagnosisDate, TreatmentReceived, Outcome, OngoingCare)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
 
         execute_update(query, (
-                data['HistoryID'],
+                history_id,
                 data['PatientID'],
                 data['HealthCondition'],
                 data['DiagnosisDate'],
@@ -764,8 +973,9 @@ def write_history():
                 data['Outcome'],
                 data['OngoingCare']
             ))
+        bump_versions('history')
 
-        return jsonify({'success': True, 'message': 'Medical history created successfully'}), 201
+        return jsonify({'success': True, 'message': 'Medical history created successfully', 'HistoryID': history_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -807,6 +1017,7 @@ def update_history():
         """
 
         execute_update(query, tuple(update_values))
+        bump_versions('history')
 
         return jsonify({'success': True, 'message': 'Medical history updated successfully'}), 200
     
@@ -816,6 +1027,7 @@ def update_history():
 
 @app.route("/api/history", methods=["GET"])
 @login_required
+@conditional('history')
 def get_history_for_patient():
     try:
         patient_id = request.args.get('patient_id')
@@ -836,6 +1048,116 @@ def get_history_for_patient():
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+# Patient dashboard sections: (query, order) with the patient id as the only parameter
+PATIENT_SUMMARY_SECTIONS = {
+    'appointments': """
+        SELECT
+            a.AppointmentID,
+            c.Name AS clinic_name,
+            c.Address AS clinic_address,
+            p.Name AS physician_name,
+            a.AppointmentDate,
+            a.AppointmentTime
+        FROM Appointment a
+        JOIN Clinic c ON c.ClinicID = a.ClinicID
+        JOIN Physician p ON p.PhysicianID = a.PhysicianID
+        WHERE a.PatientID = %s
+        ORDER BY a.AppointmentDate DESC, a.AppointmentTime DESC
+    """,
+    'healthreports': """
+        SELECT hr.ReportID, hr.ReportDate, hr.Weight, hr.Height, hr.PhysicianID, hr.PatientID,
+               p.Name as PhysicianName, p.Department as PhysicianDepartment
+        FROM HealthReport hr
+        JOIN Physician p ON p.PhysicianID = hr.PhysicianID
+        WHERE hr.PatientID = %s
+        ORDER BY hr.ReportDate DESC
+    """,
+    'prescriptions': """
+        SELECT p.*, hr.PatientID
+        FROM Prescription p
+        JOIN HealthReport hr ON p.ReportID = hr.ReportID
+        WHERE hr.PatientID = %s
+        ORDER BY p.StartDate DESC, p.PrescriptionID DESC
+    """,
+    'billing': """
+        SELECT * FROM Billing WHERE PatientID = %s ORDER BY BillingDate DESC
+    """,
+    'history': """
+        SELECT * FROM MedicalHistory WHERE PatientID = %s ORDER BY DiagnosisDate DESC
+    """,
+}
+
+
+@app.route("/api/patient/summary", methods=["GET"])
+@login_required
+@conditional('appointments:{patient}', 'healthreports', 'healthreports:{patient}',
+             'prescriptions', 'billing', 'history', 'patients', 'physicians', 'clinics')
+def get_patient_summary():
+    """
+    Everything the patient dashboard shows, in one request.
+
+    Query params: sections (comma-separated subset of profile, appointments,
+    healthreports, prescriptions, billing, history; default all), limit
+    (rows per section) and <section>_limit to override it per section.
+    Patients always get their own summary; physicians and admins pass
+    patient_id.
+
+    All requested sections run on the request's read connection (a replica
+    when one has the user's writes) inside one read-only snapshot, so they
+    are consistent with each other.
+    """
+    try:
+        if current_user.user_type == 'patient':
+            patient_id = current_user.reference_id
+        else:
+            patient_id = request.args.get('patient_id', type=int)
+            if not patient_id:
+                return jsonify({'success': False, 'error': 'Missing required parameter: patient_id'}), 400
+
+        available = ['profile'] + list(PATIENT_SUMMARY_SECTIONS)
+        requested = request.args.get('sections')
+        sections = [section.strip() for section in requested.split(',') if section.strip()] if requested else available
+        unknown = [section for section in sections if section not in available]
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+
+        default_limit = request.args.get('limit', SUMMARY_CONFIG['default_limit'], type=int)
+
+        statements = []
+        limits = {}
+        if 'profile' in sections:
+            statements.append(("SELECT * FROM Patient WHERE PatientID = %s", (patient_id,)))
+        for section, query in PATIENT_SUMMARY_SECTIONS.items():
+            if section not in sections:
+                continue
+            limit = request.args.get(f'{section}_limit', default_limit, type=int)
+            limits[section] = max(1, min(limit, SUMMARY_CONFIG['max_limit']))
+            statements.append((query + " LIMIT %s", (patient_id, limits[section] + 1)))
+
+        results = iter(execute_batch(statements))
+        summary = {}
+        if 'profile' in sections:
+            profile = next(results)
+            if not profile:
+                return jsonify({'success': False, 'error': 'Patient not found'}), 404
+            summary['profile'] = profile[0]
+            if current_user.user_type == 'patient':
+                summary['user'] = {
+                    'id': current_user.id,
+                    'email': current_user.email,
+                    'user_type': current_user.user_type,
+                    'reference_id': current_user.reference_id,
+                }
+        for section, limit in limits.items():
+            rows = next(results)
+            summary[section] = {'data': rows[:limit], 'has_more': len(rows) > limit}
+
+        return jsonify({'success': True, 'patient_id': patient_id, 'data': summary}), 200
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route("/api/healthreports", methods=["POST"])
 @login_required
 def write_report():
@@ -847,26 +1169,33 @@ def write_report():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['ReportID', 'PhysicianID', 'PatientID', 'ReportDate', 'Weight', 'Height']
+        required_fields = ['PhysicianID', 'PatientID', 'ReportDate', 'Weight', 'Height']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'ReportID')
+
+        report_id = next_id('HealthReport')
         query = """
             INSERT INTO HealthReport (ReportID, PhysicianID, PatientID, ReportDate, Weight, Height)
             VALUES (%s, %s, %s, %s, %s, %s)
         """
 
         execute_update(query, (
-                data['ReportID'],
+                report_id,
                 data['PhysicianID'],
                 data['PatientID'],
                 data['ReportDate'],
                 data['Weight'],
                 data['Height']
             ))
+        bump_versions(
+            'healthreports',
+            owner('healthreports', 'patient', data['PatientID']),
+            owner('healthreports', 'physician', data['PhysicianID'])
+        )
 
-        return jsonify({'success': True, 'message': 'Health report created successfully'}), 201
+        return jsonify({'success': True, 'message': 'Health report created successfully', 'ReportID': report_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -883,23 +1212,26 @@ def add_clinic():
             return jsonify({'success': False, 'error': 'Request body cannot be empty'}), 400
         
         # Validate required fields
-        required_fields = ['ClinicID', 'Name', 'Address']
+        required_fields = ['Name', 'Address']
         for field in required_fields:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing field: {field}'}), 400
-        
+        ignore_client_id(data, 'ClinicID')
+
+        clinic_id = next_id('Clinic')
         query = """
             INSERT INTO Clinic (ClinicID, Name, Address)
             VALUES (%s, %s, %s)
         """
 
         execute_update(query, (
-                data['ClinicID'],
+                clinic_id,
                 data['Name'],
                 data['Address']
             ))
+        cache.invalidate('clinics')
 
-        return jsonify({'success': True, 'message': 'Clinic created successfully'}), 201
+        return jsonify({'success': True, 'message': 'Clinic created successfully', 'ClinicID': clinic_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -907,6 +1239,7 @@ def add_clinic():
 
 @app.route("/api/clinics", methods=["GET"])
 @login_required
+@conditional('clinics')
 def get_clinic():
     try:
         clinic_id = request.args.get('clinic_id')
@@ -915,12 +1248,12 @@ def get_clinic():
             query = """
                 SELECT * FROM Clinic WHERE ClinicID = %s
             """
-            clinics = execute_query(query, (clinic_id,))
+            clinics = cache.get_or_load(('clinics',), ('clinics', clinic_id), lambda: execute_query(query, (clinic_id,)))
         else:
             query = """
                 SELECT * FROM Clinic
             """
-            clinics = execute_query(query)
+            clinics = cache.get_or_load(('clinics',), ('clinics',), lambda: execute_query(query))
 
         return jsonify({'success': True, 'data': clinics}), 200
     
@@ -956,6 +1289,8 @@ def add_worksat():
                 data['DateJoined'],
                 data['HourlyRate']
             ))
+        availability.invalidate_schedule(data['PhysicianID'], data['ClinicID'])
+        cache.invalidate('workassignments')
 
         return jsonify({'success': True, 'message': 'WorksAt record created successfully'}), 201
     
@@ -965,6 +1300,7 @@ def add_worksat():
 
 @app.route("/api/worksat", methods=["GET"])
 @login_required
+@conditional('workassignments')
 def get_worksat_by_physician():
     try:
         physician_id = request.args.get('physician_id')
@@ -986,6 +1322,7 @@ def get_worksat_by_physician():
 
 @app.route("/api/booked-timeslots", methods=["GET"])
 @login_required
+@conditional('appointments:physician:{args[physician_id]}', 'patients', 'physicians', 'clinics')
 def get_booked_timeslots():
     try:
         physician_id = request.args.get('physician_id')
@@ -1011,26 +1348,8 @@ def get_booked_timeslots():
         else:
             return jsonify({'success': False, 'error': 'Missing required parameters: physician_id and clinic_id'}), 400
 
-        booked_slots_raw = execute_query(query, params)
-        
-        # Convert timedelta objects to strings for JSON serialization
-        booked_slots = []
-        for slot in booked_slots_raw:
-            slot_copy = dict(slot)
-            # Convert timedelta to string format (HH:MM:SS)
-            if 'AppointmentTime' in slot_copy and slot_copy['AppointmentTime'] is not None:
-                time_delta = slot_copy['AppointmentTime']
-                total_seconds = int(time_delta.total_seconds())
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-                slot_copy['AppointmentTime'] = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-            
-            # Convert date to string format
-            if 'AppointmentDate' in slot_copy and slot_copy['AppointmentDate'] is not None:
-                slot_copy['AppointmentDate'] = slot_copy['AppointmentDate'].strftime('%Y-%m-%d')
-                
-            booked_slots.append(slot_copy)
+        # Dates encode as YYYY-MM-DD and TIME values as HH:MM:SS, the formats the booking page compares against
+        booked_slots = execute_query(query, params)
 
         return jsonify({'success': True, 'data': booked_slots}), 200
     
@@ -1038,53 +1357,123 @@ def get_booked_timeslots():
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
+@app.route("/api/availability", methods=["GET"])
+@login_required
+@conditional('appointments:physician:{args[physician_id]}', 'workassignments')
+def get_availability():
+    """Free 30-minute slots for a physician at a clinic, per day in [start_date, end_date]"""
+    try:
+        physician_id = request.args.get('physician_id', type=int)
+        clinic_id = request.args.get('clinic_id', type=int)
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        if not physician_id or not clinic_id or not start_date:
+            return jsonify({'success': False, 'error': 'Missing required parameters: physician_id, clinic_id and start_date'}), 400
+
+        days = availability.free_slots(physician_id, clinic_id, start_date, end_date)
+        return jsonify({'success': True, 'data': days}), 200
+
+    except LookupError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ==================== DATA FILTERING ENDPOINTS ====================
 @app.route('/api/data/patients', methods=['GET'])
 @login_required
+@conditional('patients')
 def get_patients_data():
     """Get all patients for data filtering"""
     try:
         if current_user.user_type not in ['physician', 'admin']:
             return jsonify({'success': False, 'error': 'Physician or admin access required'}), 403
         
-        query = """
+        select = """
             SELECT p.PatientID as id, p.Name as name, u.Email as email, p.DOB as dob, 
                    p.BloodType as bloodtype, p.PhoneNumber as phone, p.Address as address
             FROM Patient p
             LEFT JOIN User u ON u.ReferenceID = p.PatientID AND u.UserType = 'patient'
-            ORDER BY p.Name
         """
-        patients = execute_query(query)
+        args = page_args()
+        where, params = filter_condition(
+            args['filter'],
+            {'name': ('p.Name', 'contains'), 'email': ('u.Email', 'contains')},
+            ['p.PatientID', 'p.Name', 'u.Email', 'p.DOB', 'p.BloodType', 'p.PhoneNumber', 'p.Address']
+        )
+        patients, meta = fetch_page(
+            select,
+            [('p.Name', 'name', 'ASC'), ('p.PatientID', 'id', 'ASC')],
+            params=params,
+            where=where,
+            cursor=args['cursor'],
+            page_size=args['page_size'],
+            count_table='Patient' if args['include_total'] else None,
+            layout=args['layout']
+        )
         
-        return jsonify({'success': True, 'data': patients}), 200
+        return jsonify({'success': True, 'data': patients, **meta}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/data/physicians', methods=['GET'])
 @login_required 
+@conditional('physicians')
 def get_physicians_data():
     """Get all physicians for data filtering"""
     try:
         if current_user.user_type not in ['physician', 'admin']:
             return jsonify({'success': False, 'error': 'Physician or admin access required'}), 403
         
-        query = """
+        select = """
             SELECT p.PhysicianID as id, p.Name as name, u.Email as email, 
                    p.PhoneNumber as phone, p.Department as department
             FROM Physician p
             LEFT JOIN User u ON u.ReferenceID = p.PhysicianID AND u.UserType = 'physician'
-            ORDER BY p.Name
         """
-        physicians = execute_query(query)
+        args = page_args()
+        where, params = filter_condition(
+            args['filter'],
+            {'name': ('p.Name', 'contains'), 'department': ('p.Department', 'contains')},
+            ['p.PhysicianID', 'p.Name', 'u.Email', 'p.PhoneNumber', 'p.Department']
+        )
+
+        def load_page():
+            physicians, meta = fetch_page(
+                select,
+                [('p.Name', 'name', 'ASC'), ('p.PhysicianID', 'id', 'ASC')],
+                params=params,
+                where=where,
+                cursor=args['cursor'],
+                page_size=args['page_size'],
+                count_table='Physician' if args['include_total'] else None,
+                layout=args['layout']
+            )
+            return {'data': physicians, **meta}
+
+        result = cache.get_or_load(
+            ('physicians',),
+            ('data/physicians', args['filter'], args['cursor'], args['page_size'], args['include_total'],
+             args['layout']),
+            load_page
+        )
         
-        return jsonify({'success': True, 'data': physicians}), 200
+        return jsonify({'success': True, **result}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/data/clinics', methods=['GET'])
 @login_required
+@conditional('clinics')
 def get_clinics_data():
     """Get all clinics for data filtering"""
     try:
@@ -1094,9 +1483,27 @@ def get_clinics_data():
         query = """
             SELECT ClinicID as id, Name as name, Address as address
             FROM Clinic
-            ORDER BY Name
         """
-        clinics = execute_query(query)
+        text = request.args.get('filter', '').strip()
+        where, params = filter_condition(
+            text,
+            {'name': ('Name', 'contains'), 'address': ('Address', 'contains')},
+            ['ClinicID', 'Name', 'Address']
+        )
+        if where:
+            query += ' WHERE ' + where
+        query += ' ORDER BY Name'
+
+        layout = columnar_layout()
+        if layout:
+            def load_columns():
+                columns, rows = execute_columns(query, params)
+                return {'data': shape_columnar(columns, rows, layout), 'columns': columns, 'layout': layout}
+
+            result = cache.get_or_load(('clinics',), ('data/clinics', text, layout), load_columns)
+            return jsonify({'success': True, **result}), 200
+
+        clinics = cache.get_or_load(('clinics',), ('data/clinics', text), lambda: execute_query(query, params))
         
         return jsonify({'success': True, 'data': clinics}), 200
     except Exception as e:
@@ -1105,6 +1512,8 @@ def get_clinics_data():
 
 @app.route('/api/data/healthreports', methods=['GET'])
 @login_required
+@conditional('healthreports', 'prescriptions', 'patients', 'physicians')
+@date_format(DISPLAY_DATE)
 def get_health_reports_data():
     """Get all health reports for data filtering"""
     try:
@@ -1113,9 +1522,14 @@ def get_health_reports_data():
         
         show_prescriptions = request.args.get('show_prescriptions', 'false').lower() == 'true'
         include_prescription_ids = request.args.get('include_prescription_ids', 'false').lower() == 'true'
-        
+        stream_format = request.args.get('stream')
+        if stream_format and stream_format not in STREAM_FORMATS:
+            return jsonify({'success': False, 'error': 'stream must be json or ndjson'}), 400
+        if stream_format and columnar_layout():
+            return jsonify({'success': False, 'error': 'format=columnar cannot be combined with stream'}), 400
+
         if show_prescriptions:
-            query = """
+            select = """
                 SELECT hr.ReportID as id, hr.ReportDate as reportDate,
                        p.Name as physician, pt.Name as patient,
                        hr.PhysicianID as physicianId, hr.PatientID as patientId,
@@ -1127,10 +1541,11 @@ def get_health_reports_data():
                 JOIN Physician p ON p.PhysicianID = hr.PhysicianID
                 JOIN Patient pt ON pt.PatientID = hr.PatientID
                 LEFT JOIN Prescription pr ON pr.ReportID = hr.ReportID
-                ORDER BY hr.ReportDate DESC
             """
+            keys = [('hr.ReportDate', 'reportDate', 'DESC'), ('hr.ReportID', 'id', 'DESC'),
+                    ('pr.PrescriptionID', 'prescriptionId', 'ASC')]
         else:
-            query = """
+            select = """
                 SELECT hr.ReportID as id, hr.ReportDate as reportDate,
                        p.Name as physician, pt.Name as patient,
                        hr.PhysicianID as physicianId, hr.PatientID as patientId,
@@ -1138,12 +1553,85 @@ def get_health_reports_data():
                 FROM HealthReport hr
                 JOIN Physician p ON p.PhysicianID = hr.PhysicianID
                 JOIN Patient pt ON pt.PatientID = hr.PatientID
-                ORDER BY hr.ReportDate DESC
             """
-        reports = execute_query(query)
-        
-        # If including prescription IDs, aggregate them for each health report
-        if include_prescription_ids:
+            keys = [('hr.ReportDate', 'reportDate', 'DESC'), ('hr.ReportID', 'id', 'DESC')]
+
+        if stream_format:
+            # Whole table, row by row off a server-side cursor
+            if include_prescription_ids:
+                query = """
+                    SELECT hr.ReportID as id, hr.ReportDate as reportDate,
+                           p.Name as physician, pt.Name as patient,
+                           hr.PhysicianID as physicianId, hr.PatientID as patientId,
+                           hr.Weight as weight, hr.Height as height,
+                           pr.PrescriptionID as prescriptionId
+                    FROM HealthReport hr
+                    JOIN Physician p ON p.PhysicianID = hr.PhysicianID
+                    JOIN Patient pt ON pt.PatientID = hr.PatientID
+                    LEFT JOIN Prescription pr ON pr.ReportID = hr.ReportID
+                    ORDER BY hr.ReportDate DESC, hr.ReportID DESC, pr.PrescriptionID
+                """
+
+                def grouped(rows):
+                    # Rows for one report are adjacent, so fold them as they stream past
+                    for _, report_rows in itertools.groupby(rows, key=lambda row: row['id']):
+                        report_rows = list(report_rows)
+                        report = {key: value for key, value in report_rows[0].items() if key != 'prescriptionId'}
+                        report['prescriptionIds'] = [row['prescriptionId'] for row in report_rows if row['prescriptionId']]
+                        yield report
+
+                rows = grouped(stream_query(query))
+            else:
+                query = select + ' ORDER BY ' + ', '.join(f'{expression} {direction}' for expression, _, direction in keys)
+                rows = stream_query(query)
+            return stream_json_response(rows, stream_format)
+
+        args = page_args()
+        where, params = filter_condition(
+            args['filter'],
+            {
+                'id': ('hr.ReportID', 'eq'),
+                'patientid': ('hr.PatientID', 'eq'),
+                'patient id': ('hr.PatientID', 'eq'),
+                'physicianid': ('hr.PhysicianID', 'eq'),
+                'physician id': ('hr.PhysicianID', 'eq'),
+                # Matches the name or the "name (id)" form the table shows
+                'patient': ("CONCAT(pt.Name, ' (', hr.PatientID, ')')", 'contains'),
+                'physician': ("CONCAT(p.Name, ' (', hr.PhysicianID, ')')", 'contains'),
+            },
+            ['hr.ReportID', 'hr.ReportDate', 'p.Name', 'pt.Name', 'hr.PhysicianID', 'hr.PatientID',
+             'hr.Weight', 'hr.Height']
+        )
+        reports, meta = fetch_page(
+            select,
+            keys,
+            params=params,
+            where=where,
+            cursor=args['cursor'],
+            page_size=args['page_size'],
+            count_table='HealthReport' if args['include_total'] else None,
+            layout=args['layout']
+        )
+
+        # If including prescription IDs, aggregate them for each health report on this page
+        if include_prescription_ids and args['layout']:
+            # Columnar page: add them as one more column
+            columns, layout = meta['columns'], args['layout']
+            id_position = columns.index('id')
+            report_ids = reports[id_position] if layout == 'columns' else [row[id_position] for row in reports]
+            prescription_ids = {report_id: [] for report_id in report_ids}
+            if prescription_ids:
+                prescription_data = execute_query(
+                    "SELECT ReportID, PrescriptionID FROM Prescription WHERE ReportID IN ({}) "
+                    "ORDER BY PrescriptionID".format(','.join(['%s'] * len(prescription_ids))),
+                    list(prescription_ids)
+                )
+                for prescription in prescription_data:
+                    prescription_ids[prescription['ReportID']].append(prescription['PrescriptionID'])
+            reports = append_column(columns, reports, layout, 'prescriptionIds',
+                                    [prescription_ids[report_id] for report_id in report_ids])
+
+        elif include_prescription_ids and reports:
             reports_dict = {}
             for report in reports:
                 report_id = report['id']
@@ -1177,96 +1665,131 @@ def get_health_reports_data():
                     reports_dict[report_id]['prescriptionIds'].append(prescription['PrescriptionID'])
             
             reports = list(reports_dict.values())
-        
-        for report in reports:
-            if report.get('reportDate'):
-                report['reportDate'] = report['reportDate'].strftime('%a, %d %b %Y')
-            if show_prescriptions:
-                if report.get('startDate'):
-                    report['startDate'] = report['startDate'].strftime('%a, %d %b %Y')
-                if report.get('endDate'):
-                    report['endDate'] = report['endDate'].strftime('%a, %d %b %Y')
-        
-        return jsonify({'success': True, 'data': reports}), 200
+
+        return jsonify({'success': True, 'data': reports, **meta}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/data/workassignments', methods=['GET'])
 @login_required
+@conditional('workassignments')
+@date_format(DISPLAY_DATE)
 def get_work_assignments_data():
     try:
         if current_user.user_type not in ['physician', 'admin']:
             return jsonify({'success': False, 'error': 'Physician or admin access required'}), 403
         
-        query = """
+        select = """
             SELECT wa.ClinicID as clinicId, wa.PhysicianID as physicianId,
                    wa.ScheduleID as scheduleId, wa.DateJoined as dateJoined,
-                   wa.HourlyRate as hourlyRate,
-                   s.Monday, s.Tuesday, s.Wednesday, s.Thursday, s.Friday, s.Saturday, s.Sunday
+                   IF(wa.HourlyRate, CONCAT('$', wa.HourlyRate), wa.HourlyRate) as hourlyRate,
+                   CONCAT_WS(', ', IF(s.Monday, 'Mon', NULL), IF(s.Tuesday, 'Tue', NULL),
+                             IF(s.Wednesday, 'Wed', NULL), IF(s.Thursday, 'Thu', NULL),
+                             IF(s.Friday, 'Fri', NULL), IF(s.Saturday, 'Sat', NULL),
+                             IF(s.Sunday, 'Sun', NULL)) as workingDays
             FROM WorksAt wa
             JOIN Schedule s ON wa.ScheduleID = s.ScheduleID
-            ORDER BY wa.DateJoined DESC
         """
-        assignments = execute_query(query)
-        
-        for assignment in assignments:
-            working_days = []
-            if assignment.get('Monday'): working_days.append('Mon')
-            if assignment.get('Tuesday'): working_days.append('Tue') 
-            if assignment.get('Wednesday'): working_days.append('Wed')
-            if assignment.get('Thursday'): working_days.append('Thu')
-            if assignment.get('Friday'): working_days.append('Fri')
-            if assignment.get('Saturday'): working_days.append('Sat')
-            if assignment.get('Sunday'): working_days.append('Sun')
-            
-            assignment['workingDays'] = ', '.join(working_days)
-            
-            for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']:
-                assignment.pop(day, None)
-        
-        for assignment in assignments:
-            if assignment['hourlyRate']:
-                assignment['hourlyRate'] = f"${assignment['hourlyRate']}"
-            if assignment['dateJoined']:
-                assignment['dateJoined'] = assignment['dateJoined'].strftime('%a, %d %b %Y')
+        args = page_args()
+        where, params = filter_condition(
+            args['filter'],
+            {},
+            ['wa.ClinicID', 'wa.PhysicianID', 'wa.ScheduleID', 'wa.DateJoined', 'wa.HourlyRate']
+        )
+
+        def load_page():
+            assignments, meta = fetch_page(
+                select,
+                [('wa.DateJoined', 'dateJoined', 'DESC'), ('wa.ClinicID', 'clinicId', 'ASC'),
+                 ('wa.PhysicianID', 'physicianId', 'ASC')],
+                params=params,
+                where=where,
+                cursor=args['cursor'],
+                page_size=args['page_size'],
+                count_table='WorksAt' if args['include_total'] else None,
+                layout=args['layout']
+            )
+            return {'data': assignments, **meta}
+
+        result = cache.get_or_load(
+            ('workassignments',),
+            ('data/workassignments', args['filter'], args['cursor'], args['page_size'], args['include_total'],
+             args['layout']),
+            load_page
+        )
         
-        return jsonify({'success': True, 'data': assignments}), 200
+        return jsonify({'success': True, **result}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/data/prescriptions', methods=['GET'])
 @login_required
+@conditional('prescriptions')
+@date_format(DISPLAY_DATE)
 def get_prescriptions_data():
     """Get all prescriptions for data filtering"""
     try:
         if current_user.user_type not in ['physician', 'admin']:
             return jsonify({'success': False, 'error': 'Physician or admin access required'}), 403
         
-        query = """
+        select = """
             SELECT PrescriptionID as id, ReportID as healthReportId,
                    DrugName as drugName, Dosage as dosage, Frequency as frequency,
                    StartDate as startDate, EndDate as endDate,
                    Instructions as instructions
             FROM Prescription
-            ORDER BY PrescriptionID DESC
         """
-        prescriptions = execute_query(query)
-        
-        for prescription in prescriptions:
-            if prescription.get('startDate'):
-                prescription['startDate'] = prescription['startDate'].strftime('%a, %d %b %Y')
-            if prescription.get('endDate'):
-                prescription['endDate'] = prescription['endDate'].strftime('%a, %d %b %Y')
-        
-        return jsonify({'success': True, 'data': prescriptions}), 200
+
+        stream_format = request.args.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return jsonify({'success': False, 'error': 'stream must be json or ndjson'}), 400
+            if columnar_layout():
+                return jsonify({'success': False, 'error': 'format=columnar cannot be combined with stream'}), 400
+            rows = stream_query(select + ' ORDER BY PrescriptionID DESC')
+            return stream_json_response(rows, stream_format)
+
+        args = page_args()
+        where, params = filter_condition(
+            args['filter'],
+            {
+                'id': ('PrescriptionID', 'eq'),
+                'healthreportid': ('ReportID', 'eq'),
+                'health report id': ('ReportID', 'eq'),
+                'drugname': ('DrugName', 'contains'),
+                'dosage': ('Dosage', 'contains'),
+                'frequency': ('Frequency', 'contains'),
+            },
+            ['PrescriptionID', 'ReportID', 'DrugName', 'Dosage', 'Frequency', 'StartDate', 'EndDate',
+             'Instructions']
+        )
+        prescriptions, meta = fetch_page(
+            select,
+            [('PrescriptionID', 'id', 'DESC')],
+            params=params,
+            where=where,
+            cursor=args['cursor'],
+            page_size=args['page_size'],
+            count_table='Prescription' if args['include_total'] else None,
+            layout=args['layout']
+        )
+
+        return jsonify({'success': True, 'data': prescriptions, **meta}), 200
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/healthreports/<int:report_id>/download', methods=['GET'])
 @login_required
+@conditional('healthreports', 'prescriptions', 'patients', 'physicians')
 def get_health_report_for_download(report_id):
     """Get a single health report with prescription data for PDF download"""
     try:
@@ -1340,6 +1863,7 @@ def get_health_report_for_download(report_id):
 
 @app.route('/api/patient/healthreports/<int:report_id>/download', methods=['GET'])
 @login_required
+@conditional('healthreports', 'prescriptions', 'patients', 'physicians')
 def get_health_report_for_patient_download(report_id):
     """Get a single health report for patient PDF download"""
     try:
@@ -1411,9 +1935,7 @@ def create_schedule():
         if not days:
             return jsonify({'success': False, 'error': 'At least one day must be selected'}), 400
         
-        id_query = 'SELECT IFNULL(MAX(ScheduleID), 0) + 1 AS nextId FROM Schedule'
-        id_result = execute_query(id_query)
-        schedule_id = id_result[0]['nextId']
+        schedule_id = next_id('Schedule')
         
         schedule_data = {
             'Monday': 'Monday' in days,
@@ -1440,6 +1962,7 @@ def create_schedule():
             schedule_data['Saturday'],
             schedule_data['Sunday']
         ))
+        cache.invalidate('workassignments')
         
         return jsonify({'success': True, 'scheduleId': schedule_id}), 201
         
@@ -1471,6 +1994,8 @@ def create_work_assignment():
             data['dateJoined'],
             data['hourlyRate']
         ))
+        availability.invalidate_schedule(data['physicianId'], data['clinicId'])
+        cache.invalidate('workassignments')
         
         return jsonify({'success': True, 'message': 'Work assignment created successfully'}), 201
         
@@ -1521,6 +2046,8 @@ def delete_work_assignment():
             
             schedule_delete_query = "DELETE FROM Schedule WHERE ScheduleID = %s"
             execute_update(schedule_delete_query, (schedule_id,))
+            availability.invalidate_schedule(physician_id, clinic_id)
+            cache.invalidate('workassignments')
         else:
             return jsonify({'success': False, 'error': 'Work assignment not found'}), 404
         
@@ -1576,6 +2103,7 @@ def update_work_assignment():
                 schedule_data['Thursday'], schedule_data['Friday'], schedule_data['Saturday'],
                 schedule_data['Sunday'], schedule_id
             ))
+            availability.invalidate_schedule(physician_id, clinic_id)
         
         update_fields = []
         update_values = []
@@ -1595,6 +2123,8 @@ def update_work_assignment():
                 WHERE PhysicianID = %s AND ClinicID = %s
             """
             execute_update(update_query, tuple(update_values))
+
+        cache.invalidate('workassignments')
         
         return jsonify({'success': True, 'message': 'Work assignment updated successfully'}), 200
         
@@ -1623,15 +2153,14 @@ def create_clinic():
         if existing_clinic:
             return jsonify({'success': False, 'error': 'Clinic with this name and address already exists'}), 400
         
-        id_query = 'SELECT IFNULL(MAX(ClinicID), 0) + 1 AS nextId FROM Clinic'
-        id_result = execute_query(id_query)
-        clinic_id = id_result[0]['nextId']
+        clinic_id = next_id('Clinic')
         
         query = """
             INSERT INTO Clinic (ClinicID, Name, Address)
             VALUES (%s, %s, %s)
         """
         execute_update(query, (clinic_id, data['name'].strip(), data['address'].strip()))
+        cache.invalidate('clinics')
         
         return jsonify({'success': True, 'message': 'Clinic created successfully', 'clinicId': clinic_id}), 201
         
@@ -1639,6 +2168,88 @@ def create_clinic():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/import/<kind>', methods=['POST'])
+@login_required
+@admin_required
+def bulk_import_records(kind):
+    """
+    Bulk import patients, patient accounts or medical history.
+
+    Send the file as multipart 'file' or as the raw request body
+    (text/csv or application/x-ndjson); ?format=csv|ndjson overrides
+    detection. Rows are processed in chunks as they are read, and the
+    response lists the rows that failed.
+    """
+    try:
+        if kind not in IMPORT_KINDS:
+            return jsonify({'success': False, 'error': f'Unknown import kind: {kind}'}), 404
+
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(None, request.mimetype)
+
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'success': False, 'error': f'Unsupported format: {fmt}'}), 400
+
+        chunk_size = request.args.get('chunk_size', type=int)
+        report = import_stream(get_db(), kind, stream, fmt, chunk_size=chunk_size)
+
+        return jsonify({'success': True, **report.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/export/<name>', methods=['GET'])
+@login_required
+@admin_required
+def export_data(name):
+    """
+    Stream a whitelisted table or joined view as a file download.
+
+    Query params: format=csv|ndjson|parquet (default csv), compress=gzip|none
+    (CSV/NDJSON only, default gzip), since=<key> for an incremental export of
+    rows added after a previous run and overlap=<n> to re-read n keys below
+    it. The X-Export-High-Water-Mark header is the `since` for the next run.
+    """
+    try:
+        if name not in EXPORTS:
+            return jsonify({'success': False, 'error': f'Unknown export: {name}'}), 404
+
+        fmt = request.args.get('format', 'csv')
+        if fmt not in CONTENT_TYPES:
+            return jsonify({'success': False, 'error': f'Unsupported format: {fmt}'}), 400
+        if fmt == 'parquet' and pyarrow is None:
+            return jsonify({'success': False, 'error': 'Parquet export requires the pyarrow package'}), 501
+        compress = request.args.get('compress', 'gzip') != 'none'
+        since = request.args.get('since', type=int)
+        overlap = request.args.get('overlap', 0, type=int)
+
+        conn = get_db()
+        plan = plan_export(conn, name, since, overlap)
+        chunks = export_chunks(conn, plan, fmt, compress, on_abort=discard_db)
+
+        headers = {
+            'Content-Disposition': f'attachment; filename="{file_name(name, fmt, compress, since, plan["high_water_mark"])}"',
+        }
+        if plan['high_water_mark'] is not None:
+            headers['X-Export-High-Water-Mark'] = str(plan['high_water_mark'])
+        if compress and fmt != 'parquet':
+            mimetype = 'application/gzip'
+        else:
+            mimetype = CONTENT_TYPES[fmt]
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ==================== SERVE REACT APP ====================
 # Serve React App (for production)
 # This catch-all route should NOT match /api or /auth routes
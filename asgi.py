@@ -0,0 +1,291 @@
+"""
+ASGI serving mode.
+
+    uvicorn asgi:application --workers 4
+    python asgi.py
+
+The event loop owns the client sockets: request bodies are read and
+responses written asynchronously, so a slow client costs a coroutine, not
+a thread. Once a request has fully arrived the Flask app handles it
+unchanged on a small thread pool and hands its response back to the loop,
+so a thread is only busy while a handler actually runs. Endpoints
+registered with application.route() are native coroutines (using adb for
+the database) and never occupy a thread.
+
+Limitation: the Flask routes still query MySQL through blocking pymysql,
+so a handler thread is held for the whole of its database time. Slow
+*clients* are cheap, but slow *queries* are not: at most handler_threads
+requests are in the database at once and the rest wait for a thread.
+ASGI_CONFIG['handler_threads'] is sized to the connection pools for that
+reason. Only routes moved onto adb (currently /healthz) escape the limit.
+
+`python app.py` (threaded WSGI) keeps working as before.
+"""
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import adb
+from config import ASGI_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class ClientGone(Exception):
+    """The client disconnected while a response was being streamed"""
+
+
+class ASGIBridge:
+    """
+    Serve a WSGI app over ASGI with non-blocking client I/O.
+
+    Args:
+        wsgi_app: The Flask application
+        handler_threads: Threads available to run WSGI handlers
+        max_body: Largest request body accepted (413 above)
+        spool_threshold: Request body size kept in memory before spooling to disk
+        response_queue: Chunks a streaming response may run ahead of the client
+    """
+
+    def __init__(self, wsgi_app, handler_threads=16, max_body=256 * 1024 * 1024,
+                 spool_threshold=1024 * 1024, response_queue=16):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.spool_threshold = spool_threshold
+        self.response_queue = response_queue
+        self.executor = ThreadPoolExecutor(max_workers=handler_threads, thread_name_prefix='wsgi-handler')
+        self.routes = {}
+
+    def route(self, path, methods=('GET',)):
+        """Register a native async handler: async def handler(scope, receive, send)"""
+        def decorator(handler):
+            for method in methods:
+                self.routes[(method, path)] = handler
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            # No websocket endpoints
+            if scope['type'] == 'websocket':
+                await send({'type': 'websocket.close', 'code': 1000})
+            return
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+
+        body = await self._read_body(receive, send)
+        if body is not None:
+            await self._run_wsgi(scope, body, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                from db import close_pools
+                from ids import id_allocator
+                await adb.close_async_pools()
+                await asyncio.to_thread(close_pools)
+                await asyncio.to_thread(id_allocator.close)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive, send):
+        """Buffer the whole request body without holding a thread; None if the client left"""
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                body.close()
+                await send_json(send, 413, {'success': False, 'error': 'Request body too large'})
+                return None
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def _environ(self, scope, body):
+        path = scope['path']
+        root_path = scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        body.seek(0, 2)
+        length = body.tell()
+        body.seek(0)
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1')
+            value = value.decode('latin-1')
+            if name == 'content-length':
+                continue
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+                continue
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            if key in environ:
+                value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+            environ[key] = value
+        return environ
+
+    def _handle(self, environ, loop, queue, gone):
+        """Run the WSGI app in a handler thread, feeding the response to the loop"""
+        started = []
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=1)
+                except FutureTimeout:
+                    if gone.is_set():
+                        future.cancel()
+                        raise ClientGone()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started and started[0] is True:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [(status, headers)]
+            return lambda data: send_body(data)
+
+        def send_body(data):
+            if started and started[0] is not True:
+                put(('start',) + started[0])
+                started[:] = [True]
+            if data:
+                put(('body', data))
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    send_body(chunk)
+                    if gone.is_set():
+                        raise ClientGone()
+                send_body(b'')
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            put(('end',))
+        except ClientGone:
+            pass
+        except Exception as e:
+            if not gone.is_set():
+                put(('error', e))
+        finally:
+            environ['wsgi.input'].close()
+
+    async def _run_wsgi(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.response_queue)
+        gone = threading.Event()
+        environ = self._environ(scope, body)
+        handler = loop.run_in_executor(self.executor, self._handle, environ, loop, queue, gone)
+
+        started = False
+        try:
+            while True:
+                item = await queue.get()
+                if item[0] == 'start':
+                    _, status, headers = item
+                    await send({
+                        'type': 'http.response.start',
+                        'status': int(status.split(' ', 1)[0]),
+                        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+                    })
+                    started = True
+                elif item[0] == 'body':
+                    await send({'type': 'http.response.body', 'body': item[1], 'more_body': True})
+                elif item[0] == 'end':
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                    break
+                else:
+                    logger.error("Unhandled error in %s %s", scope['method'], scope['path'], exc_info=item[1])
+                    if not started:
+                        await send_json(send, 500, {'success': False, 'error': 'Internal server error'})
+                    break
+        finally:
+            gone.set()
+            # Free queue space so a handler blocked in put() wakes up, sees the
+            # disconnect and releases its resources; then wait for it to finish
+            while not queue.empty():
+                queue.get_nowait()
+            await handler
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def create_application(wsgi_app=None):
+    if wsgi_app is None:
+        from app import app as wsgi_app
+    application = ASGIBridge(wsgi_app, **ASGI_CONFIG)
+
+    @application.route('/healthz')
+    async def health(scope, receive, send):
+        """Liveness plus a database round trip, without using a handler thread"""
+        try:
+            await adb.execute_one("SELECT 1 AS ok", role='admin')
+        except Exception as e:
+            await send_json(send, 503, {'status': 'unavailable', 'error': str(e)})
+            return
+        await send_json(send, 200, {'status': 'ok'})
+
+    return application
+
+
+application = create_application()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('ASGI mode needs an ASGI server: pip install uvicorn (or run python app.py for WSGI)')
+    uvicorn.run('asgi:application', host='0.0.0.0', port=5000)
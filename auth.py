@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from models import User
-from db import execute_update, execute_one
+from db import execute_update
+from hashing import hash_password, HashingBusyError
+from ids import next_id
+from cache import cache
+from etags import bump_versions
+from search import search_index
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -50,7 +55,10 @@ def api_login():
     if not data or 'email' not in data or 'password' not in data:
         return jsonify({'success': False, 'error': 'Email and password are required'}), 400
 
-    user = User.verify_password(data['email'], data['password'])
+    try:
+        user = User.verify_password(data['email'], data['password'])
+    except HashingBusyError:
+        return jsonify({'success': False, 'error': 'Server busy, please retry'}), 503
 
     if user:
         if not user.is_active:
@@ -123,9 +131,11 @@ def register_patient():
         return jsonify({'success': False, 'error': 'Email already registered'}), 400
 
     try:
-        # Get max PatientID and increment
-        result = execute_one("SELECT MAX(PatientID) as max_id FROM Patient")
-        new_patient_id = (result['max_id'] or 0) + 1
+        # Hash first so a busy hashing pool fails before anything is written
+        password_hash = hash_password(data['password'])
+
+        # Allocate the next PatientID (no MAX() scan, safe under concurrent registrations)
+        new_patient_id = next_id('Patient')
 
         # Create patient record
         patient_query = """
@@ -146,8 +156,13 @@ def register_patient():
             email=data['email'],
             password=data['password'],
             user_type='patient',
-            reference_id=new_patient_id
+            reference_id=new_patient_id,
+            password_hash=password_hash
         )
+        bump_versions('patients')
+        search_index.add('patient', new_patient_id, {
+            'Name': data['name'], 'PhoneNumber': data['phone_number'], 'Address': data['address']
+        })
 
         return jsonify({
             'success': True,
@@ -155,6 +170,8 @@ def register_patient():
             'user_id': user.id
         }), 201
 
+    except HashingBusyError:
+        return jsonify({'success': False, 'error': 'Server busy, please retry'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
@@ -186,9 +203,11 @@ def register_physician():
         return jsonify({'success': False, 'error': 'Email already registered'}), 400
 
     try:
-        # Get max PhysicianID and increment
-        result = execute_one("SELECT MAX(PhysicianID) as max_id FROM Physician")
-        new_physician_id = (result['max_id'] or 0) + 1
+        # Hash first so a busy hashing pool fails before anything is written
+        password_hash = hash_password(data['password'])
+
+        # Allocate the next PhysicianID (no MAX() scan, safe under concurrent registrations)
+        new_physician_id = next_id('Physician')
 
         # Create physician record
         physician_query = """
@@ -206,8 +225,11 @@ def register_physician():
             email=data['email'],
             password=data['password'],
             user_type='physician',
-            reference_id=new_physician_id
+            reference_id=new_physician_id,
+            password_hash=password_hash
         )
+        cache.invalidate('physicians')
+        search_index.add('physician', new_physician_id, {'Name': data['name'], 'Department': data['department']})
 
         return jsonify({
             'success': True,
@@ -215,5 +237,43 @@ def register_physician():
             'user_id': user.id
         }), 201
 
+    except HashingBusyError:
+        return jsonify({'success': False, 'error': 'Server busy, please retry'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
+
+
+def _set_user_active(user_id, active):
+    """Shared body of the admin activate/deactivate endpoints"""
+    try:
+        if User.get_by_id(user_id) is None:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+
+        User.set_active(user_id, active)
+
+        return jsonify({
+            'success': True,
+            'message': 'User activated' if active else 'User deactivated',
+            'user_id': user_id,
+            'active': active
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@auth_bp.route('/users/<int:user_id>/activate', methods=['POST'])
+@login_required
+@admin_required
+def activate_user(user_id):
+    """Re-enable a deactivated account (admin only)"""
+    return _set_user_active(user_id, True)
+
+
+@auth_bp.route('/users/<int:user_id>/deactivate', methods=['POST'])
+@login_required
+@admin_required
+def deactivate_user(user_id):
+    """Deactivate an account; its open sessions end on their next request (admin only)"""
+    if user_id == current_user.id:
+        return jsonify({'success': False, 'error': 'Cannot deactivate your own account'}), 400
+    return _set_user_active(user_id, False)
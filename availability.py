@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from config import AVAILABILITY_CONFIG
+from db import execute_query, execute_one
+
+SLOT_MINUTES = 30
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def slot_index(value):
+    """30-minute slot number (0-47) for a TIME value, 'HH:MM[:SS]' string or timedelta"""
+    if isinstance(value, timedelta):
+        minutes = int(value.total_seconds()) // 60
+    else:
+        hours, minutes = str(value).split(':')[:2]
+        minutes = int(hours) * 60 + int(minutes)
+    return minutes // SLOT_MINUTES
+
+
+def slot_time(index):
+    """'HH:MM:SS' start time of a slot number"""
+    minutes = index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class AvailabilityEngine:
+    """
+    Precomputed physician availability as per-day slot bitmaps.
+
+    Two small caches answer every availability question without joins:
+      - (physician, clinic) -> weekday bitmask from WorksAt/Schedule
+      - (physician, date)   -> bitmap of booked 30-minute slots
+
+    Bookings are per physician (a physician can't be in two clinics at
+    once), so the booked bitmap is shared across clinics. Bookings and
+    cancellations made through this process update the bitmaps in place;
+    the TTL picks up changes made by other processes.
+
+    Both caches are served to every user, so they are loaded from the
+    primary: a lagging replica would hide a booking just made from everyone
+    until the TTL ran out.
+
+    Args:
+        slot_times: Bookable slot start times ('HH:MM')
+        ttl: Seconds before a cached entry is re-read from the database
+        max_entries: Maximum cached physician-day bitmaps
+        max_schedules: Maximum cached (physician, clinic) weekday masks
+        max_range_days: Longest range free_slots accepts
+    """
+
+    def __init__(self, slot_times, ttl=60, max_entries=50000, max_schedules=10000, max_range_days=62):
+        self.bookable = 0
+        for value in slot_times:
+            self.bookable |= 1 << slot_index(value)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_schedules = max_schedules
+        self.max_range_days = max_range_days
+
+        self._lock = threading.Lock()
+        self._schedules = OrderedDict()  # (physician, clinic) -> (weekday mask or None, expires_at)
+        self._booked = OrderedDict()     # (physician, date) -> (booked bitmap, expires_at)
+        self._changes = {}               # physician -> bookings/cancellations seen by this process
+
+    # ---- loading ----
+
+    def _weekday_mask(self, physician_id, clinic_id):
+        key = (physician_id, clinic_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._schedules.get(key)
+            if entry and entry[1] > now:
+                self._schedules.move_to_end(key)
+                return entry[0]
+
+        row = execute_one("""
+            SELECT s.Monday, s.Tuesday, s.Wednesday, s.Thursday, s.Friday, s.Saturday, s.Sunday
+            FROM WorksAt w
+            JOIN Schedule s ON s.ScheduleID = w.ScheduleID
+            WHERE w.PhysicianID = %s AND w.ClinicID = %s
+        """, (physician_id, clinic_id), primary=True)
+
+        mask = None
+        if row:
+            mask = 0
+            for day, name in enumerate(WEEKDAYS):
+                if row[name]:
+                    mask |= 1 << day
+        with self._lock:
+            self._schedules[key] = (mask, now + self.ttl)
+            self._schedules.move_to_end(key)
+            while len(self._schedules) > self.max_schedules:
+                self._schedules.popitem(last=False)
+        return mask
+
+    def _booked_bitmaps(self, physician_id, start, end):
+        """Booked bitmap for every date in [start, end], loading missing days in one query"""
+        now = time.monotonic()
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        result = {}
+        with self._lock:
+            changes = self._changes.get(physician_id, 0)
+            for day in days:
+                entry = self._booked.get((physician_id, day))
+                if entry and entry[1] > now:
+                    result[day] = entry[0]
+                    self._booked.move_to_end((physician_id, day))
+
+        missing = [day for day in days if day not in result]
+        if missing:
+            rows = execute_query("""
+                SELECT AppointmentDate, AppointmentTime
+                FROM Appointment
+                WHERE PhysicianID = %s AND AppointmentDate BETWEEN %s AND %s
+            """, (physician_id, missing[0], missing[-1]), primary=True)
+
+            loaded = {day: 0 for day in missing}
+            for row in rows:
+                day = to_date(row['AppointmentDate'])
+                if day in loaded and row['AppointmentTime'] is not None:
+                    loaded[day] |= 1 << slot_index(row['AppointmentTime'])
+
+            with self._lock:
+                # A booking or cancellation since the read may be missing from it: use it, don't keep it
+                if self._changes.get(physician_id, 0) == changes:
+                    for day, bitmap in loaded.items():
+                        self._booked[(physician_id, day)] = (bitmap, now + self.ttl)
+                        self._booked.move_to_end((physician_id, day))
+                    while len(self._booked) > self.max_entries:
+                        self._booked.popitem(last=False)
+            result.update(loaded)
+        return result
+
+    # ---- queries ----
+
+    def free_slots(self, physician_id, clinic_id, start, end=None):
+        """
+        Free slots for a physician at a clinic over a date range.
+
+        Returns:
+            List of {'date', 'working', 'free'} dicts, one per day; 'free' holds
+            'HH:MM:SS' slot start times
+        """
+        start = to_date(start)
+        end = to_date(end) if end else start
+        if end < start:
+            raise ValueError('end_date must not be before start_date')
+        if (end - start).days + 1 > self.max_range_days:
+            raise ValueError(f'Date range cannot exceed {self.max_range_days} days')
+
+        weekdays = self._weekday_mask(physician_id, clinic_id)
+        if weekdays is None:
+            raise LookupError('Physician has no work schedule at this clinic')
+
+        booked = self._booked_bitmaps(physician_id, start, end)
+        days = []
+        for day in sorted(booked):
+            working = bool(weekdays >> day.weekday() & 1)
+            free = self.bookable & ~booked[day] if working else 0
+            days.append({
+                'date': day.isoformat(),
+                'working': working,
+                'free': [slot_time(index) for index in range(48) if free >> index & 1],
+            })
+        return days
+
+    # ---- incremental updates ----
+
+    def _update_booked(self, physician_id, appointment_date, appointment_time, booked):
+        key = (int(physician_id), to_date(appointment_date))
+        bit = 1 << slot_index(appointment_time)
+        with self._lock:
+            self._changes[key[0]] = self._changes.get(key[0], 0) + 1
+            entry = self._booked.get(key)
+            if entry:
+                bitmap = entry[0] | bit if booked else entry[0] & ~bit
+                self._booked[key] = (bitmap, entry[1])
+
+    def mark_booked(self, physician_id, appointment_date, appointment_time):
+        """Record a booking made by this process"""
+        self._update_booked(physician_id, appointment_date, appointment_time, True)
+
+    def mark_free(self, physician_id, appointment_date, appointment_time):
+        """Record a cancellation made by this process"""
+        self._update_booked(physician_id, appointment_date, appointment_time, False)
+
+    def invalidate_schedule(self, physician_id, clinic_id):
+        """Forget a cached weekday mask after a work assignment/schedule change"""
+        with self._lock:
+            self._schedules.pop((int(physician_id), int(clinic_id)), None)
+
+
+availability = AvailabilityEngine(**AVAILABILITY_CONFIG)
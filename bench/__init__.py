@@ -0,0 +1,7 @@
+"""
+Reproducible benchmark suite.
+
+    python -m bench.run --scale small --requests 5000 --workers 8
+
+See bench/README.md for the options and the baseline workflow.
+"""
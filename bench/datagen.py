@@ -0,0 +1,189 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+Rows are generated from a seeded RNG and bulk-inserted with multi-row
+INSERTs (FK/unique checks off), appended after whatever the seed data in
+COMMANDS.sql already created. IdSequence is moved past the new rows so
+the app keeps allocating fresh IDs.
+"""
+import random
+from datetime import date, timedelta
+
+import bcrypt
+
+from config import HASHING_CONFIG
+from ids import SEQUENCES
+
+BENCH_PASSWORD = 'benchpass123'
+ADMIN_EMAIL = 'bench.admin@example.com'
+
+SCALES = {
+    'tiny':   {'patients': 1000,      'physicians': 50,     'appointments': 10000},
+    'small':  {'patients': 10000,     'physicians': 200,    'appointments': 100000},
+    'medium': {'patients': 100000,    'physicians': 2000,   'appointments': 1000000},
+    'large':  {'patients': 1000000,   'physicians': 10000,  'appointments': 10000000},
+}
+
+SLOT_TIMES = ['09:00:00', '09:30:00', '10:00:00', '10:30:00', '11:00:00', '11:30:00',
+              '13:00:00', '13:30:00', '14:00:00', '14:30:00', '15:00:00', '15:30:00']
+FIRST_NAMES = ['Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+               'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Yara']
+LAST_NAMES = ['Smith', 'Johnson', 'Lee', 'Brown', 'Garcia', 'Miller', 'Davis', 'Lopez', 'Wilson', 'Clark']
+DEPARTMENTS = ['Cardiology', 'Neurology', 'Pediatrics', 'Oncology', 'Radiology', 'General', 'Dermatology']
+BLOOD_TYPES = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+DRUGS = ['Amoxicillin', 'Ibuprofen', 'Metformin', 'Lisinopril', 'Atorvastatin', 'Omeprazole']
+
+
+def scale_counts(scale, **overrides):
+    """Row counts for a named scale, with explicit counts taking precedence"""
+    counts = dict(SCALES[scale])
+    counts.update({name: value for name, value in overrides.items() if value is not None})
+    counts.setdefault('clinics', max(5, counts['physicians'] // 10))
+    counts.setdefault('reports', counts['appointments'] // 4)
+    return counts
+
+
+def insert_rows(cursor, table, columns, rows, chunk_size=5000):
+    """Multi-row INSERT of an iterable of tuples in chunks; returns the row count"""
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            cursor.executemany(query, chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(query, chunk)
+        total += len(chunk)
+    return total
+
+
+def next_free_id(cursor, table, column):
+    cursor.execute(f"SELECT IFNULL(MAX({column}), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def generate(conn, counts, seed=42, start=date(2024, 1, 1), log=print):
+    """
+    Insert a synthetic data set.
+
+    Args:
+        conn: pymysql connection to the application database (plain cursor)
+        counts: Row counts from scale_counts()
+        seed: RNG seed; the same seed and counts give the same data
+        start: First appointment date
+        log: Progress callback
+
+    Returns:
+        Manifest dict describing the generated IDs and bench accounts
+    """
+    rng = random.Random(seed)
+    cursor = conn.cursor()
+    cursor.execute("SET foreign_key_checks = 0, unique_checks = 0")
+
+    first = {
+        'clinic': next_free_id(cursor, 'Clinic', 'ClinicID'),
+        'schedule': next_free_id(cursor, 'Schedule', 'ScheduleID'),
+        'physician': next_free_id(cursor, 'Physician', 'PhysicianID'),
+        'patient': next_free_id(cursor, 'Patient', 'PatientID'),
+        'appointment': next_free_id(cursor, 'Appointment', 'AppointmentID'),
+        'report': next_free_id(cursor, 'HealthReport', 'ReportID'),
+        'prescription': next_free_id(cursor, 'Prescription', 'PrescriptionID'),
+    }
+    clinics = range(first['clinic'], first['clinic'] + counts['clinics'])
+    physicians = range(first['physician'], first['physician'] + counts['physicians'])
+    patients = range(first['patient'], first['patient'] + counts['patients'])
+
+    log(f"clinics: {insert_rows(cursor, 'Clinic', ('ClinicID', 'Name', 'Address'), ((c, f'Clinic {c}', f'{c} Bench Rd') for c in clinics))}")
+    log(f"physicians: {insert_rows(cursor, 'Physician', ('PhysicianID', 'Name', 'PhoneNumber', 'Department'), ((p, 'Dr. ' + name(rng), f'555{p:07d}', rng.choice(DEPARTMENTS)) for p in physicians))}")
+    log(f"patients: {insert_rows(cursor, 'Patient', ('PatientID', 'Name', 'DOB', 'BloodType', 'PhoneNumber', 'Address'), ((p, name(rng), date(1940, 1, 1) + timedelta(days=rng.randrange(30000)), rng.choice(BLOOD_TYPES), f'556{p:07d}', f'{p} Patient St') for p in patients))}")
+
+    # Every physician works at one clinic with a 3-5 day week
+    workdays = {}
+    assignments = {}
+    schedules = []
+    for offset, physician_id in enumerate(physicians):
+        days = sorted(rng.sample(range(7), rng.randint(3, 5)))
+        workdays[physician_id] = days
+        assignments[physician_id] = clinics[offset % len(clinics)]
+        schedules.append((first['schedule'] + offset,) + tuple(day in days for day in range(7)))
+    insert_rows(cursor, 'Schedule', ('ScheduleID', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'), schedules)
+    log(f"work assignments: {insert_rows(cursor, 'WorksAt', ('ClinicID', 'PhysicianID', 'ScheduleID', 'DateJoined', 'HourlyRate'), ((assignments[p], p, first['schedule'] + offset, start - timedelta(days=rng.randrange(3650)), rng.randint(80, 300)) for offset, p in enumerate(physicians)))}")
+
+    # Appointments fill each physician's working days slot by slot, so the
+    # (physician, date, time) unique index is never violated
+    monday = start - timedelta(days=start.weekday())
+
+    def appointments():
+        for index in range(counts['appointments']):
+            physician_id = physicians[index % len(physicians)]
+            slot = index // len(physicians)
+            days = workdays[physician_id]
+            day_number, slot_index = divmod(slot, len(SLOT_TIMES))
+            weeks, weekday = divmod(day_number, len(days))
+            yield (
+                first['appointment'] + index,
+                assignments[physician_id],
+                rng.choice(patients),
+                physician_id,
+                monday + timedelta(days=weeks * 7 + days[weekday]),
+                SLOT_TIMES[slot_index],
+            )
+    log(f"appointments: {insert_rows(cursor, 'Appointment', ('AppointmentID', 'ClinicID', 'PatientID', 'PhysicianID', 'AppointmentDate', 'AppointmentTime'), appointments())}")
+
+    def reports():
+        for index in range(counts['reports']):
+            yield (first['report'] + index, rng.choice(physicians), rng.choice(patients),
+                   start + timedelta(days=rng.randrange(730)), rng.randint(45, 120), rng.randint(150, 200))
+    log(f"health reports: {insert_rows(cursor, 'HealthReport', ('ReportID', 'PhysicianID', 'PatientID', 'ReportDate', 'Weight', 'Height'), reports())}")
+
+    def prescriptions():
+        for index in range(counts['reports']):
+            started = start + timedelta(days=rng.randrange(730))
+            yield (first['prescription'] + index, first['report'] + index, rng.choice(DRUGS), '10mg', 'Daily',
+                   started, started + timedelta(days=rng.randint(5, 60)), 'Take with water')
+    log(f"prescriptions: {insert_rows(cursor, 'Prescription', ('PrescriptionID', 'ReportID', 'DrugName', 'Dosage', 'Frequency', 'StartDate', 'EndDate', 'Instructions'), prescriptions())}")
+
+    # One bcrypt hash shared by every bench account keeps generation fast
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(rounds=HASHING_CONFIG['rounds'])).decode()
+
+    def users():
+        yield (ADMIN_EMAIL, password_hash, 'admin', None)
+        for physician_id in physicians:
+            yield (f'bench.physician{physician_id}@example.com', password_hash, 'physician', physician_id)
+        for patient_id in patients:
+            yield (f'bench.patient{patient_id}@example.com', password_hash, 'patient', patient_id)
+    cursor.execute("DELETE FROM User WHERE Email LIKE 'bench.%@example.com'")
+    log(f"users: {insert_rows(cursor, 'User', ('Email', 'PasswordHash', 'UserType', 'ReferenceID'), users())}")
+
+    cursor.execute("SET foreign_key_checks = 1, unique_checks = 1")
+
+    # Move every sequence past the generated rows
+    for sequence, (table, column) in SEQUENCES.items():
+        cursor.execute(
+            f"INSERT INTO IdSequence (Name, NextID) SELECT %s, IFNULL(MAX({column}), 0) + 1 FROM {table} "
+            f"ON DUPLICATE KEY UPDATE NextID = VALUES(NextID)",
+            (sequence,)
+        )
+    for table in ('Patient', 'Physician', 'Clinic', 'Schedule', 'WorksAt', 'Appointment', 'HealthReport', 'Prescription', 'User'):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    conn.commit()
+    cursor.close()
+
+    return {
+        'seed': seed,
+        'counts': counts,
+        'clinics': [clinics.start, clinics.stop],
+        'physicians': [physicians.start, physicians.stop],
+        'patients': [patients.start, patients.stop],
+        'assignments': {str(p): assignments[p] for p in physicians},
+        'password': BENCH_PASSWORD,
+        'admin_email': ADMIN_EMAIL,
+    }
@@ -0,0 +1,102 @@
+"""Latency/throughput summaries and baseline comparison"""
+import json
+import math
+import os
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """
+    Per-endpoint statistics.
+
+    Returns:
+        {endpoint: {count, errors, p50_ms, p95_ms, p99_ms, mean_ms, rps}} plus
+        an 'ALL' entry for the whole run
+    """
+    groups = {}
+    for sample in samples:
+        groups.setdefault(sample.endpoint, []).append(sample)
+    groups['ALL'] = list(samples)
+
+    results = {}
+    for endpoint, group in groups.items():
+        latencies = sorted(sample.seconds * 1000 for sample in group)
+        results[endpoint] = {
+            'count': len(group),
+            'errors': sum(1 for sample in group if sample.status >= 500),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'rps': round(len(group) / elapsed, 2) if elapsed else 0.0,
+        }
+    return results
+
+
+def compare(results, baseline, tolerance=0.10):
+    """
+    Compare a run against a baseline.
+
+    An endpoint regresses when its p95 or p99 is more than `tolerance`
+    above the baseline, or its throughput more than `tolerance` below.
+
+    Returns:
+        {endpoint: {metric: (baseline, current, relative change)}} and the
+        list of regression descriptions
+    """
+    deltas = {}
+    regressions = []
+    for endpoint, current in results.items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if not before:
+            continue
+        deltas[endpoint] = {}
+        for metric, worse_when_higher in (('p50_ms', True), ('p95_ms', True), ('p99_ms', True), ('rps', False)):
+            old, new = before[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            deltas[endpoint][metric] = (old, new, change)
+            regressed = change > tolerance if worse_when_higher else change < -tolerance
+            if regressed and metric != 'p50_ms':
+                regressions.append(f"{endpoint}: {metric} {old} -> {new} ({change:+.1%})")
+    return deltas, regressions
+
+
+def format_table(results, deltas=None):
+    deltas = deltas or {}
+    lines = [f"{'endpoint':<34} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>9}  vs baseline (p95)"]
+    for endpoint in sorted(results, key=lambda name: (name == 'ALL', name)):
+        row = results[endpoint]
+        change = deltas.get(endpoint, {}).get('p95_ms')
+        suffix = f"{change[2]:+.1%}" if change else ''
+        lines.append(
+            f"{endpoint:<34} {row['count']:>7} {row['errors']:>5} {row['p50_ms']:>9.2f} "
+            f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['rps']:>9.1f}  {suffix}"
+        )
+    return '\n'.join(lines)
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def load_baseline(name):
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(name, results, meta):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), 'w') as f:
+        json.dump({'meta': meta, 'endpoints': results}, f, indent=2, sort_keys=True)
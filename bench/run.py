@@ -0,0 +1,130 @@
+"""
+Benchmark runner.
+
+Usage:
+    python -m bench.run --scale small                        # start mysqld, load data, replay traffic
+    python -m bench.run --scale small --save-baseline        # store results as bench/baselines/small.json
+    python -m bench.run --scale large --requests 50000 --workers 32 --fail-on-regression
+    python -m bench.run --external --manifest bench.json     # use the server in config.py (loads data once)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+import pymysql
+
+import config
+from bench.datagen import SCALES, generate, scale_counts
+from bench.report import compare, format_table, load_baseline, save_baseline, summarize
+from bench.server import MySQLServer, bootstrap_schema
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the HealthSystem API')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--patients', type=int)
+    parser.add_argument('--physicians', type=int)
+    parser.add_argument('--appointments', type=int)
+    parser.add_argument('--reports', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=5000, help='measured requests')
+    parser.add_argument('--warmup', type=int, default=200, help='unmeasured requests issued first')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--external', action='store_true',
+                        help='use the MySQL server from config.py instead of starting one')
+    parser.add_argument('--manifest', help='data set manifest to reuse (external mode) or write')
+    parser.add_argument('--workdir', help='data directory for the started server (reused if it exists)')
+    parser.add_argument('--keep-server', action='store_true', help="don't delete the started server's data")
+    parser.add_argument('--baseline', help='baseline name (defaults to the scale)')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative p95/p99/throughput change')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit 1 if the baseline comparison regresses')
+    parser.add_argument('--output', help='write the full results as JSON')
+    return parser.parse_args(argv)
+
+
+def load_data(conn, args, counts):
+    if args.manifest and os.path.exists(args.manifest):
+        with open(args.manifest) as f:
+            return json.load(f)
+    manifest = generate(conn, counts, seed=args.seed, log=lambda message: print(f"  {message}"))
+    if args.manifest:
+        with open(args.manifest, 'w') as f:
+            json.dump(manifest, f)
+    return manifest
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    counts = scale_counts(args.scale, patients=args.patients, physicians=args.physicians,
+                          appointments=args.appointments, reports=args.reports)
+    server = None
+    try:
+        if args.external:
+            admin = config.get_db_config('admin')
+            conn = pymysql.connect(host=admin['host'], port=admin['port'], user=admin['user'],
+                                   password=admin['password'], database=admin['database'])
+        else:
+            print(f"Starting MySQL server ({counts})...")
+            server = MySQLServer(workdir=args.workdir, keep=args.keep_server or bool(args.workdir)).start()
+            conn = server.connect()
+            bootstrap_schema(conn)
+            conn.select_db(config.DATABASE_CONFIG['database'])
+            # Point the app's pools at the private server
+            config.DATABASE_CONFIG.update(host='localhost', port=server.port)
+
+        print('Loading data...')
+        manifest = load_data(conn, args, counts)
+        conn.close()
+
+        from app import app
+        from bench.traffic import run_traffic
+
+        print(f"Replaying {args.requests} requests with {args.workers} workers...")
+        samples, elapsed = run_traffic(app, manifest, requests=args.requests, workers=args.workers,
+                                       warmup=args.warmup, seed=args.seed)
+    finally:
+        if server:
+            server.stop()
+
+    results = summarize(samples, elapsed)
+    meta = {
+        'scale': args.scale,
+        'counts': manifest['counts'],
+        'requests': args.requests,
+        'workers': args.workers,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+
+    baseline_name = args.baseline or args.scale
+    baseline = load_baseline(baseline_name)
+    deltas, regressions = compare(results, baseline, args.tolerance) if baseline else ({}, [])
+
+    print()
+    print(format_table(results, deltas))
+    print(f"\n{len(samples)} requests in {elapsed:.1f}s")
+    if baseline is None:
+        print(f"No baseline '{baseline_name}' yet (use --save-baseline)")
+    elif regressions:
+        print(f"\nRegressions vs baseline '{baseline_name}' (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+    else:
+        print(f"\nNo regressions vs baseline '{baseline_name}'")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'endpoints': results, 'regressions': regressions}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(baseline_name, results, meta)
+        print(f"Saved baseline '{baseline_name}'")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
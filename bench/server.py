@@ -0,0 +1,140 @@
+"""Throwaway MySQL/MariaDB server for benchmark runs"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+import pymysql
+
+from migrate import apply_migrations, split_script, split_statements
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find_server_binary():
+    """Path of mysqld/mariadbd ($BENCH_MYSQLD wins), or None"""
+    override = os.environ.get('BENCH_MYSQLD')
+    if override:
+        return override
+    return shutil.which('mariadbd') or shutil.which('mysqld')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class MySQLServer:
+    """
+    Start a private mysqld on a temporary data directory.
+
+    Tuned for bulk loading rather than durability (no binlog, relaxed
+    flushing). The data directory is removed on stop() unless keep=True.
+
+    Args:
+        binary: mysqld/mariadbd path (defaults to find_server_binary())
+        workdir: Directory for the data files (defaults to a temp dir)
+        port: TCP port (defaults to a free one)
+        buffer_pool: InnoDB buffer pool size, e.g. '1G'
+        keep: Leave the data directory behind for inspection or reuse
+    """
+
+    def __init__(self, binary=None, workdir=None, port=None, buffer_pool='1G', keep=False):
+        self.binary = binary or find_server_binary()
+        if not self.binary:
+            raise RuntimeError('No mysqld/mariadbd found on PATH; set BENCH_MYSQLD or use --external')
+        self.workdir = workdir or tempfile.mkdtemp(prefix='healthsystem-bench-')
+        self.datadir = os.path.join(self.workdir, 'data')
+        self.socket = os.path.join(self.workdir, 'mysqld.sock')
+        self.port = port or free_port()
+        self.buffer_pool = buffer_pool
+        self.keep = keep
+        self.process = None
+
+    @property
+    def is_mariadb(self):
+        version = subprocess.run([self.binary, '--version'], capture_output=True, text=True).stdout
+        return 'mariadb' in version.lower()
+
+    def _user_args(self):
+        # mysqld refuses to run as root without being told to
+        return ['--user=root'] if hasattr(os, 'geteuid') and os.geteuid() == 0 else []
+
+    def _initialize(self):
+        if os.path.isdir(self.datadir):
+            return
+        if self.is_mariadb:
+            installer = shutil.which('mariadb-install-db') or shutil.which('mysql_install_db')
+            command = [installer, '--no-defaults', f'--datadir={self.datadir}',
+                       '--auth-root-authentication-method=normal', '--skip-test-db']
+        else:
+            command = [self.binary, '--no-defaults', '--initialize-insecure', f'--datadir={self.datadir}']
+        subprocess.run(command + self._user_args(), check=True, capture_output=True)
+
+    def start(self, timeout=60):
+        self._initialize()
+        self.process = subprocess.Popen([
+            self.binary, '--no-defaults',
+            f'--datadir={self.datadir}',
+            f'--socket={self.socket}',
+            f'--port={self.port}',
+            f'--pid-file={os.path.join(self.workdir, "mysqld.pid")}',
+            '--bind-address=127.0.0.1',
+            '--skip-log-bin',
+            f'--innodb-buffer-pool-size={self.buffer_pool}',
+            '--innodb-flush-log-at-trx-commit=2',
+            '--max-connections=500',
+        ] + self._user_args(), stdout=subprocess.DEVNULL, stderr=open(os.path.join(self.workdir, 'mysqld.err'), 'w'))
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.connect().close()
+                return self
+            except pymysql.MySQLError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f'mysqld did not start; see {self.workdir}/mysqld.err')
+                time.sleep(0.5)
+
+    def connect(self, database=None):
+        """Root connection over the server's socket"""
+        return pymysql.connect(unix_socket=self.socket, user='root', database=database, autocommit=True)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        if not self.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def bootstrap_schema(conn):
+    """
+    Create the application schema, migrations and role users on a root connection.
+
+    Mirrors a production install: COMMANDS.sql, pending migrations, then
+    database_security_setup.sql.
+    """
+    cursor = conn.cursor()
+    with open(os.path.join(ROOT, 'COMMANDS.sql')) as f:
+        for statement in split_script(f.read()):
+            cursor.execute(statement)
+    apply_migrations(conn, verbose=False)
+    with open(os.path.join(ROOT, 'database_security_setup.sql')) as f:
+        for statement in split_statements(f.read()):
+            cursor.execute(statement)
+    cursor.close()
@@ -0,0 +1,192 @@
+"""
+Per-role traffic mixes replayed through the Flask app's test client.
+
+Each worker thread holds one logged-in client per role and draws requests
+from the weighted mixes below, so the app code, pools, caches and
+serialization are exercised exactly as in production minus the WSGI
+server and network.
+"""
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from bench.datagen import SLOT_TIMES
+
+# Share of requests issued by each role
+ROLE_WEIGHTS = {'patient': 70, 'physician': 25, 'admin': 5}
+
+
+def _pick_physician(ctx):
+    physician_id = ctx.rng.randrange(*ctx.manifest['physicians'])
+    return physician_id, ctx.manifest['assignments'][str(physician_id)]
+
+
+def _availability(ctx):
+    physician_id, clinic_id = _pick_physician(ctx)
+    start = ctx.today + timedelta(days=ctx.rng.randrange(60))
+    return 'GET', f'/api/availability?physician_id={physician_id}&clinic_id={clinic_id}&start_date={start}&end_date={start + timedelta(days=6)}', None
+
+
+def _booked_timeslots(ctx):
+    physician_id, clinic_id = _pick_physician(ctx)
+    return 'GET', f'/api/booked-timeslots?physician_id={physician_id}&clinic_id={clinic_id}', None
+
+
+def _book(ctx):
+    physician_id, clinic_id = _pick_physician(ctx)
+    return 'POST', '/api/appointments', {
+        'PatientID': ctx.reference_id,
+        'PhysicianID': physician_id,
+        'ClinicID': clinic_id,
+        'AppointmentDate': str(ctx.today + timedelta(days=ctx.rng.randrange(1, 90))),
+        'AppointmentTime': ctx.rng.choice(SLOT_TIMES),
+    }
+
+
+def _login(ctx):
+    return 'POST', '/auth/login', {'email': ctx.email, 'password': ctx.manifest['password']}
+
+
+# role -> [(weight, endpoint name, request builder)]
+MIXES = {
+    'patient': [
+        (25, 'GET /api/appointments', lambda ctx: ('GET', '/api/appointments', None)),
+        (20, 'GET /api/physicians', lambda ctx: ('GET', '/api/physicians?page_size=20', None)),
+        (20, 'GET /api/availability', _availability),
+        (10, 'GET /api/booked-timeslots', _booked_timeslots),
+        (10, 'GET /api/healthreports', lambda ctx: ('GET', f'/api/healthreports?patient_id={ctx.reference_id}', None)),
+        (10, 'POST /api/appointments', _book),
+        (5, 'POST /auth/login', _login),
+    ],
+    'physician': [
+        (30, 'GET /api/appointments', lambda ctx: ('GET', '/api/appointments', None)),
+        (20, 'GET /api/physician/patients', lambda ctx: ('GET', '/api/physician/patients', None)),
+        (25, 'GET /api/data/healthreports', lambda ctx: ('GET', '/api/data/healthreports?page_size=50', None)),
+        (15, 'GET /api/data/patients', lambda ctx: ('GET', '/api/data/patients?page_size=50', None)),
+        (10, 'POST /auth/login', _login),
+    ],
+    'admin': [
+        (30, 'GET /api/data/workassignments', lambda ctx: ('GET', '/api/data/workassignments?page_size=50', None)),
+        (30, 'GET /api/data/physicians', lambda ctx: ('GET', '/api/data/physicians?page_size=50', None)),
+        (20, 'GET /api/clinics', lambda ctx: ('GET', '/api/clinics', None)),
+        (20, 'GET /api/data/prescriptions', lambda ctx: ('GET', '/api/data/prescriptions?page_size=50', None)),
+    ],
+}
+
+
+class Session:
+    """One logged-in test client and the identity it plays"""
+
+    def __init__(self, app, role, manifest, rng):
+        self.client = app.test_client()
+        self.role = role
+        self.manifest = manifest
+        self.rng = rng
+        self.today = date.today()
+        if role == 'admin':
+            self.reference_id = None
+            self.email = manifest['admin_email']
+        else:
+            self.reference_id = rng.randrange(*manifest[role + 's'])
+            self.email = f'bench.{role}{self.reference_id}@example.com'
+
+
+class Sample:
+    __slots__ = ('endpoint', 'seconds', 'status', 'finished')
+
+    def __init__(self, endpoint, seconds, status, finished):
+        self.endpoint = endpoint
+        self.seconds = seconds
+        self.status = status
+        self.finished = finished
+
+
+def _send(session, method, path, body):
+    if method == 'GET':
+        response = session.client.get(path)
+    else:
+        response = session.client.post(path, json=body)
+    response.get_data()   # drain streamed bodies inside the timing
+    return response.status_code
+
+
+def run_traffic(app, manifest, requests=5000, workers=8, warmup=200, seed=42):
+    """
+    Replay the role mixes against the app.
+
+    Args:
+        app: Flask application
+        manifest: Data set manifest from bench.datagen.generate
+        requests: Measured requests across all workers
+        workers: Concurrent client threads
+        warmup: Unmeasured requests issued first (fills pools and caches)
+        seed: RNG seed for the request sequence
+
+    Returns:
+        (list of Sample, wall-clock seconds of the measured phase)
+    """
+    roles = list(ROLE_WEIGHTS)
+    role_weights = [ROLE_WEIGHTS[role] for role in roles]
+    mixes = {role: ([w for w, _, _ in MIXES[role]], MIXES[role]) for role in roles}
+
+    budget = {'warmup': warmup, 'measured': requests}
+    lock = threading.Lock()
+    samples = []
+    errors = []
+
+    def take():
+        with lock:
+            if budget['warmup'] > 0:
+                budget['warmup'] -= 1
+                return 'warmup'
+            if budget['measured'] > 0:
+                budget['measured'] -= 1
+                return 'measured'
+            return None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        sessions = {}
+        local = []
+        try:
+            for role in roles:
+                sessions[role] = Session(app, role, manifest, rng)
+                method, path, body = _login(sessions[role])
+                _send(sessions[role], method, path, body)
+
+            while True:
+                phase = take()
+                if phase is None:
+                    break
+                role = rng.choices(roles, role_weights)[0]
+                weights, entries = mixes[role]
+                _, endpoint, build = rng.choices(entries, weights)[0]
+                method, path, body = build(sessions[role])
+
+                start = time.perf_counter()
+                status = _send(sessions[role], method, path, body)
+                finished = time.perf_counter()
+                if phase == 'measured':
+                    local.append(Sample(endpoint, finished - start, status, finished))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            with lock:
+                samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    if samples:
+        first_start = min(sample.finished - sample.seconds for sample in samples)
+        elapsed = max(sample.finished for sample in samples) - first_start
+    else:
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
@@ -0,0 +1,336 @@
+"""
+Idempotent schema bootstrap from COMMANDS.sql.
+
+The script is split into three phases, each fingerprinted separately:
+
+    tables      CREATE TABLE IF NOT EXISTS statements
+    routines    stored functions, procedures and views (DROP + CREATE)
+    seed        sample data
+
+The SchemaBootstrap table records the checksum each phase was last applied
+with, so a restart with an unchanged COMMANDS.sql does no DDL at all. An
+edit re-runs the phase it touched; a table dropped since the last run
+re-runs the tables and seed phases. Table DDL goes to the server in one
+multi-statement round trip. Seed rows load as multi-row INSERT IGNORE
+statements in a single transaction, so re-running them only adds what is
+missing. Versioned migrations (migrate.py) are applied afterwards.
+
+Re-running the tables phase only creates missing tables: CREATE TABLE IF
+NOT EXISTS leaves an existing table as it is. Column and index changes to
+existing tables must go in a migrations/ file (edit the CREATE TABLE too,
+so new databases match). SchemaBootstrapTable keeps each table's statement
+checksum, and bootstrap warns about existing tables whose CREATE TABLE
+changed. Tables last applied before those checksums were kept are not
+checked until the tables phase next runs.
+
+Usage:
+    python bootstrap.py            # apply pending phases and migrations
+    python bootstrap.py --check    # report, exit 1 if anything is pending
+    python bootstrap.py --force    # re-run every phase
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+import warnings
+
+import pymysql
+from pymysql.constants import CLIENT
+
+from migrate import apply_migrations, load_migrations, split_script
+
+SCRIPT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'COMMANDS.sql')
+
+PHASES = ('tables', 'routines', 'seed')
+
+# MySQL errors meaning "the database / bookkeeping table isn't there yet"
+MISSING_ERRORS = {
+    1049,   # Unknown database
+    1146,   # Table doesn't exist
+}
+
+_CREATE_TABLE = re.compile(r'^create\s+table\s+(?:if\s+not\s+exists\s+)?`?(\w+)`?', re.I)
+_ROUTINE = re.compile(r'^(?:drop|create)\s+(?:or\s+replace\s+)?(?:definer\s*=\s*\S+\s+)?'
+                      r'(?:function|procedure|view|trigger|event)\b', re.I)
+_INSERT_VALUES = re.compile(r'^insert\s+(?:ignore\s+)?into\s+(`?\w+`?\s*\([^)]*\))\s*values\s*(.*)$', re.I | re.S)
+_INSERT = re.compile(r'^insert\s+(?:ignore\s+)?into\s+', re.I)
+_SKIPPED = re.compile(r'^(?:create\s+database|use)\b', re.I)
+
+
+class BootstrapError(Exception):
+    """Raised when COMMANDS.sql holds a statement bootstrap can't place in a phase"""
+
+
+def merge_inserts(statements):
+    """
+    Turn seed INSERTs into INSERT IGNORE and merge adjacent ones that target
+    the same table and columns into a single multi-row statement.
+    """
+    merged = []
+    target = None
+    for statement in statements:
+        match = _INSERT_VALUES.match(statement)
+        if match and not re.search(r'\bon\s+duplicate\s+key\b', statement, re.I):
+            if target is not None and match.group(1) == target:
+                merged[-1] += ', ' + match.group(2)
+                continue
+            target = match.group(1)
+            merged.append(f"INSERT IGNORE INTO {target} VALUES {match.group(2)}")
+        else:
+            target = None
+            merged.append(_INSERT.sub('INSERT IGNORE INTO ', statement, count=1))
+    return merged
+
+
+def load_plan(path=SCRIPT_FILE):
+    """
+    Split COMMANDS.sql into phases.
+
+    Returns:
+        Dict of phase -> {'statements', 'checksum'}; the tables phase also
+        has 'tables', the table names it creates, and 'table_checksums',
+        the checksum of each table's CREATE TABLE statement
+    """
+    with open(path, 'r') as f:
+        statements = split_script(f.read())
+
+    grouped = {phase: [] for phase in PHASES}
+    tables = []
+    table_checksums = {}
+    for statement in statements:
+        if _SKIPPED.match(statement):
+            continue
+        match = _CREATE_TABLE.match(statement)
+        if match:
+            tables.append(match.group(1))
+            table_checksums[match.group(1)] = hashlib.sha256(statement.encode('utf-8')).hexdigest()
+            grouped['tables'].append(statement)
+        elif _ROUTINE.match(statement):
+            grouped['routines'].append(statement)
+        elif _INSERT.match(statement):
+            grouped['seed'].append(statement)
+        else:
+            raise BootstrapError(f"Don't know which bootstrap phase runs: {statement[:60]}")
+
+    grouped['seed'] = merge_inserts(grouped['seed'])
+    plan = {}
+    for phase, phase_statements in grouped.items():
+        checksum = hashlib.sha256('\n'.join(phase_statements).encode('utf-8')).hexdigest()
+        plan[phase] = {'statements': phase_statements, 'checksum': checksum}
+    plan['tables']['tables'] = tables
+    plan['tables']['table_checksums'] = table_checksums
+    return plan
+
+
+def connect(config, user=None, password=None):
+    """Server connection (no default database) that accepts multi-statement batches"""
+    return pymysql.connect(
+        host=config['host'],
+        port=config['port'],
+        user=user or config['user'],
+        password=password if user else config['password'],
+        client_flag=CLIENT.MULTI_STATEMENTS,
+    )
+
+
+def _select_or_empty(cursor, query, params=None):
+    try:
+        cursor.execute(query, params)
+    except pymysql.err.MySQLError as e:
+        if e.args and e.args[0] in MISSING_ERRORS:
+            return ()
+        raise
+    return cursor.fetchall()
+
+
+def pending(conn, database, plan=None):
+    """
+    Compare the database against COMMANDS.sql and the migrations directory.
+
+    Read-only: three SELECTs, no DDL.
+
+    Returns:
+        (pending phase names, pending migration versions)
+    """
+    plan = plan or load_plan()
+    cursor = conn.cursor()
+    applied = dict(_select_or_empty(cursor, f"SELECT Phase, Checksum FROM `{database}`.SchemaBootstrap"))
+    versions = {row[0] for row in _select_or_empty(cursor, f"SELECT Version FROM `{database}`.SchemaMigration")}
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({})".format(
+            ', '.join(['%s'] * len(plan['tables']['tables']))),
+        [database] + plan['tables']['tables']
+    )
+    tables_present = cursor.fetchone()[0] == len(plan['tables']['tables'])
+    cursor.close()
+
+    phases = [phase for phase in PHASES if applied.get(phase) != plan[phase]['checksum']]
+    if not tables_present:
+        # Recorded as applied, but someone dropped a table since: recreate and reseed it
+        phases = [phase for phase in PHASES if phase in phases or phase != 'routines']
+    migrations = [migration['version'] for migration in load_migrations() if migration['version'] not in versions]
+    return phases, migrations
+
+
+def changed_tables(conn, database, plan=None):
+    """
+    Existing tables whose CREATE TABLE differs from the one last applied.
+
+    The tables phase can't change these (CREATE TABLE IF NOT EXISTS does
+    nothing on an existing table); the change needs a migration.
+
+    Returns:
+        List of table names
+    """
+    plan = plan or load_plan()
+    cursor = conn.cursor()
+    recorded = dict(_select_or_empty(cursor, f"SELECT TableName, Checksum FROM `{database}`.SchemaBootstrapTable"))
+    cursor.execute("SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s", (database,))
+    existing = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return [name for name, checksum in plan['tables']['table_checksums'].items()
+            if name in existing and recorded.get(name, checksum) != checksum]
+
+
+def _run_batch(cursor, statements):
+    """Send statements in one round trip and drain every result set"""
+    if not statements:
+        return
+    cursor.execute(';\n'.join(statements))
+    while cursor.nextset():
+        pass
+
+
+def _record(cursor, phase, checksum):
+    cursor.execute(
+        "INSERT INTO SchemaBootstrap (Phase, Checksum) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE Checksum = VALUES(Checksum), AppliedAt = CURRENT_TIMESTAMP",
+        (phase, checksum)
+    )
+
+
+def _record_tables(cursor, table_checksums):
+    cursor.executemany(
+        "INSERT INTO SchemaBootstrapTable (TableName, Checksum) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE Checksum = VALUES(Checksum)",
+        list(table_checksums.items())
+    )
+
+
+def bootstrap(conn, database, force=False, verbose=True):
+    """
+    Bring the database up to COMMANDS.sql and the migrations.
+
+    Args:
+        conn: Connection from connect()
+        database: Database name (created if missing)
+        force: Re-run every phase even if its checksum matches
+        verbose: Print progress
+
+    Returns:
+        (phases applied, migration versions applied)
+    """
+    plan = load_plan()
+    phases, migrations = pending(conn, database, plan)
+    if force:
+        phases = list(PHASES)
+    if not phases and not migrations:
+        if verbose:
+            print('Schema is up to date')
+        return [], []
+
+    changed = changed_tables(conn, database, plan) if 'tables' in phases else []
+    if changed:
+        warnings.warn(f"CREATE TABLE changed for existing table(s) {', '.join(changed)}; bootstrap does not "
+                      f"alter existing tables, so add a migrations/ file for the column/index changes")
+
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    conn.select_db(database)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaBootstrap (
+            Phase varchar(20),
+            Checksum char(64) not null,
+            AppliedAt timestamp default current_timestamp,
+            primary key(Phase)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaBootstrapTable (
+            TableName varchar(64),
+            Checksum char(64) not null,
+            primary key(TableName)
+        )
+    """)
+
+    for phase in PHASES:
+        if phase not in phases:
+            continue
+        start = time.perf_counter()
+        statements = plan[phase]['statements']
+        if phase == 'seed':
+            # One transaction for every seed row
+            try:
+                _run_batch(cursor, ['START TRANSACTION'] + statements)
+                _record(cursor, phase, plan[phase]['checksum'])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        elif phase == 'routines':
+            # Stored program bodies contain ';', so these go one per round trip
+            for statement in statements:
+                cursor.execute(statement)
+            _record(cursor, phase, plan[phase]['checksum'])
+            conn.commit()
+        else:
+            # DDL commits implicitly, so batching saves round trips, not atomicity
+            _run_batch(cursor, statements)
+            _record(cursor, phase, plan[phase]['checksum'])
+            _record_tables(cursor, plan[phase]['table_checksums'])
+            conn.commit()
+        if verbose:
+            print(f"Applied {phase} ({len(statements)} statements, {(time.perf_counter() - start) * 1000:.0f} ms)")
+    cursor.close()
+
+    applied_migrations = apply_migrations(conn, verbose=verbose)
+    return phases, applied_migrations
+
+
+def main():
+    from config import get_db_config
+
+    parser = argparse.ArgumentParser(description='Create or update the database from COMMANDS.sql')
+    parser.add_argument('--check', action='store_true', help='Report pending work without changing anything')
+    parser.add_argument('--force', action='store_true', help='Re-run every phase')
+    parser.add_argument('--user', help='MySQL user with CREATE/ALTER privileges (default: admin role user)')
+    parser.add_argument('--password', help='Password for --user')
+    args = parser.parse_args()
+
+    config = get_db_config('admin')
+    conn = connect(config, args.user, args.password)
+    try:
+        if args.check:
+            plan = load_plan()
+            phases, migrations = pending(conn, config['database'], plan)
+            for phase in phases:
+                print(f"pending  {phase}")
+            if 'tables' in phases:
+                for table in changed_tables(conn, config['database'], plan):
+                    print(f"changed  table {table} (CREATE TABLE edits don't reach existing tables; "
+                          f"add a migration)")
+            for version in migrations:
+                print(f"pending  migration {version:04d}")
+            if not phases and not migrations:
+                print('Schema is up to date')
+            return 1 if phases or migrations else 0
+        bootstrap(conn, config['database'], force=args.force)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
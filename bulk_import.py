@@ -0,0 +1,414 @@
+"""
+Streaming bulk import of patients, patient accounts and medical history.
+
+Files are read incrementally (CSV with a header row, or NDJSON) and handled
+in chunks: each chunk is validated, checked against the database with one
+IN (...) query, given a pre-allocated block of IDs, has its passwords
+hashed in parallel, and is written with multi-row INSERTs in a single
+transaction. A chunk that fails to commit is retried row by row, so one
+bad row is reported without losing the rest.
+
+Usage:
+    python bulk_import.py patients patients.csv
+    python bulk_import.py patient_accounts accounts.ndjson --errors errors.json
+    python bulk_import.py history history.csv --chunk-size 5000
+"""
+import argparse
+import csv
+import itertools
+import json
+import re
+import sys
+from datetime import datetime
+
+import pymysql
+
+from config import IMPORT_CONFIG
+from etags import bump_versions
+from hashing import hash_many
+from ids import allocate_ids
+
+FORMATS = ('csv', 'ndjson')
+
+BLOOD_TYPES = {'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'}
+EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message goes into the report"""
+
+
+def text(max_length, required=True):
+    def convert(value):
+        value = '' if value is None else str(value).strip()
+        if not value:
+            if required:
+                raise RowError('is required')
+            return None
+        if len(value) > max_length:
+            raise RowError(f'is longer than {max_length} characters')
+        return value
+    return convert
+
+
+def iso_date(value):
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise RowError('must be a date (YYYY-MM-DD)')
+
+
+def blood_type(value):
+    value = str(value or '').strip().upper()
+    if value not in BLOOD_TYPES:
+        raise RowError(f"must be one of {', '.join(sorted(BLOOD_TYPES))}")
+    return value
+
+
+def boolean(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value or '').strip().lower()
+    if value in ('1', 'true', 'yes', 'y'):
+        return True
+    if value in ('0', 'false', 'no', 'n', ''):
+        return False
+    raise RowError('must be true or false')
+
+
+def integer(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        raise RowError('must be an integer')
+
+
+def email(value):
+    value = text(100)(value)
+    if not EMAIL.match(value):
+        raise RowError('is not a valid email address')
+    return value
+
+
+def password(value):
+    value = '' if value is None else str(value)
+    if len(value) < 8:
+        raise RowError('must be at least 8 characters')
+    return value
+
+
+PATIENT_FIELDS = [
+    ('Name', 'name', text(50)),
+    ('DOB', 'dob', iso_date),
+    ('BloodType', 'blood_type', blood_type),
+    ('PhoneNumber', 'phone_number', text(20)),
+    ('Address', 'address', text(50)),
+]
+
+# kind -> sequence for new IDs, target table and ID column, ETag resources
+# changed by an import, and fields: (column, input name, converter). Input
+# names also match the column name, case-insensitively and ignoring
+# underscores ('blood_type' or 'BloodType').
+KINDS = {
+    'patients': {
+        'sequence': 'Patient', 'table': 'Patient', 'id_column': 'PatientID',
+        'resources': ('patients',),
+        'fields': PATIENT_FIELDS,
+    },
+    'patient_accounts': {
+        'sequence': 'Patient', 'table': 'Patient', 'id_column': 'PatientID',
+        'resources': ('patients',),
+        'fields': PATIENT_FIELDS,
+        'account': 'patient',
+    },
+    'history': {
+        'sequence': 'MedicalHistory', 'table': 'MedicalHistory', 'id_column': 'HistoryID',
+        'resources': ('history',),
+        'fields': [
+            ('PatientID', 'patient_id', integer),
+            ('HealthCondition', 'health_condition', text(50)),
+            ('DiagnosisDate', 'diagnosis_date', iso_date),
+            ('TreatmentReceived', 'treatment_received', boolean),
+            ('Outcome', 'outcome', text(200, required=False)),
+            ('OngoingCare', 'ongoing_care', boolean),
+        ],
+        'references': ('PatientID', 'Patient', 'PatientID'),
+    },
+}
+
+
+def _key(name):
+    return name.replace('_', '').lower()
+
+
+def _text_lines(stream):
+    """Decode a binary or text stream line by line (UTF-8, optional BOM)"""
+    first = True
+    for line in stream:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if first:
+            line = line.lstrip('\ufeff')
+            first = False
+        yield line
+
+
+def read_records(stream, fmt):
+    """
+    Yield (row number, dict) from a binary or text stream without loading it whole.
+
+    Rows that can't be parsed are yielded as (row number, RowError).
+    """
+    lines = _text_lines(stream)
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=2):
+            yield number, row
+    elif fmt == 'ndjson':
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, RowError(f'invalid JSON: {e}')
+                continue
+            yield number, record if isinstance(record, dict) else RowError('line is not a JSON object')
+    else:
+        raise ValueError(f"Unsupported format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def detect_format(filename, content_type=None):
+    if (filename or '').lower().endswith(('.ndjson', '.jsonl')) or 'ndjson' in (content_type or ''):
+        return 'ndjson'
+    return 'csv'
+
+
+class ImportReport:
+    """Running totals and per-row errors of one import"""
+
+    def __init__(self, kind, max_errors):
+        self.kind = kind
+        self.max_errors = max_errors
+        self.total = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'error': message})
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'total': self.total,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+class BulkImporter:
+    """
+    Imports one kind of record over a single connection.
+
+    Args:
+        conn: pymysql connection with INSERT rights on the target tables
+        kind: Key of KINDS
+        chunk_size: Rows per validation/hash/insert batch
+        max_errors: Per-row errors kept in the report
+        hash_concurrency: Parallel password hashes for account imports
+    """
+
+    def __init__(self, conn, kind, chunk_size=1000, max_errors=1000, hash_concurrency=2):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown import kind '{kind}' (expected one of {', '.join(KINDS)})")
+        self.conn = conn
+        self.kind = kind
+        self.spec = KINDS[kind]
+        self.chunk_size = chunk_size
+        self.hash_concurrency = hash_concurrency
+        self.report = ImportReport(kind, max_errors)
+
+        fields = list(self.spec['fields'])
+        if self.spec.get('account'):
+            fields += [('Email', 'email', email), ('Password', 'password', password)]
+        self.fields = fields
+        self.columns = [self.spec['id_column']] + [column for column, _, _ in self.spec['fields']]
+
+    def run(self, records):
+        """Import an iterable of (row number, dict | RowError); returns the report"""
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.report.total += len(chunk)
+            self._import_chunk(chunk)
+        return self.report
+
+    def _validate(self, number, record):
+        if isinstance(record, RowError):
+            raise record
+        lookup = {_key(name): value for name, value in record.items() if name is not None}
+        values = {}
+        for column, name, convert in self.fields:
+            try:
+                values[column] = convert(lookup.get(_key(name), lookup.get(_key(column))))
+            except RowError as e:
+                raise RowError(f'{name} {e}')
+        return values
+
+    def _import_chunk(self, chunk):
+        rows = []
+        for number, record in chunk:
+            try:
+                rows.append((number, self._validate(number, record)))
+            except RowError as e:
+                self.report.error(number, str(e))
+
+        rows = self._check_against_database(rows)
+        if not rows:
+            return
+
+        if self.spec.get('account'):
+            hashes = hash_many([values['Password'] for _, values in rows], self.hash_concurrency)
+            for (_, values), password_hash in zip(rows, hashes):
+                values['PasswordHash'] = password_hash
+
+        ids = allocate_ids(self.spec['sequence'], len(rows))
+        for (_, values), new_id in zip(rows, ids):
+            values[self.spec['id_column']] = new_id
+
+        try:
+            self._insert(rows)
+            self.conn.commit()
+            self.report.inserted += len(rows)
+        except pymysql.MySQLError:
+            self.conn.rollback()
+            # Find the offending rows without giving up on the good ones
+            for row in rows:
+                try:
+                    self._insert([row])
+                    self.conn.commit()
+                    self.report.inserted += 1
+                except pymysql.MySQLError as e:
+                    self.conn.rollback()
+                    self.report.error(row[0], e.args[1] if len(e.args) > 1 else str(e))
+
+    def _check_against_database(self, rows):
+        """Drop rows that clash with existing data or each other, one query per chunk"""
+        cursor = self.conn.cursor(pymysql.cursors.Cursor)
+        try:
+            if self.spec.get('account'):
+                emails = list({values['Email'].lower() for _, values in rows})
+                existing = set()
+                if emails:
+                    cursor.execute(
+                        f"SELECT Email FROM User WHERE Email IN ({', '.join(['%s'] * len(emails))})", emails
+                    )
+                    existing = {row[0].lower() for row in cursor.fetchall()}
+                seen = set()
+                kept = []
+                for number, values in rows:
+                    address = values['Email'].lower()
+                    if address in existing:
+                        self.report.error(number, 'email is already registered')
+                    elif address in seen:
+                        self.report.error(number, 'email appears more than once in the file')
+                    else:
+                        seen.add(address)
+                        kept.append((number, values))
+                rows = kept
+
+            reference = self.spec.get('references')
+            if reference and rows:
+                column, table, target = reference
+                wanted = list({values[column] for _, values in rows})
+                cursor.execute(
+                    f"SELECT {target} FROM {table} WHERE {target} IN ({', '.join(['%s'] * len(wanted))})", wanted
+                )
+                found = {row[0] for row in cursor.fetchall()}
+                kept = []
+                for number, values in rows:
+                    if values[column] in found:
+                        kept.append((number, values))
+                    else:
+                        self.report.error(number, f'{column} {values[column]} does not exist')
+                rows = kept
+        finally:
+            cursor.close()
+        return rows
+
+    def _insert(self, rows):
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(
+                f"INSERT INTO {self.spec['table']} ({', '.join(self.columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(self.columns))})",
+                [tuple(values[column] for column in self.columns) for _, values in rows]
+            )
+            if self.spec.get('account'):
+                cursor.executemany(
+                    "INSERT INTO User (Email, PasswordHash, UserType, ReferenceID, IsActive) "
+                    "VALUES (%s, %s, %s, %s, TRUE)",
+                    [(values['Email'], values['PasswordHash'], self.spec['account'], values[self.spec['id_column']])
+                     for _, values in rows]
+                )
+        finally:
+            cursor.close()
+
+
+def import_stream(conn, kind, stream, fmt, **options):
+    """
+    Parse a stream and import it; returns the ImportReport.
+
+    When rows were inserted, the kind's ETag resources are bumped so cached
+    listings stop matching. From the command line that only reaches the
+    server with a shared (redis) cache backend.
+    """
+    settings = dict(IMPORT_CONFIG, **{key: value for key, value in options.items() if value is not None})
+    importer = BulkImporter(conn, kind, **settings)
+    report = importer.run(read_records(stream, fmt))
+    if report.inserted:
+        bump_versions(*KINDS[kind]['resources'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import records from CSV or NDJSON')
+    parser.add_argument('kind', choices=sorted(KINDS))
+    parser.add_argument('file', help="input file ('-' for stdin)")
+    parser.add_argument('--format', choices=FORMATS, help='defaults from the file extension')
+    parser.add_argument('--chunk-size', type=int)
+    parser.add_argument('--errors', help='write the per-row error report to this JSON file')
+    args = parser.parse_args(argv)
+
+    from db import get_pool
+
+    fmt = args.format or detect_format(args.file)
+    pool = get_pool('admin')
+    conn = pool.acquire()
+    try:
+        if args.file == '-':
+            report = import_stream(conn, args.kind, sys.stdin.buffer, fmt, chunk_size=args.chunk_size)
+        else:
+            with open(args.file, 'rb') as stream:
+                report = import_stream(conn, args.kind, stream, fmt, chunk_size=args.chunk_size)
+    finally:
+        pool.release(conn)
+
+    result = report.to_dict()
+    print(f"{result['inserted']} of {result['total']} {args.kind} rows imported, {result['failed']} failed")
+    for error in result['errors'][:20]:
+        print(f"  row {error['row']}: {error['error']}")
+    if args.errors:
+        with open(args.errors, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+
+from flask import json
+
+from config import CACHE_CONFIG
+from db import current_db_role
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+MISSING = object()
+
+# Cache namespaces; every cached read declares the ones it depends on
+NAMESPACES = ('physicians', 'clinics', 'workassignments')
+
+
+class MemoryBackend:
+    """
+    In-process LRU backend with per-entry TTL.
+
+    Args:
+        max_size: Maximum number of cached values
+    """
+
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # key -> (value, expires_at)
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._epoch = uuid.uuid4().hex
+
+    # Counters live only in this process
+    shared = False
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_counters(self, names):
+        with self._lock:
+            return [self._counters.get(name, 0) for name in names]
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def epoch(self):
+        """Token that changes whenever the counters are reset"""
+        return self._epoch
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Redis (or any Redis-compatible server) backend shared by all worker processes.
+
+    Values are stored as JSON using the app's JSON provider, so a cached
+    response renders exactly like a freshly queried one.
+
+    Args:
+        url: Redis connection URL
+        key_prefix: Prefix for every key written
+    """
+
+    shared = True
+
+    def __init__(self, url, key_prefix=''):
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        raw = self.client.get(self.key_prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.key_prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+    def get_counters(self, names):
+        values = self.client.mget([self.key_prefix + 'gen:' + name for name in names])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def incr(self, name):
+        return self.client.incr(self.key_prefix + 'gen:' + name)
+
+    def epoch(self):
+        """Token that changes whenever the counters are reset (e.g. the server was flushed)"""
+        key = self.key_prefix + 'epoch'
+        value = self.client.get(key)
+        if value is None:
+            self.client.set(key, uuid.uuid4().hex, nx=True)
+            value = self.client.get(key)
+        return value.decode()
+
+    def clear(self):
+        for key in self.client.scan_iter(self.key_prefix + '*'):
+            self.client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.key_prefix + '*'))
+
+
+class _Call:
+    """One in-flight load that concurrent readers of the same key wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Cache:
+    """
+    Read-through cache with namespace invalidation and single-flight loading.
+
+    Each namespace has a generation counter kept in the backend. Cache keys
+    embed the current generation of every namespace they depend on, so
+    invalidate() is a single counter bump and stale entries simply age out.
+    Concurrent misses on the same key run the loader once; the other
+    callers wait for its result instead of hitting the database.
+
+    Cached values are shared between requests and must not be mutated.
+    Keys include the request's database role, so a result loaded with one
+    role's privileges is never served to another role.
+
+    Args:
+        backend: MemoryBackend or RedisBackend
+        ttl: Default seconds a value stays cached
+    """
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def _key(self, namespaces, key):
+        generations = self.backend.get_counters(namespaces)
+        scope = ','.join(f"{name}@{gen}" for name, gen in zip(namespaces, generations))
+        return current_db_role() + ':' + scope + '|' + '|'.join(str(part) for part in key)
+
+    def get_or_load(self, namespaces, key, loader, ttl=None):
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        Args:
+            namespaces: Namespaces the value depends on (see NAMESPACES)
+            key: Tuple identifying the value within those namespaces
+            loader: Zero-argument callable producing the value
+            ttl: Seconds to keep the value (defaults to the cache TTL)
+        """
+        full_key = self._key(namespaces, key)
+        value = self.backend.get(full_key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        with self._lock:
+            call = self._inflight.get(full_key)
+            leader = call is None
+            if leader:
+                call = self._inflight[full_key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            self.loads += 1
+            call.value = loader()
+            self.backend.set(full_key, call.value, ttl or self.ttl)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[full_key]
+            call.event.set()
+
+    def invalidate(self, *namespaces):
+        """Drop everything cached under the given namespaces (all of them if none given)"""
+        for name in namespaces or NAMESPACES:
+            self.backend.incr(name)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'size': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_cache(config):
+    """Build the cache described by a CACHE_CONFIG-style dict"""
+    if config['backend'] == 'redis':
+        if redis is not None:
+            return Cache(RedisBackend(config['redis_url'], config['key_prefix']), config['ttl'])
+        warnings.warn("CACHE_CONFIG backend is 'redis' but the redis package is not installed; using memory")
+    return Cache(MemoryBackend(config['max_size']), config['ttl'])
+
+
+cache = create_cache(CACHE_CONFIG)
@@ -1,6 +1,7 @@
 # Base database configuration (shared settings)
 DATABASE_CONFIG = {
     'host': 'localhost',
+    'port': 3306,
     'database': 'HealthSystem',
 }
 
@@ -44,4 +45,170 @@ def get_db_config(user_role='admin'):
     credentials = DB_CREDENTIALS.get(user_role, DB_CREDENTIALS['admin'])
     config.update(credentials)
 
-    return config
\ No newline at end of file
+    return config
+
+# Connection pool settings (one pool per role / MySQL user)
+# Connections are borrowed at the start of a request and returned at teardown
+POOL_CONFIG = {
+    'min_size': 1,              # Connections kept open even when idle
+    'max_size': 10,             # Hard cap on open connections per role
+    'max_idle_time': 300,       # Seconds an idle connection may sit before eviction
+    'max_lifetime': 1800,       # Seconds before a connection is recycled regardless of use
+    'max_waiters': 32,          # Requests allowed to queue for a connection when the pool is full
+    'acquire_timeout': 5,       # Seconds a queued request waits before giving up
+    'ping_interval': 30,        # Seconds of idleness after which checkout pings the server first
+}
+
+# Read replicas. execute_query/execute_one (and execute_columns) read from a
+# replica; writes, transactions and raw get_db() work stay on the primary.
+# A user's reads go to the primary until a replica has their last write.
+REPLICA_CONFIG = {
+    'replicas': [],             # [{'host': '127.0.0.1', 'port': 3307}, ...]; empty = everything on the primary
+    'consistency': 'gtid',      # 'gtid': check the replica has executed the session's write GTIDs (needs gtid_mode=ON)
+                                # 'timestamp': read from the primary for lag_window seconds after a write
+    'lag_window': 5,            # Seconds; must exceed the replicas' worst replication lag in timestamp mode
+    'gtid_wait': 0,             # Seconds a replica may wait to catch up before the read falls back (0 = don't wait)
+    'token_ttl': 300,           # Seconds a write token is kept in the session
+    'retry_interval': 30,       # Seconds an unreachable replica is skipped
+}
+
+# In-process cache of User rows used by Flask-Login's user_loader
+USER_CACHE_CONFIG = {
+    'max_size': 10000,          # Users kept before least-recently-used ones are dropped
+    'ttl': 60,                  # Seconds a cached user is trusted before re-reading the DB
+}
+
+# Dedicated worker pool for bcrypt hashing/verification
+HASHING_CONFIG = {
+    'workers': 4,               # Concurrent bcrypt operations
+    'max_pending': 32,          # Operations allowed to queue before failing fast with 503
+    'rounds': 12,               # bcrypt cost factor for new hashes
+}
+
+# Primary key allocation (block-reserving sequences in the IdSequence table)
+ID_ALLOCATOR_CONFIG = {
+    'block_size': 20,           # IDs reserved per round trip; unused IDs are skipped on restart
+    'pool_size': 1,             # Connections of its own for reservations, outside the request pools
+}
+
+# Cursor (keyset) pagination limits for listing endpoints
+PAGINATION_CONFIG = {
+    'default_page_size': 50,
+    'max_page_size': 1000,      # Enforced server-side whatever the client asks for
+}
+
+# In-memory physician availability (30-minute slot bitmaps)
+AVAILABILITY_CONFIG = {
+    # Bookable slot start times (matches the booking page)
+    'slot_times': ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
+                   '13:00', '13:30', '14:00', '14:30', '15:00', '15:30'],
+    'ttl': 60,                  # Seconds before cached bookings/schedules are re-read (covers other processes)
+    'max_entries': 50000,       # Physician-day bitmaps kept in memory
+    'max_schedules': 10000,     # (physician, clinic) weekday masks kept in memory
+    'max_range_days': 62,       # Longest date range one /api/availability call may ask for
+}
+
+# Read-through cache for slow-changing reference data (physicians, clinics, work assignments)
+CACHE_CONFIG = {
+    'backend': 'memory',                    # 'memory' (per process) or 'redis' (shared, needs the redis package)
+    'redis_url': 'redis://localhost:6379/0',
+    'key_prefix': 'healthsystem:',
+    'max_size': 2048,                       # Entries kept by the memory backend
+    'ttl': 300,                             # Seconds; writes invalidate explicitly, TTL is the backstop
+}
+
+# Conditional GET (ETag / If-None-Match)
+ETAG_CONFIG = {
+    'enabled': True,            # Send ETags and answer a matching If-None-Match with 304
+    # The memory cache backend only sees writes made by its own process, so its
+    # ETags are only safe when one process serves every request (a single
+    # gunicorn/uvicorn worker) and nothing else writes (bulk_import.py from the
+    # command line does). Set True for such deployments; left False, ETags are
+    # sent only with a shared (redis) cache backend.
+    'single_process': False,
+}
+
+# Request/DB instrumentation (Prometheus /metrics and Server-Timing)
+METRICS_CONFIG = {
+    'enabled': True,
+    'server_timing': True,                  # Add a Server-Timing header to every response
+    'allowed_ips': ['127.0.0.1', '::1'],    # Clients allowed to scrape /metrics
+    'latency_buckets': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+}
+
+# Slow-query log and repeated-statement (N+1) detection
+QUERY_LOG_CONFIG = {
+    'slow_query_ms': 200,         # Log statements slower than this (0 disables)
+    'explain_slow': True,         # Attach EXPLAIN output to slow SELECTs
+    'repeat_threshold': 10,       # Flag requests running one statement shape more than this many times
+    'raise_on_repeat': False,     # Development/tests: raise RepeatedQueryError instead of logging
+}
+
+# Bulk CSV/NDJSON import (bulk_import.py, POST /api/import/<kind>)
+IMPORT_CONFIG = {
+    'chunk_size': 1000,         # Rows validated, hashed and committed together
+    'max_errors': 1000,         # Per-row errors kept in the report (the count is always exact)
+    'hash_concurrency': 2,      # Parallel password hashes for account imports (leaves workers for logins)
+}
+
+# Streaming data export (export.py, GET /api/export/<name>)
+EXPORT_CONFIG = {
+    'chunk_rows': 5000,         # Rows fetched from the server-side cursor and encoded per write
+    'compress_level': 6,        # gzip level for CSV/NDJSON
+}
+
+# Server-side filter/query engine (query_engine.py, POST /api/query)
+QUERY_CONFIG = {
+    # Tables admins may query
+    'tables': ['Patient', 'Physician', 'Appointment', 'Clinic', 'HealthReport',
+               'Billing', 'Prescription', 'MedicalHistory', 'WorksAt', 'Schedule', 'Insurance'],
+    # Tables other user types may query -> column that must equal their reference_id (None: all rows)
+    'access': {
+        'physician': {
+            'Patient': None, 'Physician': None, 'Clinic': None, 'Appointment': 'PhysicianID',
+            'HealthReport': None, 'Prescription': None, 'MedicalHistory': None,
+            'WorksAt': None, 'Schedule': None,
+        },
+        'patient': {
+            'Patient': 'PatientID', 'Physician': None, 'Clinic': None, 'Appointment': 'PatientID',
+            'HealthReport': 'PatientID', 'Billing': 'PatientID', 'MedicalHistory': 'PatientID',
+            'WorksAt': None, 'Schedule': None,
+        },
+    },
+    'max_predicates': 20,
+    'max_in_values': 1000,
+}
+
+# In-process search index (search.py, GET /api/search)
+SEARCH_CONFIG = {
+    'default_limit': 10,
+    'max_limit': 50,
+    'refresh_interval': 15,     # Seconds between catch-up reads of rows added by other processes
+    'rebuild_interval': 3600,   # Seconds between full background rebuilds
+    # Keys below the high-water mark every catch-up re-reads. IDs are reserved in
+    # blocks per process and can commit out of order, so keep this at least
+    # ID_ALLOCATOR_CONFIG['block_size'] x the number of writing processes.
+    'catch_up_overlap': 1000,
+    'warm_on_start': True,      # Build the indexes in the background when the app starts
+    'min_prefix': 2,            # Shortest term expanded as a prefix
+    'max_expansions': 64,       # Index tokens a single prefix term may expand to
+    'fuzzy_candidates': 200,    # Trigram candidates checked for typos per term
+    'max_candidates': 20000,    # Rows from the rarest term scored in multi-term queries
+}
+
+# ASGI serving mode (asgi.py)
+ASGI_CONFIG = {
+    # Threads running Flask handlers; client I/O never holds one, but a handler
+    # holds its thread for all of its (blocking pymysql) database time, so this
+    # matches the pools: 3 roles x POOL_CONFIG['max_size'] connections.
+    'handler_threads': 30,
+    'max_body': 256 * 1024 * 1024,      # Largest request body accepted (bulk imports)
+    'spool_threshold': 1024 * 1024,     # Request bodies above this are buffered on disk
+    'response_queue': 16,               # Response chunks buffered per slow client before the handler waits
+}
+
+# Patient dashboard aggregate (GET /api/patient/summary)
+SUMMARY_CONFIG = {
+    'default_limit': 20,        # Rows per section unless <section>_limit / limit is given
+    'max_limit': 200,
+}
@@ -109,6 +109,9 @@ GRANT SELECT, INSERT, UPDATE, DELETE ON HealthSystem.Billing TO 'app_admin'@'loc
 GRANT SELECT, INSERT, UPDATE, DELETE ON HealthSystem.Insurance TO 'app_admin'@'localhost';
 GRANT SELECT, INSERT, UPDATE, DELETE ON HealthSystem.User TO 'app_admin'@'localhost';
 
+-- Primary key sequences (ID blocks are always reserved through the admin connection)
+GRANT SELECT, INSERT, UPDATE ON HealthSystem.IdSequence TO 'app_admin'@'localhost';
+
 -- READ privileges for views
 GRANT SELECT ON HealthSystem.v_BookedTimeSlots TO 'app_admin'@'localhost';
 
@@ -1,7 +1,475 @@
+import hashlib
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
 import pymysql
-from pymysql.cursors import DictCursor
-from flask import g
-from config import get_db_config
+from pymysql.constants import SERVER_STATUS
+from pymysql.cursors import Cursor, DictCursor, SSCursor, SSDictCursor
+from flask import g, has_request_context, request, session
+from config import get_db_config, DB_CREDENTIALS, POOL_CONFIG, QUERY_LOG_CONFIG, REPLICA_CONFIG
+from metrics import record_query, record_rows, record_acquire
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedQueryError(Exception):
+    """Raised in development mode when a request repeats one statement shape too often"""
+
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%s|%\(\w+\)s|\bNULL\b', re.I)
+_VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*')
+_WHITESPACE = re.compile(r'\s+')
+
+# Statements that never change data; anything else marks the request as having written
+_READ_VERBS = {'SELECT', 'SHOW', 'SET', 'DESCRIBE', 'DESC', 'EXPLAIN', 'START', 'BEGIN',
+               'COMMIT', 'ROLLBACK', 'USE', 'DO', 'WITH'}
+
+
+def fingerprint(query):
+    """
+    Normalize a statement to its shape: literals and placeholders become ?,
+    IN (...) / VALUES lists collapse to (...), whitespace is squeezed.
+
+    Returns:
+        Tuple of (short hash, normalized text)
+    """
+    text = _STRINGS.sub('?', query)
+    text = _COMMENTS.sub(' ', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _VALUE_LISTS.sub('(...)', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    return hashlib.md5(text.encode()).hexdigest()[:12], text
+
+
+def _track_statement(cursor, query, args, seconds):
+    """Count the statement's fingerprint for this request and log it if slow"""
+    digest, text = fingerprint(query)
+
+    if has_request_context():
+        counts = g.get('query_fingerprints')
+        if counts is None:
+            counts = g.query_fingerprints = Counter()
+            g.query_texts = {}
+        counts[digest] += 1
+        g.query_texts[digest] = text
+        if not g.get('db_wrote') and text.split(' ', 1)[0].upper() not in _READ_VERBS:
+            g.db_wrote = True
+        if counts[digest] > QUERY_LOG_CONFIG['repeat_threshold'] and QUERY_LOG_CONFIG['raise_on_repeat']:
+            raise RepeatedQueryError(
+                f"{request.method} {request.path} ran statement {digest} {counts[digest]} times: {text}"
+            )
+
+    threshold = QUERY_LOG_CONFIG['slow_query_ms']
+    if threshold and seconds * 1000 >= threshold:
+        plan = ''
+        if QUERY_LOG_CONFIG['explain_slow'] and not cursor._unbuffered and text[:6].upper() == 'SELECT':
+            plan = _explain(cursor.connection, cursor.mogrify(query, args))
+        logger.warning("Slow query %.1f ms [%s]: %s%s", seconds * 1000, digest, text, plan)
+
+
+def _explain(conn, sql):
+    """EXPLAIN output for a statement, formatted for the log (empty on failure)"""
+    try:
+        cursor = conn.cursor(DictCursor)
+        try:
+            cursor.execute('EXPLAIN ' + sql)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except pymysql.MySQLError as e:
+        return f"\n  EXPLAIN failed: {e}"
+    columns = ('table', 'type', 'key', 'rows', 'Extra')
+    return ''.join(
+        '\n  ' + ' '.join(f"{column}={row.get(column)}" for column in columns)
+        for row in rows
+    )
+
+
+def report_repeated_queries(e=None):
+    """Teardown hook: warn about statement shapes a request repeated too often (N+1 patterns)"""
+    counts = g.pop('query_fingerprints', None)
+    texts = g.pop('query_texts', {})
+    if not counts:
+        return
+    threshold = QUERY_LOG_CONFIG['repeat_threshold']
+    for digest, count in counts.most_common():
+        if count <= threshold:
+            break
+        logger.warning("Repeated query: %s %s ran [%s] %d times: %s",
+                       request.method, request.path, digest, count, texts.get(digest))
+
+
+class InstrumentedCursorMixin:
+    """
+    Times every statement and counts the rows it returns for request metrics,
+    and feeds each statement's fingerprint to the slow-query log and the
+    repeated-statement detector.
+    """
+
+    _in_executemany = False
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            seconds = time.perf_counter() - start
+            # Buffered cursors know the row count up front; unbuffered ones count in fetch*
+            rows = self.rowcount if self.description and not self._unbuffered else 0
+            record_query(seconds, rows)
+            if not self._in_executemany:
+                _track_statement(self, query, args, seconds)
+
+    def executemany(self, query, args):
+        # pymysql runs executemany as one or more execute() calls; count it as one statement
+        start = time.perf_counter()
+        self._in_executemany = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._in_executemany = False
+            _track_statement(self, query, None, time.perf_counter() - start)
+
+    def callproc(self, procname, args=()):
+        start = time.perf_counter()
+        try:
+            return super().callproc(procname, args)
+        finally:
+            seconds = time.perf_counter() - start
+            record_query(seconds)
+            _track_statement(self, f"CALL {procname}", None, seconds)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if self._unbuffered and row is not None:
+            record_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size)
+        if self._unbuffered:
+            record_rows(len(rows))
+        return rows
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, DictCursor):
+    _unbuffered = False
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, Cursor):
+    _unbuffered = False
+
+
+class InstrumentedSSDictCursor(InstrumentedCursorMixin, SSDictCursor):
+    _unbuffered = True
+
+
+class InstrumentedSSCursor(InstrumentedCursorMixin, SSCursor):
+    _unbuffered = True
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections for a single database role.
+
+    Each role ('patient', 'physician', 'admin') connects with its own MySQL
+    user, so each role gets its own pool. Connections are handed out LIFO so
+    the warmest connection is reused first, while the oldest idle ones age out.
+
+    Args:
+        role: Role whose credentials the pooled connections use
+        host: Server to connect to (default: the primary in DATABASE_CONFIG)
+        port: Port on host
+        min_size: Idle connections that are never evicted
+        max_size: Maximum number of open connections (idle + checked out)
+        max_idle_time: Seconds an idle connection is kept before eviction
+        max_lifetime: Seconds after which a connection is recycled
+        max_waiters: Maximum number of callers queued waiting for a connection
+        acquire_timeout: Seconds a queued caller waits before failing
+        ping_interval: Idle seconds after which checkout pings the connection
+    """
+
+    def __init__(self, role, host=None, port=None, min_size=1, max_size=10, max_idle_time=300,
+                 max_lifetime=1800, max_waiters=32, acquire_timeout=5,
+                 ping_interval=30):
+        self.role = role
+        self.host = host
+        self.port = port
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.max_lifetime = max_lifetime
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()     # (connection, created_at, last_used)
+        self._in_use = {}        # id(connection) -> created_at
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+
+    def _connect(self):
+        config = get_db_config(self.role)
+        return pymysql.connect(
+            host=self.host or config['host'],
+            port=self.port or config['port'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            cursorclass=InstrumentedDictCursor
+        )
+
+    def _expired(self, created_at, now):
+        return now - created_at >= self.max_lifetime
+
+    def _evict_idle(self, now):
+        """Drop idle connections past their idle time or lifetime (lock held)"""
+        evicted = []
+        kept = deque()
+        while self._idle:
+            conn, created_at, last_used = self._idle.popleft()
+            too_idle = now - last_used >= self.max_idle_time
+            if self._expired(created_at, now) or (too_idle and self._size - len(evicted) > self.min_size):
+                evicted.append(conn)
+            else:
+                kept.append((conn, created_at, last_used))
+        self._idle = kept
+        self._size -= len(evicted)
+        return evicted
+
+    @staticmethod
+    def _close_quietly(connections):
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def acquire(self):
+        """
+        Borrow a connection from the pool.
+
+        Reuses an idle connection when one is available, opens a new one while
+        the pool is below max_size, and otherwise queues the caller until a
+        connection is released.
+
+        Raises:
+            PoolExhaustedError: If the wait queue is full or acquire_timeout elapses
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            entry = None
+            with self._cond:
+                evicted = self._evict_idle(time.monotonic())
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if self._waiters >= self.max_waiters or remaining <= 0:
+                        self._close_quietly(evicted)
+                        raise PoolExhaustedError(
+                            f"No '{self.role}' database connection available "
+                            f"({self._size} open, {self._waiters} waiting)"
+                        )
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+                    evicted.extend(self._evict_idle(time.monotonic()))
+
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+            self._close_quietly(evicted)
+
+            if entry is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+            else:
+                conn, created_at, last_used = entry
+                if not self._check_health(conn, last_used):
+                    self._discard(conn)
+                    continue
+
+            with self._cond:
+                self._in_use[id(conn)] = created_at
+            return conn
+
+    def _check_health(self, conn, last_used):
+        """Ping connections that have sat idle long enough to have gone stale"""
+        if not conn.open:
+            return False
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._close_quietly([conn])
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def release(self, conn, discard=False):
+        """
+        Return a borrowed connection to the pool.
+
+        Any open transaction is rolled back so the next borrower starts from a
+        clean session. Broken or expired connections are closed instead.
+        """
+        with self._cond:
+            created_at = self._in_use.pop(id(conn), None)
+        if created_at is None:
+            # Not ours (or already released) - just close it
+            self._close_quietly([conn])
+            return
+
+        now = time.monotonic()
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._closed or not conn.open or self._expired(created_at, now):
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def close(self):
+        """Close all idle connections (checked-out ones close on release)"""
+        with self._cond:
+            idle = [conn for conn, _, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._closed = True
+        self._close_quietly(idle)
+
+    def stats(self):
+        """Snapshot of pool occupancy"""
+        with self._cond:
+            return {
+                'role': self.role,
+                'server': f"{self.host}:{self.port}" if self.host else 'primary',
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiters': self._waiters,
+            }
+
+
+_pools = {}
+_replica_pools = {}     # (role, replica index) -> ConnectionPool
+_pools_lock = threading.Lock()
+
+_replica_down_until = {}    # replica index -> monotonic time it may be retried
+_replica_turn = itertools.count()
+
+
+def get_pool(user_role):
+    """
+    Get (or lazily create) the connection pool for a role.
+
+    Unknown roles resolve to the admin pool, matching get_db_config's fallback.
+    """
+    role = user_role if user_role in DB_CREDENTIALS else 'admin'
+    pool = _pools.get(role)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(role)
+            if pool is None:
+                pool = ConnectionPool(role, **POOL_CONFIG)
+                _pools[role] = pool
+    return pool
+
+
+def get_replica_pool(user_role, index):
+    """Get (or lazily create) the pool for a role on REPLICA_CONFIG['replicas'][index]"""
+    role = user_role if user_role in DB_CREDENTIALS else 'admin'
+    pool = _replica_pools.get((role, index))
+    if pool is None:
+        with _pools_lock:
+            pool = _replica_pools.get((role, index))
+            if pool is None:
+                replica = REPLICA_CONFIG['replicas'][index]
+                pool = ConnectionPool(role, host=replica['host'], port=replica.get('port', 3306), **POOL_CONFIG)
+                _replica_pools[(role, index)] = pool
+    return pool
+
+
+def pool_stats():
+    """stats() of every pool created so far"""
+    return [pool.stats() for pool in list(_pools.values()) + list(_replica_pools.values())]
+
+
+def close_pools():
+    """Close every pool's idle connections (e.g. on shutdown)"""
+    with _pools_lock:
+        pools = list(_pools.values()) + list(_replica_pools.values())
+        _pools.clear()
+        _replica_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _request_role():
+    """Database role for the current request"""
+    # Check if there's a forced role for this request
+    if hasattr(g, 'force_db_role'):
+        return g.force_db_role
+    # Try to get role from current logged-in user
+    try:
+        from flask_login import current_user
+        if current_user.is_authenticated:
+            return current_user.user_type
+        # Unauthenticated requests (registration, public endpoints)
+        return 'admin'
+    except:
+        # Flask-Login not available or error - use admin
+        return 'admin'
+
+
+def current_db_role():
+    """
+    Role the current request's queries run (or will run) under.
+
+    Results read under one role must not be served to another, since each
+    MySQL user sees different tables; caches key on this.
+    """
+    if not has_request_context():
+        return 'admin'
+    return g.get('db_role') or _request_role()
+
 
 def get_db(user_role=None):
     """
@@ -17,7 +485,8 @@ def get_db(user_role=None):
                   Falls back to 'admin' for unauthenticated requests
 
     Returns:
-        Database connection with appropriate privilege level
+        Pooled database connection with appropriate privilege level
+        (returned to its role's pool by close_db at teardown)
 
     Security Benefits:
         - Patient sessions automatically use app_patient DB user
@@ -29,61 +498,234 @@ def get_db(user_role=None):
     if 'db' not in g:
         # Determine which role to use for this connection
         if user_role is None:
-            # Check if there's a forced role for this request
-            if hasattr(g, 'force_db_role'):
-                user_role = g.force_db_role
-            else:
-                # Try to get role from current logged-in user
-                try:
-                    from flask_login import current_user
-                    if current_user.is_authenticated:
-                        user_role = current_user.user_type
-                    else:
-                        # Unauthenticated requests (registration, public endpoints)
-                        user_role = 'admin'
-                except:
-                    # Flask-Login not available or error - use admin
-                    user_role = 'admin'
-
-        # Get configuration for this role
-        config = get_db_config(user_role)
-
-        # Create connection with role-specific credentials
-        g.db = pymysql.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password'],
-            database=config['database'],
-            cursorclass=DictCursor
-        )
+            user_role = _request_role()
+
+        # Borrow a connection with role-specific credentials from that role's pool
+        pool = get_pool(user_role)
+        start = time.perf_counter()
+        try:
+            g.db = pool.acquire()
+        except PoolExhaustedError as e:
+            # Kept so the app answers 503 even if a view's catch-all except swallows it
+            g.pool_exhausted = e
+            raise
+        record_acquire(time.perf_counter() - start)
+        g.db_pool = pool
 
         # Store the role used for this connection (useful for debugging/logging)
         g.db_role = user_role
 
     return g.db
 
+def _write_token():
+    """The session's last-write token, or None once it has expired"""
+    token = session.get('db_write')
+    if token and time.time() - token['at'] > REPLICA_CONFIG['token_ttl']:
+        session.pop('db_write', None)
+        return None
+    return token
+
+
+def _caught_up(conn, token):
+    """Has this replica executed the GTIDs of the session's last write?"""
+    cursor = conn.cursor(InstrumentedCursor)
+    try:
+        if REPLICA_CONFIG['gtid_wait'] > 0:
+            # Returns 0 once applied, 1 on timeout
+            cursor.execute("SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, %s)",
+                           (token['gtid'], REPLICA_CONFIG['gtid_wait']))
+            return cursor.fetchone()[0] == 0
+        cursor.execute("SELECT GTID_SUBSET(%s, @@GLOBAL.gtid_executed)", (token['gtid'],))
+        return cursor.fetchone()[0] == 1
+    finally:
+        cursor.close()
+
+
+def _replica_order():
+    """Replica indexes to try, round-robin, skipping ones that recently failed"""
+    count = len(REPLICA_CONFIG['replicas'])
+    start = next(_replica_turn) % count
+    now = time.monotonic()
+    return [index for index in ((start + offset) % count for offset in range(count))
+            if _replica_down_until.get(index, 0) <= now]
+
+
+def get_read_db():
+    """
+    Get a connection for read-only statements.
+
+    With replicas configured, reads go to a replica unless the user could
+    miss their own writes there:
+        - this request has written, or has a transaction open on the primary
+        - the session's last write is not yet on the replica (gtid mode:
+          checked with GTID_SUBSET / WAIT_FOR_EXECUTED_GTID_SET; timestamp
+          mode: within lag_window seconds of the write)
+    In those cases, and when no replica is reachable, the request's primary
+    connection from get_db() is returned.
+
+    Returns:
+        Pooled connection (returned to its pool by close_db at teardown)
+    """
+    if not REPLICA_CONFIG['replicas'] or g.get('db_wrote'):
+        return get_db()
+    primary = g.get('db')
+    if primary is not None and primary.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+        return get_db()
+    if 'read_db' in g:
+        return g.read_db
+    if g.get('read_from_primary'):
+        return get_db()
+
+    token = _write_token()
+    if token and REPLICA_CONFIG['consistency'] == 'timestamp':
+        if time.time() - token['at'] < REPLICA_CONFIG['lag_window']:
+            g.read_from_primary = True
+            return get_db()
+        token = None
+
+    role = _request_role()
+    for index in _replica_order():
+        pool = get_replica_pool(role, index)
+        start = time.perf_counter()
+        try:
+            conn = pool.acquire()
+        except PoolExhaustedError:
+            continue
+        except Exception as e:
+            logger.warning("Replica %s unreachable, skipping for %ss: %s",
+                           pool.stats()['server'], REPLICA_CONFIG['retry_interval'], e)
+            _replica_down_until[index] = time.monotonic() + REPLICA_CONFIG['retry_interval']
+            continue
+        record_acquire(time.perf_counter() - start)
+        try:
+            fresh = token is None or _caught_up(conn, token)
+        except Exception:
+            pool.release(conn, discard=True)
+            continue
+        if not fresh:
+            pool.release(conn)
+            continue
+        g.read_db = conn
+        g.read_db_pool = pool
+        # Same role label as get_db, for requests that only read from a replica
+        g.db_role = role
+        return conn
+
+    g.read_from_primary = True
+    return get_db()
+
+
+def remember_write(response):
+    """
+    After a request that wrote, store a read-your-writes token in the session.
+
+    gtid mode records the primary's gtid_executed (which includes this
+    request's commits); timestamp mode just records when the write happened.
+    """
+    if not REPLICA_CONFIG['replicas'] or not g.get('db_wrote'):
+        return response
+    token = {'at': time.time()}
+    if REPLICA_CONFIG['consistency'] == 'gtid':
+        try:
+            cursor = get_db().cursor(InstrumentedCursor)
+            cursor.execute("SELECT @@GLOBAL.gtid_executed")
+            token['gtid'] = cursor.fetchone()[0]
+            cursor.close()
+        except Exception as e:
+            # Without a GTID set, fall back to the primary for the whole token lifetime
+            logger.warning("Could not read gtid_executed: %s", e)
+            token['gtid'] = None
+    session['db_write'] = token
+    return response
+
+
 def close_db(e=None):
-    """Close database connection at end of request"""
+    """Return database connections to their pools at end of request"""
+    read_db = g.pop('read_db', None)
+    read_pool = g.pop('read_db_pool', None)
+    if read_db is not None and read_pool is not None:
+        read_pool.release(read_db)
+
     db = g.pop('db', None)
+    pool = g.pop('db_pool', None)
     if db is not None:
-        db.close()
+        if pool is not None:
+            pool.release(db)
+        else:
+            db.close()
 
 def init_app(app):
     """Register database functions with Flask app"""
+    app.teardown_request(report_repeated_queries)
+    app.after_request(remember_write)
     app.teardown_appcontext(close_db)
 
-def execute_query(query, params=None):
-    """Execute SELECT query"""
-    db = get_db()
+def execute_query(query, params=None, primary=False):
+    """
+    Execute SELECT query (on a replica when one can serve this session).
+
+    Pass primary=True for results that outlive the request (shared caches),
+    which must not be filled from a lagging replica.
+    """
+    db = get_db() if primary else get_read_db()
     cursor = db.cursor()
     cursor.execute(query, params or ())
     result = cursor.fetchall()
     cursor.close()
     return result
 
-def execute_one(query, params=None):
-    """Execute SELECT query, return one result"""
-    db = get_db()
+def execute_columns(query, params=None):
+    """
+    Execute SELECT query with a tuple cursor.
+
+    Skips building a dict per row; column names are reported once instead.
+    Replica-routed like execute_query.
+
+    Returns:
+        (list of column names, list of row tuples)
+    """
+    db = get_read_db()
+    cursor = db.cursor(InstrumentedCursor)
+    cursor.execute(query, params or ())
+    columns = [column[0] for column in cursor.description or ()]
+    result = list(cursor.fetchall())
+    cursor.close()
+    return columns, result
+
+def execute_batch(statements):
+    """
+    Execute several SELECTs on the read connection (replica-routed like
+    execute_query), one statement after another.
+
+    Unless the connection is already inside a transaction, they run in one
+    read-only consistent snapshot, so every result reflects the same point
+    in time.
+
+    Args:
+        statements: List of (query, params) pairs
+
+    Returns:
+        List of row lists, one per statement, in order
+    """
+    db = get_read_db()
+    cursor = db.cursor()
+    snapshot = not db.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS
+    try:
+        if snapshot:
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        results = []
+        for query, params in statements:
+            cursor.execute(query, params or ())
+            results.append(list(cursor.fetchall()))
+        if snapshot:
+            db.commit()
+    finally:
+        cursor.close()
+    return results
+
+def execute_one(query, params=None, primary=False):
+    """Execute SELECT query, return one result (replica-routed and primary= like execute_query)"""
+    db = get_db() if primary else get_read_db()
     cursor = db.cursor()
     cursor.execute(query, params or ())
     result = cursor.fetchone()
@@ -105,6 +747,46 @@ def execute_update(query, params=None):
         cursor.close()
         raise e
 
+def stream_query(query, params=None, batch_size=500):
+    """
+    Execute SELECT query and yield rows one at a time.
+
+    Uses an unbuffered server-side cursor (SSDictCursor), so rows are read
+    off the socket as they are consumed and memory stays flat however large
+    the result is. The request connection is busy until the generator is
+    exhausted; if the caller stops early the connection is discarded rather
+    than draining the rest of the result set.
+    """
+    db = get_db()
+    cursor = db.cursor(InstrumentedSSDictCursor)
+    exhausted = False
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+        exhausted = True
+    finally:
+        if exhausted:
+            cursor.close()
+        else:
+            discard_db()
+
+
+def discard_db():
+    """Close the request connection instead of returning it to the pool"""
+    db = g.pop('db', None)
+    pool = g.pop('db_pool', None)
+    if db is not None:
+        if pool is not None:
+            pool.release(db, discard=True)
+        else:
+            db.close()
+
+
 def call_procedure(proc_name, params=None):
     """Call stored procedure"""
     db = get_db()
@@ -117,4 +799,64 @@ def call_procedure(proc_name, params=None):
     except Exception as e:
         db.rollback()
         cursor.close()
-        raise e
\ No newline at end of file
+        raise e
+
+
+class UnitOfWork:
+    """
+    Statements executed on the request connection and committed together.
+
+    Obtained from transaction(); nothing is committed until the with-block
+    exits cleanly, and any exception rolls the whole batch back.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.cursor = db.cursor()
+
+    def execute(self, query, params=None):
+        """Execute one statement, returning lastrowid"""
+        self.cursor.execute(query, params or ())
+        return self.cursor.lastrowid
+
+    def executemany(self, query, seq_of_params):
+        """
+        Execute a statement for every parameter tuple.
+
+        INSERT ... VALUES statements are rewritten by pymysql into multi-row
+        inserts, so N rows cost one round trip instead of N.
+        """
+        seq_of_params = list(seq_of_params)
+        if not seq_of_params:
+            return 0
+        return self.cursor.executemany(query, seq_of_params)
+
+    def query(self, query, params=None):
+        """Run a SELECT inside the transaction"""
+        self.cursor.execute(query, params or ())
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+@contextmanager
+def transaction():
+    """
+    Group several writes into a single transaction with one commit.
+
+    Usage:
+        with transaction() as tx:
+            tx.execute("INSERT INTO ...", (...))
+            tx.executemany("INSERT INTO ... VALUES (%s, %s)", rows)
+    """
+    db = get_db()
+    uow = UnitOfWork(db)
+    try:
+        yield uow
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        uow.close()
@@ -0,0 +1,117 @@
+import hashlib
+import warnings
+from collections import defaultdict
+from functools import wraps
+
+from flask import Response, make_response, request
+from flask_login import current_user
+
+from cache import cache
+from config import ETAG_CONFIG
+
+
+def bump_versions(*resources):
+    """
+    Mark resources as changed so ETags computed from them stop matching.
+
+    Args:
+        resources: Resource names, e.g. 'patients' or 'appointments:patient:12'
+    """
+    for name in resources:
+        cache.backend.incr(name)
+
+
+def etags_active():
+    """
+    Whether conditional() sends ETags.
+
+    They need every write's version bump to be visible here: true with a
+    shared cache backend, or with the memory backend when ETAG_CONFIG says
+    a single process serves all requests.
+    """
+    return ETAG_CONFIG['enabled'] and (cache.backend.shared or ETAG_CONFIG['single_process'])
+
+
+_warned = False
+
+
+def _warn_inactive():
+    """Say once why ETags are off despite ETAG_CONFIG['enabled']"""
+    global _warned
+    if ETAG_CONFIG['enabled'] and not _warned:
+        _warned = True
+        warnings.warn("ETags are off: the memory cache backend is per process. Use the redis backend, "
+                      "or set ETAG_CONFIG['single_process'] when one process serves every request")
+
+
+def owner(resource, user_type, reference_id):
+    """Resource name scoped to one patient/physician, e.g. 'appointments:patient:12'"""
+    return f"{resource}:{user_type}:{reference_id}"
+
+
+def resolve_resources(templates, view_args):
+    """
+    Fill in resource name templates for the current request.
+
+    '{user}' becomes '<user_type>:<reference_id>' of the logged-in user,
+    '{patient}' 'patient:<id>' of the patient the request is about (the
+    user themselves for patients, the patient_id parameter otherwise),
+    '{args[name]}' a query string parameter and '{name}' a URL parameter.
+    """
+    user = f"{current_user.user_type}:{current_user.reference_id}" if current_user.is_authenticated else 'anonymous'
+    args = defaultdict(str, request.args.to_dict())
+    if current_user.is_authenticated and current_user.user_type == 'patient':
+        patient = user
+    else:
+        patient = f"patient:{args['patient_id']}"
+    return [template.format(user=user, patient=patient, args=args, **view_args) for template in templates]
+
+
+def compute_etag(resources):
+    """Strong ETag for the current request given the versions of the resources it reads"""
+    backend = cache.backend
+    parts = [backend.epoch(), request.full_path]
+    if current_user.is_authenticated:
+        parts.append(str(current_user.id))
+    versions = backend.get_counters(resources)
+    parts.extend(f"{name}={version}" for name, version in zip(resources, versions))
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+def conditional(*templates):
+    """
+    Answer GETs with a strong ETag and short-circuit If-None-Match with 304.
+
+    The ETag is derived from the version counters of the resources the view
+    reads, so a matching If-None-Match is answered before the view (and its
+    queries) run. Versions are read before the view, so a write racing with
+    the request can only make the next request return 200 again.
+
+    Only active when etags_active(): a per-process memory backend never sees
+    version bumps from writes handled by other worker processes, so its ETags
+    could keep matching stale data. Otherwise the view always runs and no
+    ETag is sent.
+
+    Args:
+        templates: Resource names the view depends on (see resolve_resources)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not etags_active():
+                _warn_inactive()
+                return view(*args, **kwargs)
+            etag = compute_etag(resolve_resources(templates, kwargs))
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,280 @@
+"""
+EXPLAIN every SQL query in app.py and fail on full table scans.
+
+Queries are pulled out of app.py's route handlers (string literals starting
+with SELECT). Listing queries assembled at runtime are built through the
+same code the app uses: the keyset pages of every fetch_page() call in
+app.py (first and continuation page), the query engine's default listing
+of each queryable table, and each export's plan. Placeholders are filled
+with a sample value and each query is run through EXPLAIN. Any plan step
+with access type ALL is a full table scan and fails the check, unless the
+handler is listed in ALLOWED_FULL_SCANS because it deliberately reads the
+whole table.
+
+A query that cannot be EXPLAINed (or a fetch_page() call whose arguments
+can't be resolved) is a skip. Skips are always reported and fail the check
+unless listed in ALLOWED_SKIPS, so a query can't escape the check just by
+not parsing.
+
+Run it against a database with realistic row counts (e.g. the benchmark
+dataset): on the 10-row seed data MySQL may prefer a scan even when a
+usable index exists.
+
+Usage:
+    python explain_check.py [--verbose]
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+
+import itertools
+
+import pymysql
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Handlers that read an entire table (or page through one) by design
+ALLOWED_FULL_SCANS = {
+    'get_patients': 'lists every patient',
+    'get_physicians': 'lists physicians (keyset-paged, no filter)',
+    'get_clinic': 'lists every clinic when no clinic_id is given',
+    'get_patients_data': 'keyset-paged listing of all patients',
+    'get_physicians_data': 'keyset-paged listing of all physicians',
+    'get_clinics_data': 'lists every clinic',
+    'get_health_reports_data': 'keyset-paged / streamed listing of all reports',
+    'get_work_assignments_data': 'keyset-paged listing of all work assignments',
+    'get_prescriptions_data': 'keyset-paged / streamed listing of all prescriptions',
+    'filter_data': 'table and column are chosen at runtime',
+    'export:workassignments': 'full-only export of every work assignment',
+}
+
+# Queries that may fail to EXPLAIN with the sample value, by handler / label
+ALLOWED_SKIPS = {}
+
+SAMPLE_VALUE = "'1'"
+
+
+def extract_queries(path=APP_FILE):
+    """
+    Find SELECT statements in app.py.
+
+    Returns:
+        List of (function_name, line_number, sql)
+    """
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read())
+
+    queries = []
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        for node in ast.walk(function):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                sql = ' '.join(node.value.split())
+                if sql.upper().startswith('SELECT ') and ' FROM ' in sql.upper():
+                    queries.append((function.name, node.lineno, sql))
+    return queries
+
+
+def _literal_assignments(function):
+    """Literal values assigned to each local name in a function, in source order"""
+    assigned = {}
+    for node in ast.walk(function):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                continue
+            assigned.setdefault(node.targets[0].id, []).append((node.lineno, value))
+    for values in assigned.values():
+        values.sort(key=lambda item: item[0])
+    return {name: [value for _, value in values] for name, values in assigned.items()}
+
+
+def _call_argument(node, assigned):
+    """Possible values of a call argument: the literal itself or the literals its name was assigned"""
+    if isinstance(node, ast.Name):
+        return assigned.get(node.id, [])
+    try:
+        return [ast.literal_eval(node)]
+    except ValueError:
+        return []
+
+
+def page_queries(path=APP_FILE):
+    """
+    Build the keyset page queries of every fetch_page() call in app.py.
+
+    The select and keys arguments are resolved to the literals assigned to
+    them in the handler. When a handler assigns both in matching branches,
+    the assignments are paired in source order. A where argument is the
+    request's filter, so the unfiltered listing is checked.
+
+    Returns:
+        (queries, unresolved): queries as (function_name, location, sql);
+        unresolved as (function_name, location, reason)
+    """
+    from pagination import page_query
+
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read())
+
+    queries = []
+    unresolved = []
+    for function in tree.body:
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        assigned = _literal_assignments(function)
+        for node in ast.walk(function):
+            if not (isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'fetch_page'):
+                continue
+            location = f"app.py:{node.lineno} fetch_page"
+            if len(node.args) < 2:
+                unresolved.append((function.name, location, 'select or keys is not a literal'))
+                continue
+            selects = _call_argument(node.args[0], assigned)
+            key_sets = _call_argument(node.args[1], assigned)
+            if not selects or not key_sets:
+                unresolved.append((function.name, location, 'select or keys is not a literal'))
+                continue
+            if len(selects) == len(key_sets):
+                pairs = zip(selects, key_sets)
+            else:
+                pairs = itertools.product(selects, key_sets)
+            for select, keys in pairs:
+                select = ' '.join(select.split())
+                queries.append((function.name, location, page_query(select, keys)[0]))
+                queries.append((function.name, f"{location}, next page",
+                                page_query(select, keys, values=[1] * len(keys))[0]))
+    return queries, unresolved
+
+
+def engine_queries():
+    """
+    Build the query engine's default listing (first and continuation page)
+    for every table /api/query accepts.
+
+    Returns:
+        (queries, unresolved) like page_queries
+    """
+    from config import QUERY_CONFIG
+    from pagination import page_query
+    from query_engine import QueryError, compile_query
+
+    queries = []
+    unresolved = []
+    for table in QUERY_CONFIG['tables']:
+        label = f"query:{table}"
+        try:
+            compiled = compile_query({'table': table}, 'admin')
+        except QueryError as e:
+            unresolved.append((label, 'query_engine.py', str(e)))
+            continue
+        first, _ = page_query(compiled['select'], compiled['keys'], where=compiled['where'])
+        after, _ = page_query(compiled['select'], compiled['keys'], where=compiled['where'],
+                              values=[1] * len(compiled['keys']))
+        queries.append((label, 'query_engine.py', first))
+        queries.append((label, 'query_engine.py, next page', after))
+    return queries, unresolved
+
+
+def export_queries(conn):
+    """
+    Plan every export: incremental for keyed exports, full for the rest.
+
+    Returns:
+        (queries, unresolved) like page_queries
+    """
+    from export import EXPORTS, plan_export
+
+    queries = []
+    for name, spec in EXPORTS.items():
+        plan = plan_export(conn, name, since=None if spec['key'] is None else 0)
+        queries.append((f"export:{name}", 'export.py', ' '.join(plan['sql'].split())))
+    return queries, []
+
+
+def bind_sample(sql):
+    """Replace %s and {} placeholders with a literal so EXPLAIN can plan it"""
+    return re.sub(r'%s|\{\}', SAMPLE_VALUE, sql)
+
+
+def check(conn, verbose=False):
+    """
+    EXPLAIN each extracted and built query.
+
+    Returns:
+        (failures, skips): failure descriptions (empty when every plan uses
+        an index and every skip is allowed) and the skipped queries
+    """
+    failures = []
+    skips = []
+    queries = [(function, f"app.py:{line}", sql) for function, line, sql in extract_queries()]
+    for builder in (page_queries, engine_queries, lambda: export_queries(conn)):
+        built, unresolved = builder()
+        queries.extend(built)
+        skips.extend(unresolved)
+
+    cursor = conn.cursor(pymysql.cursors.DictCursor)
+    for label, location, sql in queries:
+        try:
+            cursor.execute('EXPLAIN ' + bind_sample(sql))
+        except pymysql.err.MySQLError as e:
+            skips.append((label, location, f"cannot EXPLAIN: {e.args[-1]}"))
+            continue
+        plan = cursor.fetchall()
+        scans = [step['table'] for step in plan if step.get('type') == 'ALL']
+
+        if scans and label not in ALLOWED_FULL_SCANS:
+            failures.append(f"{label} ({location}) full scan on {', '.join(scans)}: {sql[:100]}")
+            status = 'FAIL'
+        elif scans:
+            status = 'ok*'
+        else:
+            status = 'ok'
+        if verbose:
+            steps = ', '.join(f"{step['table']}:{step['type']}:{step.get('key') or '-'}" for step in plan)
+            print(f"{status:5} {label} ({location}) [{steps}]")
+    cursor.close()
+
+    for label, location, reason in skips:
+        if label not in ALLOWED_SKIPS:
+            failures.append(f"{label} ({location}) was not checked: {reason}")
+    return failures, skips
+
+
+def main():
+    from config import get_db_config
+
+    parser = argparse.ArgumentParser(description='Fail if any app.py query does a full table scan')
+    parser.add_argument('--verbose', action='store_true', help='Print the plan summary for every query')
+    args = parser.parse_args()
+
+    config = get_db_config('admin')
+    conn = pymysql.connect(
+        host=config['host'],
+        port=config['port'],
+        user=config['user'],
+        password=config['password'],
+        database=config['database']
+    )
+    try:
+        failures, skips = check(conn, verbose=args.verbose)
+    finally:
+        conn.close()
+
+    for label, location, reason in skips:
+        allowed = ' (allowed)' if label in ALLOWED_SKIPS else ''
+        print(f"skip  {label} ({location}): {reason}{allowed}")
+    print(f"{len(skips)} quer{'y' if len(skips) == 1 else 'ies'} skipped")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print('No unexpected full table scans')
+
+
+if __name__ == '__main__':
+    main()
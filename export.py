@@ -0,0 +1,390 @@
+"""
+Streaming export of whitelisted tables and joined views.
+
+Rows come off an unbuffered server-side cursor in chunks, are encoded as
+CSV, NDJSON or Parquet (Parquet needs the optional pyarrow package) and
+written out chunk by chunk, gzip-compressed for the text formats, so
+memory stays flat however large the table is.
+
+Incremental exports are keyed on each export's primary key. An export
+covers key > since up to a high-water mark read before streaming starts
+(MAX(key)); the next run passes that mark as `since`. IDs are handed out
+in per-process blocks (ids.py), so a concurrent writer can commit a
+lower ID after the mark was taken; pass `overlap` to re-read a window
+below `since` and de-duplicate on the key downstream. Joined exports are
+keyed on the parent row: children added to an already exported parent
+are not picked up.
+
+Usage:
+    python export.py healthreports --format csv --output exports/
+    python export.py reports_with_prescriptions --format parquet --state export_state.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pymysql
+from pymysql.constants import FIELD_TYPE
+
+from config import EXPORT_CONFIG
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# name -> select (no WHERE/ORDER), table holding the key, key expression and
+# result column (None: full exports only), order
+EXPORTS = {
+    'patients': {
+        'select': "SELECT PatientID, Name, DOB, BloodType, PhoneNumber, Address FROM Patient",
+        'table': 'Patient', 'key': ('PatientID', 'PatientID'),
+    },
+    'physicians': {
+        'select': "SELECT PhysicianID, Name, PhoneNumber, Department FROM Physician",
+        'table': 'Physician', 'key': ('PhysicianID', 'PhysicianID'),
+    },
+    'clinics': {
+        'select': "SELECT ClinicID, Name, Address FROM Clinic",
+        'table': 'Clinic', 'key': ('ClinicID', 'ClinicID'),
+    },
+    'appointments': {
+        'select': "SELECT AppointmentID, ClinicID, PatientID, PhysicianID, AppointmentDate, AppointmentTime FROM Appointment",
+        'table': 'Appointment', 'key': ('AppointmentID', 'AppointmentID'),
+    },
+    'healthreports': {
+        'select': "SELECT ReportID, PhysicianID, PatientID, ReportDate, Weight, Height FROM HealthReport",
+        'table': 'HealthReport', 'key': ('ReportID', 'ReportID'),
+    },
+    'prescriptions': {
+        'select': "SELECT PrescriptionID, ReportID, PhysicianID, DrugName, Dosage, Frequency, StartDate, EndDate, Instructions FROM Prescription",
+        'table': 'Prescription', 'key': ('PrescriptionID', 'PrescriptionID'),
+    },
+    'history': {
+        'select': "SELECT HistoryID, PatientID, HealthCondition, DiagnosisDate, TreatmentReceived, Outcome, OngoingCare FROM MedicalHistory",
+        'table': 'MedicalHistory', 'key': ('HistoryID', 'HistoryID'),
+    },
+    'billing': {
+        'select': "SELECT BillingID, PatientID, AppointmentID, InsuranceID, TotalAmount, PaymentStatus, BillingDate, DueDate FROM Billing",
+        'table': 'Billing', 'key': ('BillingID', 'BillingID'),
+    },
+    'workassignments': {
+        'select': "SELECT ClinicID, PhysicianID, ScheduleID, DateJoined, HourlyRate FROM WorksAt",
+        'table': 'WorksAt', 'key': None, 'order': 'ClinicID, PhysicianID',
+    },
+    'reports_with_prescriptions': {
+        'select': """
+            SELECT hr.ReportID, hr.ReportDate, hr.PatientID, hr.PhysicianID, hr.Weight, hr.Height,
+                   pr.PrescriptionID, pr.DrugName, pr.Dosage, pr.Frequency,
+                   pr.StartDate, pr.EndDate, pr.Instructions
+            FROM HealthReport hr
+            LEFT JOIN Prescription pr ON pr.ReportID = hr.ReportID
+        """,
+        'table': 'HealthReport', 'key': ('hr.ReportID', 'ReportID'),
+        'order': 'hr.ReportID, pr.PrescriptionID',
+    },
+    'appointments_with_billing': {
+        'select': """
+            SELECT a.AppointmentID, a.ClinicID, a.PatientID, a.PhysicianID,
+                   a.AppointmentDate, a.AppointmentTime,
+                   b.BillingID, b.InsuranceID, b.TotalAmount, b.PaymentStatus, b.BillingDate, b.DueDate
+            FROM Appointment a
+            LEFT JOIN Billing b ON b.AppointmentID = a.AppointmentID
+        """,
+        'table': 'Appointment', 'key': ('a.AppointmentID', 'AppointmentID'),
+        'order': 'a.AppointmentID, b.BillingID',
+    },
+}
+
+
+class ExportError(ValueError):
+    """Bad export request (unknown name, format or incremental option)"""
+
+
+def _plain(value):
+    """CSV/JSON representation: ISO dates, HH:MM:SS times, exact decimals"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class CSVEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        self.header = True
+
+    def encode(self, rows):
+        if self.header:
+            self.writer.writerow(self.columns)
+            self.header = False
+        self.writer.writerows([_plain(value) for value in row] for row in rows)
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data.encode('utf-8')
+
+    def finish(self):
+        return self.encode([]) if self.header else b''
+
+
+class NDJSONEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def encode(self, rows):
+        return ''.join(
+            json.dumps(dict(zip(self.columns, map(_plain, row))), separators=(',', ':')) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+    def finish(self):
+        return b''
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after every row group"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_type(type_code):
+    if type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR):
+        return pyarrow.int64()
+    if type_code in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+        return pyarrow.float64()
+    if type_code in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE):
+        return pyarrow.date32()
+    if type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return pyarrow.timestamp('us')
+    if type_code == FIELD_TYPE.TIME:
+        return pyarrow.duration('us')
+    return pyarrow.string()
+
+
+class ParquetEncoder:
+    """One Parquet row group per chunk, schema taken from the cursor description"""
+
+    def __init__(self, columns, description):
+        if pyarrow is None:
+            raise ExportError('Parquet export requires the pyarrow package')
+        self.columns = columns
+        self.schema = pyarrow.schema([(column, _arrow_type(field[1])) for column, field in zip(columns, description)])
+        self.sink = _ChunkSink()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression='snappy')
+
+    def encode(self, rows):
+        columns = list(zip(*rows)) if rows else [[] for _ in self.columns]
+        arrays = []
+        for values, field in zip(columns, self.schema):
+            if pyarrow.types.is_floating(field.type):
+                values = [float(value) if value is not None else None for value in values]
+            elif pyarrow.types.is_string(field.type):
+                values = [str(value) if value is not None else None for value in values]
+            arrays.append(pyarrow.array(values, type=field.type))
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+class GzipStream:
+    """Incremental gzip (one member) over encoded chunks"""
+
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def plan_export(conn, name, since=None, overlap=0):
+    """
+    Resolve an export into SQL and its high-water mark.
+
+    Returns:
+        Dict with sql, params and high_water_mark (None for full-only exports)
+    """
+    spec = EXPORTS.get(name)
+    if spec is None:
+        raise ExportError(f"Unknown export '{name}' (expected one of {', '.join(sorted(EXPORTS))})")
+
+    if spec['key'] is None:
+        if since is not None:
+            raise ExportError(f"Export '{name}' has no key and only supports full exports")
+        return {'sql': f"{spec['select']} ORDER BY {spec['order']}", 'params': (), 'high_water_mark': None}
+
+    key_expr, key_column = spec['key']
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    try:
+        cursor.execute(f"SELECT MAX({key_column}) FROM {spec['table']}")
+        high_water_mark = cursor.fetchone()[0] or 0
+    finally:
+        cursor.close()
+
+    conditions = [f"{key_expr} <= %s"]
+    params = [high_water_mark]
+    if since is not None:
+        conditions.insert(0, f"{key_expr} > %s")
+        params.insert(0, max(int(since) - int(overlap or 0), 0))
+    order = spec.get('order', key_expr)
+    return {
+        'sql': f"{spec['select']} WHERE {' AND '.join(conditions)} ORDER BY {order}",
+        'params': tuple(params),
+        'high_water_mark': high_water_mark,
+    }
+
+
+def export_chunks(conn, plan, fmt, compress=True, chunk_rows=None, on_abort=None):
+    """
+    Yield encoded (and optionally gzipped) bytes for an export plan.
+
+    Rows are read with an unbuffered cursor. If the consumer stops early,
+    the connection still has unread results; on_abort is called so the
+    caller can discard it.
+    """
+    from db import InstrumentedSSCursor
+
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    chunk_rows = chunk_rows or EXPORT_CONFIG['chunk_rows']
+
+    cursor = conn.cursor(InstrumentedSSCursor)
+    finished = False
+    try:
+        cursor.execute(plan['sql'], plan['params'])
+        columns = [field[0] for field in cursor.description]
+        if fmt == 'csv':
+            encoder = CSVEncoder(columns)
+        elif fmt == 'ndjson':
+            encoder = NDJSONEncoder(columns)
+        else:
+            encoder = ParquetEncoder(columns, cursor.description)
+        gzip = GzipStream(EXPORT_CONFIG['compress_level']) if compress and fmt != 'parquet' else None
+
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            data = encoder.encode(rows)
+            if gzip:
+                data = gzip.compress(data)
+            if data:
+                yield data
+
+        tail = encoder.finish()
+        if gzip:
+            tail = gzip.compress(tail) + gzip.finish()
+        if tail:
+            yield tail
+        finished = True
+    finally:
+        if finished:
+            cursor.close()
+        elif on_abort is not None:
+            on_abort()
+
+
+def file_name(name, fmt, compress=True, since=None, high_water_mark=None):
+    suffix = '.gz' if compress and fmt != 'parquet' else ''
+    span = f"-{since or 0}-{high_water_mark}" if high_water_mark is not None else ''
+    return f"{name}{span}.{fmt}{suffix}"
+
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a table or joined view')
+    parser.add_argument('name', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', default='.', help='directory for the export file')
+    parser.add_argument('--no-compress', action='store_true', help='write plain CSV/NDJSON')
+    parser.add_argument('--since', type=int, help='export rows with key > since')
+    parser.add_argument('--overlap', type=int, default=0, help='re-read this many keys below since')
+    parser.add_argument('--state', help='JSON file holding the high-water mark per export (incremental runs)')
+    args = parser.parse_args(argv)
+
+    from db import get_pool
+
+    state = load_state(args.state)
+    since = args.since if args.since is not None else state.get(args.name)
+    compress = not args.no_compress
+
+    pool = get_pool('admin')
+    conn = pool.acquire()
+    try:
+        plan = plan_export(conn, args.name, since, args.overlap)
+        os.makedirs(args.output, exist_ok=True)
+        path = os.path.join(args.output, file_name(args.name, args.format, compress, since, plan['high_water_mark']))
+        with open(path + '.part', 'wb') as f:
+            for data in export_chunks(conn, plan, args.format, compress, on_abort=conn.close):
+                f.write(data)
+        os.replace(path + '.part', path)
+    finally:
+        pool.release(conn, discard=not conn.open)
+
+    print(f"Wrote {path}")
+    if args.state and plan['high_water_mark'] is not None:
+        state[args.name] = plan['high_water_mark']
+        save_state(args.state, state)
+        print(f"High-water mark for {args.name}: {plan['high_water_mark']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@ import { Table, Button, Loader, Text, Group, ActionIcon, Modal } from '@mantine/
 import { IconDownload, IconEdit, IconTrash } from '@tabler/icons-react';
 import { useNavigate } from 'react-router-dom';
 import { generateHealthReportPDF } from '../../utils/pdfGenerator';
+import { fetchPage } from '../../utils/fetchPage';
 import EditWorkAssignmentModal from '../EditWorkAssignmentModal/EditWorkAssignmentModal';
 import "./EntityTable.css";
 
@@ -15,32 +16,42 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
   const [selectedWorkAssignment, setSelectedWorkAssignment] = useState(null);
   const [workAssignmentToDelete, setWorkAssignmentToDelete] = useState(null);
   const [deleting, setDeleting] = useState(false);
+  // Cursor each visited page was fetched with (null for the first page)
+  const [pageCursors, setPageCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
   const navigate = useNavigate();
 
+  // The server applies the filter, so a new filter starts again from page 1
   useEffect(() => {
-    fetchData();
-  }, [activeTab]);
+    setPageCursors([null]);
+    fetchData(null);
+  }, [activeTab, appliedFilter]);
 
-  const fetchData = async () => {
+  const currentCursor = pageCursors[pageCursors.length - 1];
+
+  const fetchData = async (cursor = currentCursor) => {
     setLoading(true);
     setError(null);
     
     try {
       let endpoint = `/api/data/${activeTab === 'healthreport' ? 'healthreports' : activeTab === 'workassignment' ? 'workassignments' : activeTab + 's'}`;
       
+      const params = new URLSearchParams();
       if (activeTab === 'healthreport') {
-        endpoint += '?include_prescription_ids=true';
+        params.set('include_prescription_ids', 'true');
+      }
+      if (appliedFilter) {
+        params.set('filter', appliedFilter);
+      }
+      if (params.toString()) {
+        endpoint += `?${params.toString()}`;
       }
       
-      
-      const response = await fetch(endpoint, {
-        credentials: 'include'
-      });
-      
-      const result = await response.json();
+      const result = await fetchPage(endpoint, cursor);
       
       if (result.success) {
-        setData(result.data || []);
+        setData(result.data);
+        setNextCursor(result.nextCursor);
       } else {
         setError(result.error || 'Failed to fetch data');
       }
@@ -51,99 +62,6 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
     }
   };
   
-  const filterData = (data, filter) => {
-    if (!filter) return data;
-    
-    return data.filter(item => {
-      const queries = filter.split(';').map(q => q.trim());
-      
-      return queries.every(query => {
-        if (!query.includes(',')) {
-          return Object.values(item).some(value => 
-            value && value.toString().toLowerCase().includes(query.toLowerCase())
-          );
-        }
-        
-        const [attr, value] = query.split(',').map(s => s.trim());
-        const attrLower = attr.toLowerCase();
-        const valueLower = value.toLowerCase();
-        
-        if (activeTab === 'healthreport') {
-          if (attrLower === 'id') {
-            return item.id && item.id.toString() === value;
-          }
-          if (attrLower === 'patientid' || attrLower === 'patient id') {
-            return item.patientId && item.patientId.toString() === value;
-          }
-          if (attrLower === 'physicianid' || attrLower === 'physician id') {
-            return item.physicianId && item.physicianId.toString() === value;
-          }
-          if (attrLower === 'patient') {
-            // Search in both patient name and combined format "name (id)"
-            const combinedPatient = `${item.patient} (${item.patientId})`.toLowerCase();
-            return (item.patient && item.patient.toLowerCase().includes(valueLower)) ||
-                   combinedPatient.includes(valueLower);
-          }
-          if (attrLower === 'physician') {
-            // Search in both physician name and combined format "name (id)"
-            const combinedPhysician = `${item.physician} (${item.physicianId})`.toLowerCase();
-            return (item.physician && item.physician.toLowerCase().includes(valueLower)) ||
-                   combinedPhysician.includes(valueLower);
-          }
-        }
-        
-        if (activeTab === 'patient') {
-          if (attrLower === 'name') {
-            return item.name && item.name.toLowerCase().includes(valueLower);
-          }
-          if (attrLower === 'email') {
-            return item.email && item.email.toLowerCase().includes(valueLower);
-          }
-        }
-        
-        if (activeTab === 'physician') {
-          if (attrLower === 'name') {
-            return item.name && item.name.toLowerCase().includes(valueLower);
-          }
-          if (attrLower === 'department') {
-            return item.department && item.department.toLowerCase().includes(valueLower);
-          }
-        }
-        
-        if (activeTab === 'clinic') {
-          if (attrLower === 'name') {
-            return item.name && item.name.toLowerCase().includes(valueLower);
-          }
-          if (attrLower === 'address') {
-            return item.address && item.address.toLowerCase().includes(valueLower);
-          }
-        }
-        
-        if (activeTab === 'prescription') {
-          if (attrLower === 'id') {
-            return item.id && item.id.toString() === value.toString();
-          }
-          if (attrLower === 'healthreportid' || attrLower === 'health report id') {
-            return item.healthReportId && item.healthReportId.toString() === value.toString();
-          }
-          if (attrLower === 'drugname') {
-            return item.drugName && item.drugName.toLowerCase().includes(valueLower);
-          }
-          if (attrLower === 'dosage') {
-            return item.dosage && item.dosage.toLowerCase().includes(valueLower);
-          }
-          if (attrLower === 'frequency') {
-            return item.frequency && item.frequency.toLowerCase().includes(valueLower);
-          }
-        }
-        
-        return Object.values(item).some(itemValue => 
-          itemValue && itemValue.toString().toLowerCase().includes(valueLower)
-        );
-      });
-    });
-  };
-
   const handleDownloadPDF = async (reportId) => {
     try {
       setLoading(true);
@@ -292,9 +210,7 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
       );
     }
 
-    const filteredData = filterData(data, appliedFilter);
-
-    if (filteredData.length === 0) {
+    if (data.length === 0) {
       return (
         <Table.Tr>
           <Table.Td colSpan={headers.length} className="no-data">
@@ -304,7 +220,7 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
       );
     }
 
-    return filteredData.map((item, index) => {
+    return data.map((item, index) => {
       switch (activeTab) {
         case 'patient':
           return (
@@ -423,6 +339,17 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
     });
   };
 
+  const handleNextPage = () => {
+    setPageCursors([...pageCursors, nextCursor]);
+    fetchData(nextCursor);
+  };
+
+  const handlePreviousPage = () => {
+    const previous = pageCursors.slice(0, -1);
+    setPageCursors(previous);
+    fetchData(previous[previous.length - 1]);
+  };
+
   return (
     <div className="entity-table-container">
       <div className="table-scroll-wrapper">
@@ -440,6 +367,26 @@ export default function EntityTable({ headers, activeTab, appliedFilter, isAdmin
         </Table>
       </div>
 
+      <Group justify="space-between" className="table-pagination">
+        <Button
+          variant="outline"
+          size="xs"
+          onClick={handlePreviousPage}
+          disabled={loading || pageCursors.length === 1}
+        >
+          Previous
+        </Button>
+        <Text size="sm" c="dimmed">Page {pageCursors.length}</Text>
+        <Button
+          variant="outline"
+          size="xs"
+          onClick={handleNextPage}
+          disabled={loading || !nextCursor}
+        >
+          Next
+        </Button>
+      </Group>
+
       <EditWorkAssignmentModal
         opened={editModalOpen}
         onClose={() => setEditModalOpen(false)}
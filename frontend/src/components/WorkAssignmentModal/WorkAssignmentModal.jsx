@@ -2,9 +2,15 @@ import React, { useState, useEffect } from 'react';
 import { Modal, Select, Button, Group, MultiSelect, NumberInput, TextInput, Text, Alert } from '@mantine/core';
 import { IconCalendar, IconAlertCircle } from '@tabler/icons-react';
 import "./WorkAssignmentModal.css";
+import { fetchPage } from '../../utils/fetchPage';
 
 export default function WorkAssignmentModal({ opened, onClose, onSuccess }) {
   const [physicians, setPhysicians] = useState([]);
+  // Cursor each visited physician page was fetched with (null for the first page)
+  const [physicianCursors, setPhysicianCursors] = useState([null]);
+  const [nextPhysicianCursor, setNextPhysicianCursor] = useState(null);
+  // Text typed into the physician picker; searched on the server, not just this page
+  const [physicianSearch, setPhysicianSearch] = useState('');
   const [clinics, setClinics] = useState([]);
   const [selectedPhysician, setSelectedPhysician] = useState(null);
   const [selectedClinic, setSelectedClinic] = useState(null);
@@ -27,11 +33,24 @@ export default function WorkAssignmentModal({ opened, onClose, onSuccess }) {
 
   useEffect(() => {
     if (opened) {
-      fetchPhysicians();
+      setPhysicianCursors([null]);
+      fetchPhysicians(null);
       fetchClinics();
     }
   }, [opened]);
 
+  useEffect(() => {
+    if (!opened) return;
+    // Selecting an option fills the search box with its label; that is not a new search
+    const selected = physicians.find(option => option.value === selectedPhysician);
+    if (selected && selected.label === physicianSearch) return;
+    const timer = setTimeout(() => {
+      setPhysicianCursors([null]);
+      fetchPhysicians(null);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [physicianSearch]);
+
   useEffect(() => {
     if (selectedPhysician && selectedClinic) {
       checkWorkAssignmentExists();
@@ -40,24 +59,41 @@ export default function WorkAssignmentModal({ opened, onClose, onSuccess }) {
     }
   }, [selectedPhysician, selectedClinic]);
 
-  const fetchPhysicians = async () => {
+  const fetchPhysicians = async (cursor) => {
     try {
-      const response = await fetch('/api/data/physicians', {
-        credentials: 'include'
-      });
-      const result = await response.json();
+      const endpoint = physicianSearch
+        ? `/api/data/physicians?filter=${encodeURIComponent(physicianSearch)}`
+        : '/api/data/physicians';
+      const result = await fetchPage(endpoint, cursor);
       if (result.success) {
         const physicianOptions = result.data.map(p => ({
           value: p.id.toString(),
           label: `${p.name} (${p.department})`
         }));
+        // Keep the current choice selectable while paging through other physicians
+        const selected = physicians.find(option => option.value === selectedPhysician);
+        if (selected && !physicianOptions.some(option => option.value === selected.value)) {
+          physicianOptions.unshift(selected);
+        }
         setPhysicians(physicianOptions);
+        setNextPhysicianCursor(result.nextCursor);
       }
     } catch (err) {
       console.error('Error fetching physicians:', err);
     }
   };
 
+  const handleNextPhysicians = () => {
+    setPhysicianCursors([...physicianCursors, nextPhysicianCursor]);
+    fetchPhysicians(nextPhysicianCursor);
+  };
+
+  const handlePreviousPhysicians = () => {
+    const previous = physicianCursors.slice(0, -1);
+    setPhysicianCursors(previous);
+    fetchPhysicians(previous[previous.length - 1]);
+  };
+
   const fetchClinics = async () => {
     try {
       const response = await fetch('/api/data/clinics', {
@@ -163,6 +199,7 @@ export default function WorkAssignmentModal({ opened, onClose, onSuccess }) {
 
   const handleClose = () => {
     setSelectedPhysician(null);
+    setPhysicianSearch('');
     setSelectedClinic(null);
     setSelectedDays([]);
     setHourlyRate('');
@@ -199,10 +236,30 @@ export default function WorkAssignmentModal({ opened, onClose, onSuccess }) {
           data={physicians}
           value={selectedPhysician}
           onChange={setSelectedPhysician}
+          searchValue={physicianSearch}
+          onSearchChange={setPhysicianSearch}
           searchable
           required
-          mb="md"
+          mb="xs"
         />
+        <Group justify="space-between" mb="md">
+          <Button
+            variant="subtle"
+            size="xs"
+            onClick={handlePreviousPhysicians}
+            disabled={physicianCursors.length === 1}
+          >
+            Previous physicians
+          </Button>
+          <Button
+            variant="subtle"
+            size="xs"
+            onClick={handleNextPhysicians}
+            disabled={!nextPhysicianCursor}
+          >
+            Next physicians
+          </Button>
+        </Group>
 
         <Select
           label="Clinic"
@@ -0,0 +1,22 @@
+// Fetches one page of a cursor-paginated /api endpoint.
+// Resolves to { success, data, nextCursor, hasMore, error }; pass the
+// nextCursor of one page to get the page after it.
+export const fetchPage = async (endpoint, cursor = null, options = {}) => {
+  const separator = endpoint.includes('?') ? '&' : '?';
+  const url = cursor
+    ? `${endpoint}${separator}cursor=${encodeURIComponent(cursor)}`
+    : endpoint;
+  const response = await fetch(url, { credentials: 'include', ...options });
+  const result = await response.json();
+
+  if (!result.success) {
+    return result;
+  }
+
+  return {
+    success: true,
+    data: result.data || [],
+    nextCursor: result.next_cursor || null,
+    hasMore: Boolean(result.has_more),
+  };
+};
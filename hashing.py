@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from config import HASHING_CONFIG
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full and the caller should retry later"""
+
+
+class HashingPool:
+    """
+    Bounded worker pool for bcrypt password hashing and verification.
+
+    bcrypt at cost 12 takes hundreds of milliseconds of CPU. Running it on a
+    small dedicated pool caps how much of the machine a login burst can use,
+    and the bounded queue makes excess requests fail fast instead of piling up
+    behind each other. bcrypt releases the GIL, so the workers run in parallel.
+
+    Args:
+        workers: Number of hashing threads
+        max_pending: Operations allowed to wait for a free worker
+        rounds: bcrypt cost factor used for new hashes
+    """
+
+    def __init__(self, workers=4, max_pending=32, rounds=12):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, operation, queued, elapsed):
+        with self._stats_lock:
+            stats = self._stats.setdefault(operation, {
+                'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'queue_seconds': 0.0
+            })
+            stats['count'] += 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            stats['queue_seconds'] += queued
+
+    def _run(self, operation, fn, *args):
+        """Run fn on the pool and wait for it, failing fast when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError('Password hashing queue is full')
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(operation, started - submitted, time.perf_counter() - started)
+
+        try:
+            future = self._executor.submit(task)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash_password(self, password):
+        """Hash a plaintext password, returning the bcrypt hash as a string"""
+        def work(raw):
+            return bcrypt.hashpw(raw, bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+        return self._run('hash', work, password.encode('utf-8'))
+
+    def hash_many(self, passwords, concurrency=None):
+        """
+        Hash a batch of passwords in parallel (bulk imports).
+
+        Unlike hash_password this waits for queue space instead of failing
+        fast, and keeps at most `concurrency` hashes in flight so interactive
+        logins still get workers and queue slots.
+
+        Returns:
+            List of hashes in input order
+        """
+        concurrency = concurrency or self._executor._max_workers
+        in_flight = threading.BoundedSemaphore(concurrency)
+        rounds = self.rounds
+        futures = []
+
+        def work(raw, submitted):
+            started = time.perf_counter()
+            try:
+                return bcrypt.hashpw(raw, bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+            finally:
+                self._record('hash', started - submitted, time.perf_counter() - started)
+
+        def done(_):
+            self._slots.release()
+            in_flight.release()
+
+        for password in passwords:
+            in_flight.acquire()
+            self._slots.acquire()
+            future = self._executor.submit(work, password.encode('utf-8'), time.perf_counter())
+            future.add_done_callback(done)
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def check_password(self, password, password_hash):
+        """Check a plaintext password against a stored bcrypt hash"""
+        return self._run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def stats(self):
+        """Per-operation call count and latency (seconds)"""
+        with self._stats_lock:
+            return {
+                operation: dict(values, avg_seconds=values['total_seconds'] / values['count'])
+                for operation, values in self._stats.items()
+            }
+
+
+hashing_pool = HashingPool(**HASHING_CONFIG)
+
+
+def hash_password(password):
+    """Hash a password on the shared hashing pool"""
+    return hashing_pool.hash_password(password)
+
+
+def hash_many(passwords, concurrency=None):
+    """Hash a batch of passwords on the shared hashing pool"""
+    return hashing_pool.hash_many(passwords, concurrency)
+
+
+def check_password(password, password_hash):
+    """Verify a password on the shared hashing pool"""
+    return hashing_pool.check_password(password, password_hash)
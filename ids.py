@@ -0,0 +1,153 @@
+import logging
+import threading
+
+from flask import request
+
+from config import ID_ALLOCATOR_CONFIG, POOL_CONFIG
+from db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Sequence name -> (table, primary key column)
+SEQUENCES = {
+    'Patient': ('Patient', 'PatientID'),
+    'Physician': ('Physician', 'PhysicianID'),
+    'HealthReport': ('HealthReport', 'ReportID'),
+    'Prescription': ('Prescription', 'PrescriptionID'),
+    'Schedule': ('Schedule', 'ScheduleID'),
+    'Clinic': ('Clinic', 'ClinicID'),
+    'Appointment': ('Appointment', 'AppointmentID'),
+    'MedicalHistory': ('MedicalHistory', 'HistoryID'),
+    'Billing': ('Billing', 'BillingID'),
+}
+
+
+class IdAllocator:
+    """
+    Concurrent-safe primary key allocator backed by the IdSequence table.
+
+    Each process reserves blocks of IDs with a single atomic
+    UPDATE ... LAST_INSERT_ID(NextID + n) and hands them out from memory, so
+    inserts need no MAX(id) pre-read and two writers can never pick the same
+    key. Reservations commit immediately, so a rolled-back insert just leaves
+    a gap in the sequence.
+
+    They run on a small pool of their own rather than the admin request pool:
+    a request that already holds a pooled connection would otherwise need a
+    second one from the same pool, and enough concurrent creates could each
+    hold one while waiting for another.
+
+    Args:
+        block_size: Number of IDs reserved per round trip
+        pool_size: Connections reserved for sequence updates
+    """
+
+    def __init__(self, block_size=20, pool_size=1):
+        self.block_size = block_size
+        self.pool_size = pool_size
+        self._ranges = {name: [] for name in SEQUENCES}   # name -> list of reserved (start, end)
+        self._locks = {name: threading.Lock() for name in SEQUENCES}
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        """The allocator's own admin pool, created on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool('admin', **{**POOL_CONFIG, 'min_size': 0,
+                                                            'max_size': self.pool_size})
+        return self._pool
+
+    def close(self):
+        """Close the allocator's idle connections (e.g. on shutdown)"""
+        if self._pool is not None:
+            self._pool.close()
+
+    def _reserve(self, name, count):
+        """Atomically reserve count IDs, returning (start, end) with end exclusive"""
+        table, column = SEQUENCES[name]
+        pool = self._get_pool()
+        conn = pool.acquire()
+        try:
+            cursor = conn.cursor()
+            bump = "UPDATE IdSequence SET NextID = LAST_INSERT_ID(NextID + %s) WHERE Name = %s"
+            if cursor.execute(bump, (count, name)) == 0:
+                # First use of this sequence - start it after the table's current max
+                cursor.execute(
+                    f"INSERT IGNORE INTO IdSequence (Name, NextID) "
+                    f"SELECT %s, IFNULL(MAX({column}), 0) + 1 FROM {table}",
+                    (name,)
+                )
+                cursor.execute(bump, (count, name))
+            # LAST_INSERT_ID(expr) comes back in the OK packet - no extra SELECT needed
+            end = cursor.lastrowid
+            conn.commit()
+            cursor.close()
+        except Exception:
+            pool.release(conn, discard=True)
+            raise
+        pool.release(conn)
+        return end - count, end
+
+    def allocate(self, name, count=1):
+        """
+        Allocate count new IDs for a sequence.
+
+        Args:
+            name: Sequence name (see SEQUENCES)
+            count: Number of IDs needed
+
+        Returns:
+            List of unique IDs (ascending, not necessarily contiguous)
+        """
+        if name not in SEQUENCES:
+            raise ValueError(f'Unknown ID sequence: {name}')
+
+        ids = []
+        with self._locks[name]:
+            ranges = self._ranges[name]
+            while len(ids) < count:
+                if not ranges:
+                    ranges.append(self._reserve(name, max(self.block_size, count - len(ids))))
+                start, end = ranges[0]
+                take = min(end - start, count - len(ids))
+                ids.extend(range(start, start + take))
+                if start + take >= end:
+                    ranges.pop(0)
+                else:
+                    ranges[0] = (start + take, end)
+        return ids
+
+    def next_id(self, name):
+        """Allocate a single new ID for a sequence"""
+        return self.allocate(name, 1)[0]
+
+
+id_allocator = IdAllocator(**ID_ALLOCATOR_CONFIG)
+
+
+def next_id(name):
+    """Allocate one ID from the shared allocator"""
+    return id_allocator.next_id(name)
+
+
+def allocate_ids(name, count):
+    """Allocate several IDs from the shared allocator"""
+    return id_allocator.allocate(name, count)
+
+
+def ignore_client_id(data, field):
+    """
+    Drop a primary key the client sent in a create request body.
+
+    Keys are allocated by the server. Older clients still send one, so it is
+    ignored with a deprecation warning rather than rejected.
+
+    Args:
+        data: Parsed request body
+        field: Name of the primary key field
+    """
+    if field in data:
+        logger.warning("Deprecated: %s %s sent %s=%r; the server assigns it and the value is ignored",
+                       request.method, request.path, field, data.pop(field))
@@ -0,0 +1,255 @@
+import threading
+import time
+
+from flask import Response, abort, g, has_request_context, request
+
+from config import METRICS_CONFIG
+from serialization import FastJSONProvider
+
+PREFIX = 'healthsystem_'
+
+
+class RequestMetrics:
+    """Timings and counters accumulated while one request runs"""
+
+    __slots__ = ('started', 'db_seconds', 'queries', 'rows', 'acquire_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.acquire_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def current_metrics():
+    """RequestMetrics of the active request, or None outside a request"""
+    if has_request_context():
+        return g.get('request_metrics')
+    return None
+
+
+def record_query(seconds, rows=0):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.db_seconds += seconds
+        metrics.queries += 1
+        metrics.rows += rows
+
+
+def record_rows(rows):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.rows += rows
+
+
+def record_acquire(seconds):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.acquire_seconds += seconds
+
+
+def record_serialization(seconds):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.serialize_seconds += seconds
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """JSON provider that charges encoding time to the current request"""
+
+    def encode(self, obj):
+        start = time.perf_counter()
+        try:
+            return super().encode(obj)
+        finally:
+            record_serialization(time.perf_counter() - start)
+
+
+class MetricsRegistry:
+    """
+    Process-wide request metrics, keyed by (route, method, role).
+
+    Latency goes into a fixed-bucket histogram; the DB, acquire and
+    serialization figures are running totals. Rendering follows the
+    Prometheus text exposition format.
+
+    Args:
+        buckets: Upper bounds (seconds) of the latency histogram buckets
+    """
+
+    TOTALS = (
+        ('db_seconds_total', 'db_seconds', 'Time spent executing SQL statements'),
+        ('db_queries_total', 'queries', 'SQL statements executed'),
+        ('db_rows_total', 'rows', 'Rows returned by SQL statements'),
+        ('db_acquire_seconds_total', 'acquire_seconds', 'Time spent waiting for a pooled connection'),
+        ('serialization_seconds_total', 'serialize_seconds', 'Time spent encoding JSON'),
+    )
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self._latency = {}   # (route, method, role, status) -> [bucket counts..., sum, count]
+        self._totals = {}    # (route, method, role) -> {attribute: value}
+
+    def observe(self, route, method, role, status, seconds, metrics):
+        series = (route, method, role, str(status))
+        labels = (route, method, role)
+        with self._lock:
+            histogram = self._latency.get(series)
+            if histogram is None:
+                histogram = self._latency[series] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[index] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+            totals = self._totals.get(labels)
+            if totals is None:
+                totals = self._totals[labels] = {attribute: 0 for _, attribute, _ in self.TOTALS}
+            for _, attribute, _ in self.TOTALS:
+                totals[attribute] += getattr(metrics, attribute)
+
+    def render(self):
+        with self._lock:
+            latency = {series: list(values) for series, values in self._latency.items()}
+            totals = {labels: dict(values) for labels, values in self._totals.items()}
+
+        lines = [
+            f'# HELP {PREFIX}http_request_duration_seconds Request latency',
+            f'# TYPE {PREFIX}http_request_duration_seconds histogram',
+        ]
+        for (route, method, role, status), values in sorted(latency.items()):
+            labels = format_labels(route=route, method=method, role=role, status=status)
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{PREFIX}http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values[-1]}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_sum{{{labels}}} {values[-2]}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_count{{{labels}}} {values[-1]}')
+
+        for name, attribute, help_text in self.TOTALS:
+            lines.append(f'# HELP {PREFIX}{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}{name} counter')
+            for (route, method, role), values in sorted(totals.items()):
+                labels = format_labels(route=route, method=method, role=role)
+                lines.append(f'{PREFIX}{name}{{{labels}}} {values[attribute]}')
+        return lines
+
+
+def format_labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def gauge_lines(name, help_text, samples, metric_type='gauge'):
+    """Exposition lines for one metric; samples are (labels dict, value) pairs"""
+    lines = [f'# HELP {PREFIX}{name} {help_text}', f'# TYPE {PREFIX}{name} {metric_type}']
+    for labels, value in samples:
+        suffix = f'{{{format_labels(**labels)}}}' if labels else ''
+        lines.append(f'{PREFIX}{name}{suffix} {value}')
+    return lines
+
+
+def component_lines():
+    """Pool, user cache, read cache, hashing pool and search index statistics"""
+    from db import pool_stats
+    from models import user_cache
+    from cache import cache
+    from hashing import hashing_pool
+    from search import search_index
+
+    pools = pool_stats()
+    lines = gauge_lines('db_pool_connections', 'Pooled connections by state', [
+        ({'role': pool['role'], 'server': pool['server'], 'state': state}, pool[state])
+        for pool in pools for state in ('idle', 'in_use')
+    ])
+    lines += gauge_lines('db_pool_waiters', 'Callers waiting for a pooled connection', [
+        ({'role': pool['role'], 'server': pool['server']}, pool['waiters']) for pool in pools
+    ])
+
+    for prefix, stats in (('user_cache', user_cache.stats()), ('read_cache', cache.stats())):
+        lines += gauge_lines(f'{prefix}_entries', 'Cached entries', [({}, stats['size'])])
+        lines += gauge_lines(f'{prefix}_hits_total', 'Cache hits', [({}, stats['hits'])], 'counter')
+        lines += gauge_lines(f'{prefix}_misses_total', 'Cache misses', [({}, stats['misses'])], 'counter')
+
+    hashing = hashing_pool.stats()
+    lines += gauge_lines('password_hash_total', 'Password hashing operations', [
+        ({'operation': operation}, values['count']) for operation, values in hashing.items()
+    ], 'counter')
+    lines += gauge_lines('password_hash_seconds_total', 'Time spent hashing passwords', [
+        ({'operation': operation}, values['total_seconds']) for operation, values in hashing.items()
+    ], 'counter')
+
+    search = search_index.stats()
+    lines += gauge_lines('search_index_documents', 'Rows in the in-process search index', [
+        ({'entity': entity}, values['documents']) for entity, values in search.items()
+    ])
+    lines += gauge_lines('search_index_tokens', 'Distinct tokens in the search index', [
+        ({'entity': entity}, values['tokens']) for entity, values in search.items()
+    ])
+    return lines
+
+
+registry = MetricsRegistry(METRICS_CONFIG['latency_buckets'])
+
+
+def _role():
+    return g.get('db_role') or 'anonymous'
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_request():
+    g.request_metrics = RequestMetrics()
+
+
+def _server_timing(response):
+    metrics = g.get('request_metrics')
+    if metrics is not None:
+        elapsed = time.perf_counter() - metrics.started
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries"',
+            f'acquire;dur={metrics.acquire_seconds * 1000:.2f}',
+            f'serialize;dur={metrics.serialize_seconds * 1000:.2f}',
+            f'app;dur={elapsed * 1000:.2f}',
+        ])
+    return response
+
+
+def _finish_request(error=None):
+    # Teardown runs after streamed bodies are fully sent, so their time counts too
+    metrics = g.pop('request_metrics', None)
+    if metrics is None:
+        return
+    status = g.pop('response_status', 500 if error is not None else 200)
+    registry.observe(_route(), request.method, _role(), status, time.perf_counter() - metrics.started, metrics)
+
+
+def _remember_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+def metrics_view():
+    if request.remote_addr not in METRICS_CONFIG['allowed_ips']:
+        abort(403)
+    lines = registry.render() + component_lines()
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Install the request hooks, the timed JSON provider and the /metrics endpoint"""
+    if not METRICS_CONFIG['enabled']:
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_remember_status)
+    if METRICS_CONFIG['server_timing']:
+        app.after_request(_server_timing)
+    app.teardown_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
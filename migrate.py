@@ -0,0 +1,202 @@
+"""
+Versioned schema migrations.
+
+Migrations live in migrations/NNNN_description.sql and are applied in version
+order. Each applied version is recorded in the SchemaMigration table, so
+running migrations again only applies what is new.
+
+Usage:
+    python migrate.py              # apply pending migrations
+    python migrate.py --status     # list applied / pending versions
+"""
+import argparse
+import hashlib
+import os
+import re
+
+import pymysql
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# MySQL errors meaning "this statement's effect is already in place".
+# DDL auto-commits, so a migration interrupted half-way is re-run statement
+# by statement and these are skipped.
+ALREADY_APPLIED_ERRORS = {
+    1050,   # Table already exists
+    1060,   # Duplicate column name
+    1061,   # Duplicate key name
+    1091,   # Can't DROP; check that column/key exists
+}
+
+_FILENAME = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+
+def split_statements(sql):
+    """Split a migration file into statements (one per ';', comments dropped)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+
+def split_script(sql):
+    """
+    Split a mysql-client style script (COMMANDS.sql) into statements.
+
+    Understands DELIMITER $$ blocks, so stored procedure bodies stay whole.
+    """
+    delimiter = ';'
+    statements = []
+    current_statement = ""
+
+    for line in sql.split('\n'):
+        line = line.strip()
+
+        # Skip empty lines and comments
+        if not line or line.startswith('--'):
+            continue
+
+        if line.startswith('DELIMITER'):
+            delimiter = '$$' if '$$' in line else ';'
+            continue
+
+        current_statement += line + ' '
+
+        if line.endswith(delimiter):
+            statement = current_statement.rstrip(delimiter + ' ').strip()
+            if statement:
+                statements.append(statement)
+            current_statement = ""
+
+    return statements
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    Read migration files from disk.
+
+    Returns:
+        List of dicts (version, name, checksum, statements) sorted by version
+    """
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), 'r') as f:
+            sql = f.read()
+        migrations.append({
+            'version': int(match.group(1)),
+            'name': match.group(2),
+            'checksum': hashlib.sha256(sql.encode('utf-8')).hexdigest(),
+            'statements': split_statements(sql),
+        })
+    migrations.sort(key=lambda migration: migration['version'])
+    return migrations
+
+
+def ensure_migration_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            Version int,
+            Name varchar(100) not null,
+            Checksum char(64) not null,
+            AppliedAt timestamp default current_timestamp,
+            primary key(Version)
+        )
+    """)
+
+
+def applied_versions(cursor):
+    """Map of applied version -> checksum"""
+    cursor.execute("SELECT Version, Checksum FROM SchemaMigration")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def apply_migrations(conn, verbose=True):
+    """
+    Apply every pending migration on an open connection.
+
+    Safe to call on every start: applied versions are skipped, and
+    statements whose effect already exists are tolerated.
+
+    Args:
+        conn: pymysql connection to the application database (plain cursor)
+        verbose: Print progress
+
+    Returns:
+        List of versions applied by this call
+    """
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    ensure_migration_table(cursor)
+    applied = applied_versions(cursor)
+    newly_applied = []
+
+    for migration in load_migrations():
+        version = migration['version']
+        if version in applied:
+            if applied[version] != migration['checksum'] and verbose:
+                print(f"Migration {version:04d}_{migration['name']} changed after it was applied")
+            continue
+
+        for statement in migration['statements']:
+            try:
+                cursor.execute(statement)
+            except pymysql.err.MySQLError as e:
+                if not e.args or e.args[0] not in ALREADY_APPLIED_ERRORS:
+                    conn.rollback()
+                    raise
+        cursor.execute(
+            "INSERT INTO SchemaMigration (Version, Name, Checksum) VALUES (%s, %s, %s)",
+            (version, migration['name'], migration['checksum'])
+        )
+        conn.commit()
+        newly_applied.append(version)
+        if verbose:
+            print(f"Applied migration {version:04d}_{migration['name']}")
+
+    cursor.close()
+    return newly_applied
+
+
+def pending_migrations(conn):
+    """Migrations not yet recorded in SchemaMigration"""
+    cursor = conn.cursor(pymysql.cursors.Cursor)
+    ensure_migration_table(cursor)
+    applied = applied_versions(cursor)
+    cursor.close()
+    return [migration for migration in load_migrations() if migration['version'] not in applied]
+
+
+def main():
+    from config import get_db_config
+
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('--status', action='store_true', help='Show pending migrations and exit')
+    parser.add_argument('--user', help='MySQL user with ALTER/INDEX privileges (default: admin role user)')
+    parser.add_argument('--password', help='Password for --user')
+    args = parser.parse_args()
+
+    config = get_db_config('admin')
+    conn = pymysql.connect(
+        host=config['host'],
+        port=config['port'],
+        user=args.user or config['user'],
+        password=args.password if args.user else config['password'],
+        database=config['database']
+    )
+    try:
+        if args.status:
+            pending = pending_migrations(conn)
+            for migration in pending:
+                print(f"pending  {migration['version']:04d}_{migration['name']}")
+            if not pending:
+                print('Schema is up to date')
+        else:
+            applied = apply_migrations(conn)
+            if not applied:
+                print('Schema is up to date')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+-- Composite indexes for the lookups the API actually runs.
+-- Foreign keys already give single-column indexes; these cover the
+-- filter + sort combinations so MySQL can seek and read rows in order.
+
+-- /api/appointments (patient view): WHERE PatientID ORDER BY date, time
+CREATE INDEX idx_Appointment_Patient_Slot ON Appointment (PatientID, AppointmentDate, AppointmentTime);
+
+-- /api/appointments (physician view), /api/physician/patients, sp_BookAppointment slot check
+CREATE INDEX idx_Appointment_Physician_Slot ON Appointment (PhysicianID, AppointmentDate, AppointmentTime);
+
+-- User join on ReferenceID + UserType (/api/data/patients, /api/data/physicians, profiles)
+CREATE INDEX idx_User_Reference ON User (ReferenceID, UserType);
+
+-- /api/billing?patient_id=
+CREATE INDEX idx_Billing_Patient ON Billing (PatientID, BillingDate);
+
+-- /api/history?patient_id=
+CREATE INDEX idx_MedicalHistory_Patient ON MedicalHistory (PatientID, DiagnosisDate);
+
+-- Prescriptions by report, in PrescriptionID order (report downloads, include_prescription_ids)
+CREATE INDEX idx_Prescription_Report ON Prescription (ReportID, PrescriptionID);
+
+-- /api/healthreports for a patient or physician, newest first
+CREATE INDEX idx_HealthReport_Patient_Date ON HealthReport (PatientID, ReportDate);
+CREATE INDEX idx_HealthReport_Physician_Date ON HealthReport (PhysicianID, ReportDate);
+
+-- Keyset pagination orders for /api/data/* listings
+CREATE INDEX idx_HealthReport_Date ON HealthReport (ReportDate, ReportID);
+CREATE INDEX idx_Patient_Name ON Patient (Name, PatientID);
+CREATE INDEX idx_Physician_Name ON Physician (Name, PhysicianID);
+CREATE INDEX idx_WorksAt_DateJoined ON WorksAt (DateJoined, ClinicID, PhysicianID);
+
+-- WorksAt looked up by physician first (/api/worksat, /api/workassignment/*)
+CREATE INDEX idx_WorksAt_Physician ON WorksAt (PhysicianID, ClinicID);
+
+-- Duplicate clinic check in /api/clinic/create, clinic lists ordered by name
+CREATE INDEX idx_Clinic_Name_Address ON Clinic (Name, Address);
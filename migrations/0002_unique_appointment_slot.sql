@@ -0,0 +1,12 @@
+-- One appointment per physician per slot, enforced by the database.
+-- sp_BookAppointment now inserts and lets this constraint reject a taken
+-- slot instead of doing a check-then-insert that races under contention.
+--
+-- Fails if duplicate bookings already exist; find them with:
+--   SELECT PhysicianID, AppointmentDate, AppointmentTime, COUNT(*)
+--   FROM Appointment GROUP BY 1, 2, 3 HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX uq_Appointment_Physician_Slot ON Appointment (PhysicianID, AppointmentDate, AppointmentTime);
+
+-- The unique index covers the same columns, so the plain one is redundant
+DROP INDEX idx_Appointment_Physician_Slot ON Appointment;
@@ -1,6 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
 from flask_login import UserMixin
 from db import execute_one, execute_update, execute_query
-import bcrypt
+from config import USER_CACHE_CONFIG
+from hashing import hash_password, check_password
+
+
+class UserCache:
+    """
+    Bounded TTL/LRU cache of User rows, keyed by UserID with an email index.
+
+    Flask-Login reloads the user on every authenticated request; caching the
+    row takes that lookup off the hot path. Rows (not User objects) are cached
+    so every request still gets its own User instance.
+
+    Args:
+        max_size: Maximum number of cached users
+        ttl: Seconds before a cached row must be re-read from the database
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._rows = OrderedDict()   # UserID -> (row, expires_at)
+        self._by_email = {}          # lower-cased Email -> UserID
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the cached row for a UserID, or None"""
+        with self._lock:
+            entry = self._rows.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._remove(user_id)
+                self.misses += 1
+                return None
+            self._rows.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def get_by_email(self, email):
+        """Return the cached row for an email, or None"""
+        with self._lock:
+            user_id = self._by_email.get(email.lower())
+        if user_id is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(user_id)
+
+    def put(self, row):
+        """Cache a User row (must include UserID and Email)"""
+        with self._lock:
+            user_id = row['UserID']
+            self._remove(user_id)
+            self._rows[user_id] = (row, time.monotonic() + self.ttl)
+            self._by_email[row['Email'].lower()] = user_id
+            while len(self._rows) > self.max_size:
+                oldest = next(iter(self._rows))
+                self._remove(oldest)
+
+    def invalidate(self, user_id=None, email=None):
+        """Drop a user from the cache by UserID and/or email"""
+        with self._lock:
+            if email is not None:
+                mapped = self._by_email.pop(email.lower(), None)
+                if mapped is not None:
+                    self._remove(mapped)
+            if user_id is not None:
+                self._remove(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._by_email.clear()
+
+    def _remove(self, user_id):
+        """Remove an entry and its email index (lock held)"""
+        entry = self._rows.pop(user_id, None)
+        if entry is not None:
+            email = entry[0]['Email'].lower()
+            if self._by_email.get(email) == user_id:
+                del self._by_email[email]
+
+    def stats(self):
+        """Hit/miss counters for checking the cache is doing its job"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._rows),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache(**USER_CACHE_CONFIG)
 
 class User(UserMixin):
     """User class for Flask-Login authentication"""
@@ -36,9 +135,24 @@ class User(UserMixin):
         """Check if user is an admin"""
         return self.user_type == 'admin'
 
+    @staticmethod
+    def _from_row(row):
+        """Build a User from a User table row"""
+        return User(
+            user_id=row['UserID'],
+            email=row['Email'],
+            user_type=row['UserType'],
+            reference_id=row['ReferenceID'],
+            active=row['IsActive']
+        )
+
     @staticmethod
     def get_by_id(user_id):
         """Load user by ID (required by Flask-Login)"""
+        cached = user_cache.get(user_id)
+        if cached:
+            return User._from_row(cached)
+
         query = """
             SELECT UserID, Email, UserType, ReferenceID, IsActive
             FROM User
@@ -47,18 +161,17 @@ class User(UserMixin):
         result = execute_one(query, (user_id,))
 
         if result:
-            return User(
-                user_id=result['UserID'],
-                email=result['Email'],
-                user_type=result['UserType'],
-                reference_id=result['ReferenceID'],
-                active=result['IsActive']
-            )
+            user_cache.put(result)
+            return User._from_row(result)
         return None
 
     @staticmethod
     def get_by_email(email):
         """Load user by email"""
+        cached = user_cache.get_by_email(email)
+        if cached:
+            return User._from_row(cached)
+
         query = """
             SELECT UserID, Email, UserType, ReferenceID, IsActive
             FROM User
@@ -67,13 +180,8 @@ class User(UserMixin):
         result = execute_one(query, (email,))
 
         if result:
-            return User(
-                user_id=result['UserID'],
-                email=result['Email'],
-                user_type=result['UserType'],
-                reference_id=result['ReferenceID'],
-                active=result['IsActive']
-            )
+            user_cache.put(result)
+            return User._from_row(result)
         return None
 
     @staticmethod
@@ -82,25 +190,25 @@ class User(UserMixin):
         query = "SELECT UserID, Email, PasswordHash, UserType, ReferenceID, IsActive FROM User WHERE Email = %s"
         result = execute_one(query, (email,))
 
-        if result and bcrypt.checkpw(password.encode('utf-8'), result['PasswordHash'].encode('utf-8')):
+        if result and check_password(password, result['PasswordHash']):
             # Update last login
             update_query = "UPDATE User SET LastLogin = NOW() WHERE UserID = %s"
             execute_update(update_query, (result['UserID'],))
 
-            return User(
-                user_id=result['UserID'],
-                email=result['Email'],
-                user_type=result['UserType'],
-                reference_id=result['ReferenceID'],
-                active=result['IsActive']
-            )
+            # Row was just read from the DB - refresh the cache with it (minus the hash)
+            user_cache.invalidate(user_id=result['UserID'], email=result['Email'])
+            row = {key: value for key, value in result.items() if key != 'PasswordHash'}
+            user_cache.put(row)
+
+            return User._from_row(row)
         return None
 
     @staticmethod
-    def create_user(email, password, user_type, reference_id=None):
-        """Create a new user with hashed password"""
+    def create_user(email, password, user_type, reference_id=None, password_hash=None):
+        """Create a new user with hashed password (pass password_hash if already hashed)"""
         # Hash password
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        if password_hash is None:
+            password_hash = hash_password(password)
 
         # Insert user
         query = """
@@ -110,10 +218,18 @@ class User(UserMixin):
 
         try:
             user_id = execute_update(query, (email, password_hash, user_type, reference_id))
+            user_cache.invalidate(user_id=user_id, email=email)
             return User.get_by_id(user_id)
         except Exception as e:
             raise e
 
+    @staticmethod
+    def set_active(user_id, active):
+        """Activate or deactivate a user account (the only place IsActive is written)"""
+        execute_update("UPDATE User SET IsActive = %s WHERE UserID = %s", (bool(active), user_id))
+        # Deactivation must take effect on the user's very next request
+        user_cache.invalidate(user_id=user_id)
+
     @staticmethod
     def email_exists(email):
         """Check if email already exists"""
@@ -0,0 +1,318 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import current_app, request
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from config import PAGINATION_CONFIG
+from db import execute_columns, execute_query, execute_one
+
+
+class CursorError(ValueError):
+    """Raised when a continuation token is malformed or was tampered with"""
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='pagination-cursor')
+
+
+def _encode_value(value):
+    """Make a key value JSON-safe, tagging types JSON can't represent"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {'td': value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'td' in value:
+            return timedelta(seconds=value['td'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise CursorError('Invalid cursor')
+    return value
+
+
+def encode_cursor(values):
+    """Turn the last row's ORDER BY key values into an opaque, signed token"""
+    return _serializer().dumps([_encode_value(value) for value in values])
+
+
+def decode_cursor(token, key_count):
+    """Verify and unpack a token produced by encode_cursor"""
+    try:
+        values = _serializer().loads(token)
+    except BadSignature:
+        raise CursorError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != key_count:
+        raise CursorError('Invalid cursor')
+    return [_decode_value(value) for value in values]
+
+
+def _after(keys, values):
+    """
+    Build the "strictly after this row" predicate for a list of sort keys.
+
+    NULLs sort first under ASC and last under DESC in MySQL, so NULL key
+    values get their own branches instead of relying on comparisons with NULL.
+    """
+    (expression, _, direction), value = keys[0], values[0]
+    descending = direction == 'DESC'
+    rest = _after(keys[1:], values[1:]) if len(keys) > 1 else None
+
+    if value is None:
+        clauses = []
+        if rest:
+            clauses.append((f"({expression} IS NULL AND ({rest[0]}))", rest[1]))
+        if not descending:
+            clauses.append((f"{expression} IS NOT NULL", []))
+    else:
+        comparison = '<' if descending else '>'
+        clauses = []
+        if rest:
+            clauses.append((f"({expression} = %s AND ({rest[0]}))", [value] + rest[1]))
+        clauses.append((f"{expression} {comparison} %s", [value]))
+        if descending:
+            clauses.append((f"{expression} IS NULL", []))
+
+    if not clauses:
+        return ('FALSE', [])
+    sql = ' OR '.join(clause for clause, _ in clauses)
+    params = [param for _, clause_params in clauses for param in clause_params]
+    return (sql, params)
+
+
+def keyset_condition(keys, values):
+    """
+    SQL condition (and params) selecting rows after the given key values.
+
+    A redundant range on the leading key is added so MySQL can seek straight
+    into the index instead of evaluating the OR chain for every row.
+    """
+    sql, params = _after(keys, values)
+    expression, _, direction = keys[0]
+    leading = values[0]
+    if leading is not None:
+        if direction == 'DESC':
+            sql = f"({expression} <= %s OR {expression} IS NULL) AND ({sql})"
+        else:
+            sql = f"{expression} >= %s AND ({sql})"
+        params = [leading] + params
+    return sql, params
+
+
+def clamp_page_size(page_size):
+    """Apply the default and the server-enforced maximum page size"""
+    if not page_size or page_size < 1:
+        return PAGINATION_CONFIG['default_page_size']
+    return min(page_size, PAGINATION_CONFIG['max_page_size'])
+
+
+def approximate_total(table):
+    """
+    Cheap row count estimate from InnoDB statistics (no COUNT(*) scan).
+
+    Good enough for "about N results"; may be off by a few percent.
+    """
+    result = execute_one(
+        "SELECT TABLE_ROWS AS estimate FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return int(result['estimate']) if result and result['estimate'] is not None else None
+
+
+def columnar_layout():
+    """
+    Columnar layout requested in the query string, if any.
+
+    format=columnar returns the column names once plus one array per row
+    ('rows'); adding layout=columns returns one array per column instead.
+
+    Returns:
+        'rows', 'columns' or None for the usual list of objects
+    """
+    if request.args.get('format') != 'columnar':
+        return None
+    return 'columns' if request.args.get('layout') == 'columns' else 'rows'
+
+
+def shape_columnar(columns, rows, layout):
+    """Arrange row tuples for a columnar response (see columnar_layout)"""
+    if layout == 'columns':
+        return [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+    return rows
+
+
+def append_column(columns, data, layout, name, values):
+    """
+    Add a computed column to columnar data.
+
+    Args:
+        columns: Column names (extended in place)
+        data: Data as returned by shape_columnar
+        layout: 'rows' or 'columns'
+        name: New column name
+        values: One value per row, in row order
+
+    Returns:
+        The data with the column added
+    """
+    columns.append(name)
+    if layout == 'columns':
+        data.append(list(values))
+        return data
+    return [row + (value,) for row, value in zip(data, values)]
+
+
+def page_query(select, keys, params=(), where=None, values=None, page_size=None):
+    """
+    Build the SQL for one keyset page (see fetch_page for the arguments).
+
+    Args:
+        values: Key values of the last row of the previous page; None for
+                the first page
+
+    Returns:
+        (query, args); the query fetches page_size + 1 rows so the caller
+        can tell whether there is another page
+    """
+    page_size = clamp_page_size(page_size)
+    conditions = [where] if where else []
+    args = list(params)
+
+    if values is not None:
+        condition, condition_args = keyset_condition(keys, values)
+        conditions.append(condition)
+        args.extend(condition_args)
+
+    query = select
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(f'({condition})' for condition in conditions)
+    query += ' ORDER BY ' + ', '.join(f'{expression} {direction}' for expression, _, direction in keys)
+    query += ' LIMIT %s'
+    args.append(page_size + 1)
+    return query, args
+
+
+def fetch_page(select, keys, params=(), where=None, cursor=None, page_size=None, count_table=None,
+               layout=None):
+    """
+    Fetch one page of a listing using keyset (cursor) pagination.
+
+    Instead of OFFSET, each page continues from the last row of the previous
+    page via a WHERE on the ORDER BY keys, so page 1000 costs the same as
+    page 1 when the keys are indexed.
+
+    Args:
+        select: SELECT ... FROM ... [JOIN ...] without WHERE/ORDER BY/LIMIT
+        keys: List of (sql_expression, result_column, 'ASC'|'DESC'); must
+              identify rows uniquely, so end with the primary key
+        params: Parameters for the where condition
+        where: Optional extra WHERE condition for the listing
+        cursor: Continuation token from a previous page, if any
+        page_size: Requested page size (clamped to the server maximum)
+        count_table: Table to report an approximate total for, if wanted
+        layout: 'rows' or 'columns' to fetch with a tuple cursor and return
+                columnar data (see columnar_layout); None for dict rows
+
+    Returns:
+        (rows, meta) where meta holds next_cursor, has_more, page_size and
+        optionally total_estimate; columnar pages also carry columns and
+        layout
+    """
+    page_size = clamp_page_size(page_size)
+    values = decode_cursor(cursor, len(keys)) if cursor else None
+    query, args = page_query(select, keys, params, where, values, page_size)
+
+    if layout:
+        columns, rows = execute_columns(query, args)
+        positions = [columns.index(column) for _, column, _ in keys]
+    else:
+        rows = execute_query(query, args)
+        positions = [column for _, column, _ in keys]
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    meta = {
+        'next_cursor': encode_cursor([rows[-1][position] for position in positions]) if has_more else None,
+        'has_more': has_more,
+        'page_size': page_size,
+    }
+    if layout:
+        rows = shape_columnar(columns, rows, layout)
+        meta['columns'] = columns
+        meta['layout'] = layout
+    if count_table:
+        meta['total_estimate'] = approximate_total(count_table)
+    return rows, meta
+
+
+def page_args():
+    """Read cursor, page_size, include_total, the columnar layout and the filter from the query string"""
+    return {
+        'cursor': request.args.get('cursor'),
+        'page_size': request.args.get('page_size', type=int),
+        'include_total': request.args.get('include_total', 'false').lower() == 'true',
+        'layout': columnar_layout(),
+        'filter': request.args.get('filter', '').strip(),
+    }
+
+
+def _contains(value):
+    """LIKE pattern matching value anywhere, with the wildcards in it escaped"""
+    return '%' + value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def filter_condition(text, fields, searchable):
+    """
+    Compile a listing filter to a WHERE condition for fetch_page.
+
+    The filter is the admin table syntax: terms separated by ';', each either
+    'attribute,value' or a bare value. All terms must match. A bare value,
+    or an attribute the listing does not know, matches when any searchable
+    column contains it.
+
+    Args:
+        text: Filter string from the query string
+        fields: Dict of lower-case attribute name to (sql_expression, 'eq' or 'contains')
+        searchable: SQL expressions a bare value is matched against
+
+    Returns:
+        (where, params); where is None when the filter is empty
+    """
+    conditions = []
+    params = []
+    for term in (text or '').split(';'):
+        term = term.strip()
+        if not term:
+            continue
+        if ',' in term:
+            attribute, value = (part.strip() for part in term.split(',', 1))
+            field = fields.get(attribute.lower())
+        else:
+            field, value = None, term
+
+        if field and field[1] == 'eq':
+            conditions.append(f"{field[0]} = %s")
+            params.append(value)
+        elif field:
+            conditions.append(f"{field[0]} LIKE %s")
+            params.append(_contains(value))
+        else:
+            conditions.append(' OR '.join(f"{expression} LIKE %s" for expression in searchable))
+            params.extend([_contains(value)] * len(searchable))
+
+    if not conditions:
+        return None, params
+    return ' AND '.join(f'({condition})' for condition in conditions), params
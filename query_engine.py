@@ -0,0 +1,280 @@
+"""
+Server-side filter/query engine.
+
+A query spec names a table, typed predicates, a projection, a sort and a
+page size. It is validated against the schema registry (schema.py) and
+compiled to parameterized SQL that MySQL can answer from an index:
+predicates compare bare columns (no functions around them), prefix
+matches become LIKE 'abc%' range scans, and results are paged with the
+keyset layer in pagination.py rather than OFFSET.
+
+Spec:
+    {
+        "table": "Appointment",
+        "select": ["AppointmentID", "AppointmentDate", "PhysicianID"],
+        "where": [
+            {"column": "PhysicianID", "op": "in", "value": [1, 2]},
+            {"column": "AppointmentDate", "op": "between", "value": ["2024-01-01", "2024-01-31"]}
+        ],
+        "order_by": ["-AppointmentDate"],
+        "limit": 100
+    }
+
+Add "format": "columnar" to get the column names once plus one array per
+row, or also "layout": "columns" for one array per column.
+
+Admins may query every table in QUERY_CONFIG['tables']. Other user types
+only get the tables listed for them in QUERY_CONFIG['access'], and rows of
+tables mapped to a column are limited to those where that column equals
+the user's reference_id.
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from config import QUERY_CONFIG
+from pagination import fetch_page
+from schema import get_schema
+
+RANGE_KINDS = {'int', 'decimal', 'date', 'time', 'datetime'}
+
+COMPARISONS = {'eq': '=', 'ne': '<>', 'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}
+OPERATORS = set(COMPARISONS) | {'between', 'in', 'prefix', 'is_null', 'not_null'}
+
+
+class QueryError(ValueError):
+    """Raised when a query spec does not validate against the schema"""
+
+
+def _coerce(column, value):
+    """Convert a JSON/query-string value to the column's Python type"""
+    if value is None:
+        return None
+    try:
+        if column.kind == 'int':
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError
+            return int(value)
+        if column.kind == 'decimal':
+            return Decimal(str(value))
+        if column.kind == 'bool':
+            if isinstance(value, bool):
+                return value
+            if str(value).lower() in ('1', 'true', 'yes'):
+                return True
+            if str(value).lower() in ('0', 'false', 'no'):
+                return False
+            raise ValueError
+        if column.kind == 'date':
+            return date.fromisoformat(str(value))
+        if column.kind == 'datetime':
+            return datetime.fromisoformat(str(value))
+        if column.kind == 'time':
+            text = str(value)
+            return datetime.strptime(text, '%H:%M:%S' if text.count(':') == 2 else '%H:%M').time()
+        if column.kind == 'enum':
+            if value not in column.choices:
+                raise ValueError
+            return value
+    except (TypeError, ValueError, InvalidOperation):
+        raise QueryError(f"Invalid value for {column.name} ({column.sql_type}): {value!r}")
+    if isinstance(value, (dict, list)):
+        raise QueryError(f"Invalid value for {column.name} ({column.sql_type}): {value!r}")
+    return str(value)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _predicate(table, predicate):
+    """Compile one predicate to (sql, params)"""
+    if not isinstance(predicate, dict):
+        raise QueryError('Each predicate must be an object with column, op and value')
+    column = table.column(str(predicate.get('column', '')))
+    if column is None:
+        raise QueryError(f"Unknown column for {table.name}: {predicate.get('column')!r}")
+    op = predicate.get('op', 'eq')
+    if op not in OPERATORS:
+        raise QueryError(f"Unknown operator {op!r} (expected one of {', '.join(sorted(OPERATORS))})")
+    value = predicate.get('value')
+    name = column.name
+
+    if op == 'is_null' or (op == 'eq' and value is None):
+        return f"{name} IS NULL", []
+    if op == 'not_null' or (op == 'ne' and value is None):
+        return f"{name} IS NOT NULL", []
+
+    if op in ('lt', 'lte', 'gt', 'gte', 'between') and column.kind not in RANGE_KINDS:
+        raise QueryError(f"Range filters are not supported on {name} ({column.sql_type})")
+
+    if op in COMPARISONS:
+        return f"{name} {COMPARISONS[op]} %s", [_coerce(column, value)]
+
+    if op == 'between':
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise QueryError(f"between on {name} needs [low, high] (either may be null)")
+        low, high = (_coerce(column, bound) for bound in value)
+        if low is None and high is None:
+            raise QueryError(f"between on {name} needs at least one bound")
+        if low is not None and high is not None:
+            return f"{name} BETWEEN %s AND %s", [low, high]
+        if low is not None:
+            return f"{name} >= %s", [low]
+        return f"{name} <= %s", [high]
+
+    if op == 'in':
+        if not isinstance(value, (list, tuple)) or not value:
+            raise QueryError(f"in on {name} needs a non-empty list")
+        if len(value) > QUERY_CONFIG['max_in_values']:
+            raise QueryError(f"in on {name} accepts at most {QUERY_CONFIG['max_in_values']} values")
+        values = list(dict.fromkeys(_coerce(column, item) for item in value))
+        return f"{name} IN ({', '.join(['%s'] * len(values))})", values
+
+    # prefix
+    if column.kind != 'text':
+        raise QueryError(f"Prefix filters are only supported on text columns, not {name}")
+    if not isinstance(value, str) or not value:
+        raise QueryError(f"prefix on {name} needs a non-empty string")
+    return f"{name} LIKE %s", [_escape_like(value) + '%']
+
+
+def _order(table, order_by):
+    """Sort keys for fetch_page: requested columns, then the primary key as tie-breaker"""
+    if isinstance(order_by, str):
+        order_by = [part.strip() for part in order_by.split(',') if part.strip()]
+    keys = []
+    for item in order_by or []:
+        if isinstance(item, dict):
+            name = str(item.get('column', ''))
+            direction = str(item.get('direction', 'asc')).upper()
+        else:
+            item = str(item)
+            name = item.lstrip('-+')
+            direction = 'DESC' if item.startswith('-') else 'ASC'
+        column = table.column(name)
+        if column is None:
+            raise QueryError(f"Unknown sort column for {table.name}: {name!r}")
+        if direction not in ('ASC', 'DESC'):
+            raise QueryError(f"Invalid sort direction for {name}: {direction!r}")
+        if any(key[1] == column.name for key in keys):
+            continue
+        keys.append((column.name, column.name, direction))
+    for name in table.primary_key:
+        if not any(key[1] == name for key in keys):
+            keys.append((name, name, 'ASC'))
+    return keys
+
+
+def compile_query(spec, user_type, reference_id=None):
+    """
+    Validate a query spec and compile it.
+
+    Args:
+        spec: Query spec (see module docstring)
+        user_type: Querying user's type; decides the tables and rows allowed
+        reference_id: Querying user's patient/physician ID, for row scoping
+
+    Returns:
+        Dict with table, select (SELECT ... FROM ...), where, params and
+        keys, ready for pagination.fetch_page
+    """
+    if not isinstance(spec, dict):
+        raise QueryError('Query must be a JSON object')
+
+    tables = get_schema()
+    name = spec.get('table')
+    if user_type == 'admin':
+        access = dict.fromkeys(QUERY_CONFIG['tables'])
+    else:
+        access = QUERY_CONFIG['access'].get(user_type, {})
+    allowed = {table.lower(): table for table in access if table in tables}
+    if not isinstance(name, str) or name.lower() not in allowed:
+        raise QueryError(f"Invalid table name: {name!r}")
+    table = tables[allowed[name.lower()]]
+
+    predicates = spec.get('where') or []
+    if not isinstance(predicates, list):
+        raise QueryError("where must be a list of predicates")
+    if len(predicates) > QUERY_CONFIG['max_predicates']:
+        raise QueryError(f"At most {QUERY_CONFIG['max_predicates']} predicates are allowed")
+    conditions = []
+    params = []
+    scope = access[table.name]
+    if scope is not None:
+        if reference_id is None:
+            raise QueryError(f"Invalid table name: {name!r}")
+        conditions.append(f"{scope} = %s")
+        params.append(reference_id)
+    for predicate in predicates:
+        sql, values = _predicate(table, predicate)
+        conditions.append(sql)
+        params.extend(values)
+
+    keys = _order(table, spec.get('order_by'))
+
+    projection = spec.get('select')
+    if isinstance(projection, str):
+        projection = [part.strip() for part in projection.split(',') if part.strip()]
+    if projection:
+        columns = []
+        for item in projection:
+            column = table.column(str(item))
+            if column is None:
+                raise QueryError(f"Unknown column for {table.name}: {item!r}")
+            if column.name not in columns:
+                columns.append(column.name)
+    else:
+        columns = list(table.columns)
+    # Sort keys are needed to build the continuation token
+    columns += [key[1] for key in keys if key[1] not in columns]
+
+    return {
+        'table': table.name,
+        'select': f"SELECT {', '.join(columns)} FROM {table.name}",
+        'where': ' AND '.join(conditions) or None,
+        'params': params,
+        'keys': keys,
+    }
+
+
+def run_query(spec, user_type, reference_id=None, cursor=None, page_size=None, include_total=False, layout=None):
+    """
+    Compile and execute a query spec on the request connection.
+
+    Args:
+        spec: Query spec (see module docstring)
+        user_type: Querying user's type (see compile_query)
+        reference_id: Querying user's patient/physician ID
+        cursor: Continuation token from a previous page
+        page_size: Page size; defaults to spec['limit'], clamped to the
+                   server maximum
+        include_total: Report an approximate table row count
+        layout: Columnar layout ('rows' or 'columns'); defaults to the
+                spec's format/layout
+
+    Returns:
+        (rows, meta) as returned by pagination.fetch_page
+    """
+    compiled = compile_query(spec, user_type, reference_id)
+    if layout is None:
+        fmt = spec.get('format')
+        if fmt not in (None, 'columnar'):
+            raise QueryError(f"Unknown format: {fmt!r}")
+        if fmt == 'columnar':
+            layout = 'columns' if spec.get('layout') == 'columns' else 'rows'
+    limit = spec.get('limit')
+    if page_size is None and limit is not None:
+        try:
+            page_size = int(limit)
+        except (TypeError, ValueError):
+            raise QueryError(f"Invalid limit: {limit!r}")
+    return fetch_page(
+        compiled['select'],
+        compiled['keys'],
+        params=compiled['params'],
+        where=compiled['where'],
+        cursor=cursor or spec.get('cursor'),
+        page_size=page_size,
+        count_table=compiled['table'] if include_total else None,
+        layout=layout,
+    )
@@ -0,0 +1,110 @@
+"""
+Schema registry built from COMMANDS.sql.
+
+Parses the CREATE TABLE statements once so request validation (column
+names, types, primary keys) follows the schema file instead of lists
+copied into handlers.
+"""
+import os
+import re
+from functools import lru_cache
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'COMMANDS.sql')
+
+_CREATE_TABLE = re.compile(r'create\s+table\s+(?:if\s+not\s+exists\s+)?`?(\w+)`?\s*\((.*?)\n\s*\);', re.IGNORECASE | re.DOTALL)
+_COLUMN = re.compile(r'^`?(\w+)`?\s+(\w+)(?:\s*\(([^)]*)\))?(.*)$')
+_PRIMARY_KEY = re.compile(r'^primary\s+key\s*\(([^)]*)\)', re.IGNORECASE)
+_CONSTRAINT = ('primary', 'foreign', 'unique', 'key', 'index', 'constraint', 'check')
+
+# MySQL type -> value kind used for validation and coercion
+KINDS = {
+    'int': 'int', 'integer': 'int', 'tinyint': 'int', 'smallint': 'int', 'mediumint': 'int', 'bigint': 'int',
+    'boolean': 'bool', 'bool': 'bool',
+    'decimal': 'decimal', 'numeric': 'decimal', 'float': 'decimal', 'double': 'decimal',
+    'date': 'date', 'time': 'time', 'datetime': 'datetime', 'timestamp': 'datetime',
+    'char': 'text', 'varchar': 'text', 'text': 'text',
+    'enum': 'enum',
+}
+
+
+class Column:
+    def __init__(self, name, sql_type, kind, length=None, choices=None, nullable=True):
+        self.name = name
+        self.sql_type = sql_type
+        self.kind = kind
+        self.length = length
+        self.choices = choices
+        self.nullable = nullable
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.sql_type!r})"
+
+
+class Table:
+    def __init__(self, name, columns, primary_key):
+        self.name = name
+        self.columns = columns
+        self.primary_key = primary_key
+        self._by_lower = {column.lower(): definition for column, definition in columns.items()}
+
+    def column(self, name):
+        """Look up a column by name (case-insensitive, like MySQL); None if unknown"""
+        return self._by_lower.get(name.lower())
+
+    def __repr__(self):
+        return f"Table({self.name!r}, {list(self.columns)})"
+
+
+def _parse_column(line):
+    match = _COLUMN.match(line)
+    if not match:
+        return None
+    name, sql_type, arguments, rest = match.groups()
+    sql_type = sql_type.lower()
+    kind = KINDS.get(sql_type, 'text')
+    length = None
+    choices = None
+    if arguments and kind == 'text' and arguments.strip().isdigit():
+        length = int(arguments)
+    if kind == 'enum':
+        choices = tuple(re.findall(r"'([^']*)'", arguments or ''))
+    nullable = 'not null' not in rest.lower() and 'auto_increment' not in rest.lower()
+    return Column(name, sql_type, kind, length, choices, nullable)
+
+
+def parse_schema(sql):
+    """
+    Parse CREATE TABLE statements.
+
+    Returns:
+        Dict of table name -> Table
+    """
+    tables = {}
+    for name, body in _CREATE_TABLE.findall(sql):
+        columns = {}
+        primary_key = ()
+        for line in body.split('\n'):
+            line = line.strip().rstrip(',')
+            if not line or line.startswith('--'):
+                continue
+            match = _PRIMARY_KEY.match(line)
+            if match:
+                primary_key = tuple(part.strip(' `') for part in match.group(1).split(','))
+                continue
+            if line.split()[0].lower() in _CONSTRAINT:
+                continue
+            column = _parse_column(line)
+            if column is not None:
+                columns[column.name] = column
+        for column in primary_key:
+            if column in columns:
+                columns[column].nullable = False
+        tables[name] = Table(name, columns, primary_key)
+    return tables
+
+
+@lru_cache(maxsize=1)
+def get_schema(path=SCHEMA_FILE):
+    """Tables declared in COMMANDS.sql (parsed once per process)"""
+    with open(path, 'r') as f:
+        return parse_schema(f.read())
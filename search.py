@@ -0,0 +1,513 @@
+"""
+In-process search index for patient, physician and drug lookup.
+
+Each entity keeps an inverted index from normalized tokens to the rows
+containing them, a sorted token list for as-you-type prefix matches and a
+trigram index over the distinct tokens for typo tolerance (edit distance
+1, or 2 for long terms). Names repeat a lot, so the distinct token set is
+small even at millions of rows, and a query touches only the postings of
+the tokens it matches. Ranked IDs are turned back into rows with one
+primary-key lookup, so the index itself holds no row data.
+
+Freshness: write paths in this process add rows directly (add_*), every
+search first reads rows added by other processes when refresh_interval has
+passed, and the whole index is rebuilt in the background every
+rebuild_interval. Keys are allocated in blocks per process (ids.py) before
+the insert commits, so a lower key can commit after a higher one: each
+catch-up re-reads catch_up_overlap keys below the high-water mark, and
+keys already indexed in that window are skipped.
+
+Indexes are built in the background at startup (warm()); a search that
+arrives before its index is ready raises IndexNotReady instead of building
+it inside the request.
+"""
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+
+import pymysql
+
+from config import SEARCH_CONFIG
+from db import get_pool
+
+logger = logging.getLogger(__name__)
+
+# entity -> table, key, indexed fields (name, weight, kind) and loaders.
+# Drugs are indexed by distinct name, so their key only drives catch-up.
+ENTITIES = {
+    'patient': {
+        'table': 'Patient', 'key': 'PatientID',
+        'fields': (('Name', 1.0, 'text'), ('PhoneNumber', 0.9, 'digits'), ('Address', 0.5, 'text')),
+        'columns': ('PatientID', 'Name', 'PhoneNumber', 'Address'),
+    },
+    'physician': {
+        'table': 'Physician', 'key': 'PhysicianID',
+        'fields': (('Name', 1.0, 'text'), ('Department', 0.6, 'text')),
+        'columns': ('PhysicianID', 'Name', 'Department'),
+    },
+    'drug': {
+        'table': 'Prescription', 'key': 'PrescriptionID',
+        'fields': (('DrugName', 1.0, 'text'),),
+        'columns': ('DrugName',),
+        'distinct': True,
+    },
+}
+
+class IndexNotReady(Exception):
+    """Raised when a search arrives before its index has been built"""
+
+
+_WORD = re.compile(r'[a-z0-9]+')
+_PHONE_QUERY = re.compile(r'^[\d\s()+.\-]+$')
+
+
+def normalize(text):
+    """Lowercase and strip accents"""
+    text = unicodedata.normalize('NFKD', str(text))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def field_tokens(value, kind):
+    if value is None:
+        return set()
+    if kind == 'digits':
+        digits = re.sub(r'\D', '', str(value))
+        return {digits} if digits else set()
+    return set(_WORD.findall(normalize(value)))
+
+
+def query_terms(text):
+    """Terms of a search string; phone-number-like input becomes one digit string"""
+    if _PHONE_QUERY.match(text) and re.search(r'\d', text):
+        return [re.sub(r'\D', '', text)]
+    return list(dict.fromkeys(_WORD.findall(normalize(text))))
+
+
+def trigrams(token):
+    padded = f'${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_distance(a, b, limit):
+    """Edit distance (adjacent transpositions count as one edit) if it is <= limit, else None"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def max_edits(term):
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+class FieldVocabulary:
+    """Distinct tokens of one field, with prefix and (for text fields) trigram lookup"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.token_ids = {}
+        self.sorted_tokens = []
+        self.unsorted = []
+        self.trigram_tokens = {}
+        # Guards unsorted: writers append while searches merge it into sorted_tokens
+        self._lock = threading.Lock()
+
+    def add(self, token, token_id):
+        self.token_ids[token] = token_id
+        with self._lock:
+            self.unsorted.append(token)
+        if self.kind == 'text':
+            for gram in trigrams(token):
+                self.trigram_tokens.setdefault(gram, array('I')).append(token_id)
+
+    def _sorted(self):
+        if self.unsorted:
+            with self._lock:
+                if len(self.unsorted) < 1000:
+                    for token in self.unsorted:
+                        bisect.insort(self.sorted_tokens, token)
+                elif self.unsorted:
+                    # New list, so concurrent searches never see one mid-sort
+                    self.sorted_tokens = sorted(self.sorted_tokens + self.unsorted)
+                self.unsorted = []
+        return self.sorted_tokens
+
+    def expand(self, term, tokens):
+        """Tokens matching a term as {token_id: score}: exact, prefix, then typo matches"""
+        matches = {}
+        token_id = self.token_ids.get(term)
+        if token_id is not None:
+            matches[token_id] = 1.0
+
+        if len(term) >= SEARCH_CONFIG['min_prefix']:
+            sorted_tokens = self._sorted()
+            start = bisect.bisect_right(sorted_tokens, term)
+            for token in sorted_tokens[start:start + SEARCH_CONFIG['max_expansions']]:
+                if not token.startswith(term):
+                    break
+                matches.setdefault(self.token_ids[token], 0.7 + 0.2 * len(term) / len(token))
+
+        edits = max_edits(term) if self.kind == 'text' else 0
+        if edits:
+            grams = trigrams(term)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.trigram_tokens.get(gram, ()))
+            # Each edit touches at most three trigrams
+            needed = max(1, len(grams) - 3 * edits)
+            for candidate, count in shared.most_common(SEARCH_CONFIG['fuzzy_candidates']):
+                if count < needed:
+                    break
+                if candidate in matches:
+                    continue
+                token = tokens[candidate]
+                distance = within_distance(term, token, edits)
+                if distance is not None:
+                    matches[candidate] = 0.6 - 0.15 * distance
+                    continue
+                # Typo in a partially typed word: compare with the token's prefix
+                distance = within_distance(term, token[:len(term)], edits)
+                if distance is not None:
+                    matches[candidate] = 0.45 - 0.1 * distance
+        return matches
+
+
+class TokenIndex:
+    """
+    Inverted index for one entity.
+
+    Every field has its own vocabulary, so a match can be weighted by the
+    field it came from. Postings are arrays of document ids per token, kept
+    in ascending order so they can be merged and probed with bisect
+    instead of being copied into sets.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.vocabularies = [FieldVocabulary(kind) for _, _, kind in fields]
+        self.tokens = []
+        self.postings = []
+        self.unsorted = set()       # token ids whose postings got an out-of-order id
+        self.names = []             # distinct entities: doc id -> display value
+        self.name_ids = {}
+        self.high_water = 0
+        self.recent = set()         # indexed keys the next catch-up may read again
+        self.documents = 0
+
+    def add(self, doc_id, values):
+        for vocabulary, value in zip(self.vocabularies, values):
+            for token in field_tokens(value, vocabulary.kind):
+                token_id = vocabulary.token_ids.get(token)
+                if token_id is None:
+                    token_id = len(self.tokens)
+                    self.tokens.append(token)
+                    self.postings.append(array('Q'))
+                    vocabulary.add(token, token_id)
+                postings = self.postings[token_id]
+                if postings and postings[-1] > doc_id:
+                    self.unsorted.add(token_id)
+                postings.append(doc_id)
+        self.documents += 1
+
+    def add_distinct(self, value):
+        """Index a value once (drug names); returns False if already present"""
+        key = normalize(value).strip() if value is not None else ''
+        if not key or key in self.name_ids:
+            return False
+        doc_id = len(self.names)
+        self.name_ids[key] = doc_id
+        self.names.append(value)
+        self.add(doc_id, (value,))
+        return True
+
+    def _postings(self, token_id):
+        if token_id in self.unsorted:
+            self.postings[token_id] = array('Q', sorted(set(self.postings[token_id])))
+            self.unsorted.discard(token_id)
+        return self.postings[token_id]
+
+    def _tiers(self, term):
+        """[(score, [postings])] for a term, best score first"""
+        best = {}
+        for (_, weight, _), vocabulary in zip(self.fields, self.vocabularies):
+            for token_id, score in vocabulary.expand(term, self.tokens).items():
+                best[token_id] = max(best.get(token_id, 0), score * weight)
+        tiers = {}
+        for token_id, score in best.items():
+            tiers.setdefault(round(score, 4), []).append(self._postings(token_id))
+        return sorted(tiers.items(), reverse=True)
+
+    @staticmethod
+    def _contains(postings, doc_id):
+        position = bisect.bisect_left(postings, doc_id)
+        return position < len(postings) and postings[position] == doc_id
+
+    def search(self, terms, limit):
+        """Top doc ids for terms (every term must match) as [(doc_id, score)]"""
+        per_term = []
+        for term in terms:
+            tiers = self._tiers(term)
+            if not tiers:
+                return []
+            per_term.append((sum(len(postings) for _, group in tiers for postings in group), tiers))
+        per_term.sort(key=lambda item: item[0])
+
+        if len(per_term) == 1:
+            # Single term: walk score tiers in id order until the page is full
+            results, seen = [], set()
+            for score, group in per_term[0][1]:
+                for doc_id in heapq.merge(*group):
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        results.append((doc_id, score))
+                        if len(results) >= limit:
+                            return results
+            return results
+
+        # Walk the rarest term's docs best tier first and look each one up in
+        # the other terms (small terms as sets, large ones by bisect). Stop
+        # once the page is full and nothing left can outscore it.
+        lookups = []
+        for size, tiers in per_term[1:]:
+            if size <= 4 * SEARCH_CONFIG['max_candidates']:
+                lookups.append([(score, set().union(*group), None) for score, group in tiers])
+            else:
+                lookups.append([(score, None, group) for score, group in tiers])
+        best_rest = sum(tiers[0][0] for tiers in lookups)
+
+        top, seen = [], set()
+        for score, group in per_term[0][1]:
+            bound = score + best_rest
+            if len(top) >= limit and top[0][0] >= bound:
+                break
+            for doc_id in heapq.merge(*group):
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                if len(seen) > SEARCH_CONFIG['max_candidates']:
+                    break
+                total = score
+                for tiers in lookups:
+                    for term_score, docs, arrays in tiers:
+                        if docs is not None and doc_id in docs or arrays is not None and any(
+                                self._contains(postings, doc_id) for postings in arrays):
+                            total += term_score
+                            break
+                    else:
+                        break
+                else:
+                    entry = (total, -doc_id)
+                    if len(top) < limit:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+                    if len(top) >= limit and top[0][0] >= bound:
+                        break
+            if len(seen) > SEARCH_CONFIG['max_candidates']:
+                break
+        return [(-negative_id, total) for total, negative_id in sorted(top, reverse=True)]
+
+
+class SearchIndex:
+    """
+    Lazily built, self-refreshing indexes for every entity in ENTITIES.
+
+    Args:
+        refresh_interval: Seconds between catch-up reads
+        rebuild_interval: Seconds between full rebuilds
+        catch_up_overlap: Keys below the high-water mark each catch-up re-reads
+    """
+
+    def __init__(self, refresh_interval=15, rebuild_interval=3600, catch_up_overlap=1000, **_):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.catch_up_overlap = catch_up_overlap
+        self._indexes = {}
+        self._built_at = {}
+        self._synced_at = {}
+        self._locks = {entity: threading.Lock() for entity in ENTITIES}
+        self._rebuilding = set()
+        self._rebuild_lock = threading.Lock()
+
+    def _read(self, entity, since=None):
+        """Rows for an entity from the admin connection, optionally only keys > since"""
+        spec = ENTITIES[entity]
+        fields = [name for name, _, _ in spec['fields']]
+        params = ()
+        if spec.get('distinct') and since is None:
+            # One row per distinct value, keyed on its newest row for the high-water mark
+            query = (f"SELECT MAX({spec['key']}), {', '.join(fields)} FROM {spec['table']} "
+                     f"GROUP BY {', '.join(fields)} ORDER BY 1")
+        else:
+            query = f"SELECT {spec['key']}, {', '.join(fields)} FROM {spec['table']}"
+            if since is not None:
+                query += f" WHERE {spec['key']} > %s"
+                params = (since,)
+            query += f" ORDER BY {spec['key']}"
+
+        pool = get_pool('admin')
+        conn = pool.acquire()
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSCursor)
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+        except BaseException:
+            pool.release(conn, discard=True)
+            raise
+        pool.release(conn)
+
+    def _apply(self, entity, index, rows):
+        distinct = ENTITIES[entity].get('distinct')
+        for row in rows:
+            key = row[0]
+            if key is None:
+                continue
+            if distinct:
+                index.add_distinct(row[1])
+            elif key not in index.recent:
+                index.add(key, row[1:])
+                index.recent.add(key)
+            index.high_water = max(index.high_water, key)
+        self._prune(index)
+
+    def _prune(self, index):
+        """Forget keys below the catch-up window; they are never read again"""
+        floor = index.high_water - self.catch_up_overlap
+        index.recent = {key for key in index.recent if key > floor}
+
+    def _build(self, entity):
+        start = time.perf_counter()
+        index = TokenIndex(ENTITIES[entity]['fields'])
+        self._apply(entity, index, self._read(entity))
+        logger.info("Built %s search index: %d documents, %d tokens in %.1fs",
+                    entity, index.documents, len(index.tokens), time.perf_counter() - start)
+        return index
+
+    def _rebuild_in_background(self, entity):
+        def run():
+            try:
+                index = self._build(entity)
+                with self._locks[entity]:
+                    # Rows written while the rebuild ran are picked up by the next catch-up
+                    self._indexes[entity] = index
+                    self._built_at[entity] = time.monotonic()
+                    self._synced_at[entity] = 0
+            except Exception:
+                logger.exception("Rebuilding %s search index failed", entity)
+            finally:
+                self._rebuilding.discard(entity)
+
+        with self._rebuild_lock:
+            if entity in self._rebuilding:
+                return
+            self._rebuilding.add(entity)
+        threading.Thread(target=run, name=f'search-rebuild-{entity}', daemon=True).start()
+
+    def warm(self):
+        """Build every entity's index in the background"""
+        for entity in ENTITIES:
+            if entity not in self._indexes:
+                self._rebuild_in_background(entity)
+
+    def _index(self, entity):
+        """The entity's index, caught up if stale; raises IndexNotReady until first built"""
+        now = time.monotonic()
+        index = self._indexes.get(entity)
+        if index is None:
+            self._rebuild_in_background(entity)
+            raise IndexNotReady(f"The {entity} search index is still being built")
+
+        if now - self._synced_at.get(entity, 0) >= self.refresh_interval and self._locks[entity].acquire(blocking=False):
+            try:
+                index = self._indexes[entity]
+                since = max(index.high_water - self.catch_up_overlap, 0)
+                self._apply(entity, index, self._read(entity, since=since))
+                self._synced_at[entity] = now
+            finally:
+                self._locks[entity].release()
+
+        if now - self._built_at[entity] >= self.rebuild_interval:
+            self._rebuild_in_background(entity)
+        return index
+
+    def search(self, entity, text, limit):
+        """
+        Top matches for a search string.
+
+        Returns:
+            List of (key, score); for drugs the key is the drug name
+        """
+        terms = query_terms(text)
+        if not terms:
+            return []
+        index = self._index(entity)
+        matches = index.search(terms, limit)
+        if ENTITIES[entity].get('distinct'):
+            return [(index.names[doc_id], score) for doc_id, score in matches]
+        return matches
+
+    def add(self, entity, key, values):
+        """
+        Index a row written by this process.
+
+        Args:
+            entity: 'patient', 'physician' or 'drug'
+            key: Primary key (ignored for drugs)
+            values: Dict of the entity's indexed fields
+        """
+        with self._locks[entity]:
+            index = self._indexes.get(entity)
+            if index is None:
+                return
+            fields = [values.get(name) for name, _, _ in ENTITIES[entity]['fields']]
+            if ENTITIES[entity].get('distinct'):
+                index.add_distinct(fields[0])
+                return
+            key = int(key)
+            if key in index.recent:
+                return
+            # The next catch-up may read this row again; remember to skip it
+            index.recent.add(key)
+            index.add(key, fields)
+
+    def clear(self):
+        """Drop every index and rebuild them in the background"""
+        for entity in ENTITIES:
+            with self._locks[entity]:
+                self._indexes.pop(entity, None)
+        self.warm()
+
+    def stats(self):
+        return {
+            entity: {'documents': index.documents, 'tokens': len(index.tokens), 'high_water': index.high_water}
+            for entity, index in self._indexes.items()
+        }
+
+
+search_index = SearchIndex(**SEARCH_CONFIG)
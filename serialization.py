@@ -0,0 +1,132 @@
+"""
+Fast JSON encoding for API responses.
+
+Rows come back from pymysql holding date, datetime, timedelta (TIME
+columns) and Decimal values. FastJSONProvider encodes them directly, so
+views can hand raw rows to jsonify() instead of converting every value
+first:
+
+    date       -> "2024-01-15" (or the view's @date_format)
+    datetime   -> "2024-01-15T09:30:00+00:00" (naive values are UTC)
+    timedelta  -> "09:30:00"
+    Decimal    -> "12.50" (exact, as a string)
+
+orjson does the encoding when it is installed; otherwise the standard
+library json module produces the same output, only slower.
+"""
+import datetime
+import decimal
+import json
+from functools import wraps
+
+from flask import g, has_request_context
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def date_format(fmt):
+    """
+    Decorator: serialize date values in this view's responses with
+    strftime(fmt) instead of ISO 8601.
+
+    Args:
+        fmt: strftime format, e.g. '%a, %d %b %Y'
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.json_date_format = fmt
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _current_date_format():
+    if has_request_context():
+        return g.get('json_date_format')
+    return None
+
+
+def format_time(value):
+    """Render a TIME column (timedelta) as HH:MM:SS; hours may exceed 23"""
+    seconds = int(value.total_seconds())
+    sign = '-' if seconds < 0 else ''
+    seconds = abs(seconds)
+    return f"{sign}{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+def _format_datetime(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.isoformat()
+
+
+def _make_default(date_fmt):
+    """Build the fallback hook for values the encoder does not handle itself"""
+    def default(value):
+        if isinstance(value, datetime.timedelta):
+            return format_time(value)
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        if isinstance(value, datetime.datetime):
+            return _format_datetime(value)
+        if isinstance(value, datetime.date):
+            return value.strftime(date_fmt) if date_fmt else value.isoformat()
+        if hasattr(value, '__html__'):
+            return str(value.__html__())
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+    return default
+
+
+_default = _make_default(None)
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+def encode(obj):
+    """
+    Encode obj to UTF-8 JSON bytes.
+
+    Dates follow the current view's @date_format, if any.
+    """
+    date_fmt = _current_date_format()
+    if orjson is not None:
+        if date_fmt:
+            # Route dates through default() so they get the custom format
+            return orjson.dumps(obj, default=_make_default(date_fmt),
+                                option=_OPTIONS | orjson.OPT_PASSTHROUGH_DATETIME)
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+    default = _make_default(date_fmt) if date_fmt else _default
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson (stdlib json as a fallback).
+
+    Responses are built from the encoded bytes directly, without a
+    str round trip. Keys are emitted in insertion order, not sorted.
+    """
+
+    mimetype = 'application/json'
+
+    def encode(self, obj):
+        """Encode obj to JSON bytes"""
+        return encode(obj)
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b'\n', mimetype=self.mimetype)